@@ -0,0 +1,112 @@
+# ==============================================================================
+# CACHE PERSISTENTE DOS INSIGHTS DE IA
+# Os insights são endereçados pelo conteúdo: a chave é o hash de (modelo, versão
+# do template do prompt, prompt com o conteúdo extraído). Reauditar uma página
+# que não mudou devolve a resposta guardada em SQLite, sem chamar a API.
+# ==============================================================================
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", os.path.join(".cache", "ai_insights.sqlite"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "5000"))
+AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+def insights_cache_key(model_name, template_version, prompt):
+    """Hash que identifica uma resposta: mesmo modelo, template e conteúdo"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([model_name, template_version], ensure_ascii=False).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class InsightsCache:
+    """Cache SQLite com despejo LRU por número de entradas e por tamanho total"""
+
+    def __init__(self, path=AI_CACHE_PATH, max_entries=AI_CACHE_MAX_ENTRIES, max_bytes=AI_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS insights ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_insights_last_access ON insights (last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Retorna os insights guardados (ou None) e atualiza o último acesso"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM insights WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE insights SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, model_name, insights):
+        """Guarda os insights e aplica os limites de entradas e bytes"""
+        value = json.dumps(insights, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO insights (key, model, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Remove as entradas acessadas há mais tempo até caber nos limites"""
+        count, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM insights").fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        excess_entries = max(count - self.max_entries, 0)
+        excess_bytes = max(total_bytes - self.max_bytes, 0)
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size FROM insights ORDER BY last_access ASC"):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            to_delete.append((key,))
+            excess_entries -= 1
+            excess_bytes -= size
+        self._conn.executemany("DELETE FROM insights WHERE key = ?", to_delete)
+
+    def stats(self):
+        """Entradas, bytes ocupados e taxa de acerto desde o início do processo"""
+        with self._lock:
+            count, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM insights").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM insights")
+            self._conn.commit()
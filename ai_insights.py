@@ -0,0 +1,311 @@
+# ==============================================================================
+# INSIGHTS DE IA (GEMINI)
+# Um único prompt estruturado por página pede, de uma vez, sugestões de título
+# e meta descrição, palavras-chave e lacunas de conteúdo. As chamadas de várias
+# páginas são enviadas em paralelo, com limite de concorrência e timeout, e as
+# respostas chegam em streaming para serem exibidas aos poucos.
+# ==============================================================================
+import json
+import math
+import os
+import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_cache import insights_cache_key
+from instrumentation import traced
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "45"))
+PROMPT_TEMPLATE_VERSION = 1
+
+# Orçamento de tokens do prompt (limitado também pelo contexto do modelo) e
+# estimativa conservadora de caracteres por token para textos em português
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "4000"))
+AI_OUTPUT_TOKEN_RESERVE = 1024
+CHARS_PER_TOKEN = 3.0
+
+# Chaves esperadas na resposta e o valor usado quando o modelo omite alguma
+INSIGHT_DEFAULTS = {
+    "title_suggestions": [],
+    "meta_description_suggestions": [],
+    "primary_keyword": "",
+    "secondary_keywords": [],
+    "content_gaps": [],
+    "headings_feedback": "",
+}
+
+PROMPT_TEMPLATE = """Você é um especialista em SEO. Analise a página abaixo e responda APENAS com um JSON válido, sem texto adicional, com as chaves:
+- "title_suggestions": lista com 3 títulos otimizados para CTR (30-60 caracteres)
+- "meta_description_suggestions": lista com 2 meta descrições (140-160 caracteres)
+- "primary_keyword": a palavra-chave principal da página
+- "secondary_keywords": lista com até 5 palavras-chave secundárias
+- "content_gaps": lista com até 5 tópicos que enriqueceriam o conteúdo
+- "headings_feedback": uma frase avaliando a estrutura e hierarquia dos cabeçalhos
+
+URL: {url}
+Title atual: {title}
+Meta descrição atual: {meta_description}
+Cabeçalhos: {headings}
+Palavras mais frequentes: {top_keywords}
+
+Conteúdo:
+{text}
+"""
+
+
+def ai_page_input(url, onpage_data, soup, content_analysis=None):
+    """Extrai da página apenas o necessário para o prompt de insights"""
+    headings = [f"{h.name.upper()}: {h.get_text(strip=True)}" for h in soup.find_all(["h1", "h2", "h3"])][:30]
+    body = soup.find("body")
+    text = re.sub(r"\s+", " ", body.get_text(separator=" ")).strip() if body else ""
+    top_keywords = list((content_analysis or {}).get("semantic_analysis", {}).get("top_keywords", {}).keys())
+    # Só o primeiro bloco do texto entra no prompt; um caractere a mais que o
+    # orçamento máximo garante o mesmo corte de frases sem guardar a página inteira
+    text = text[:int(AI_PROMPT_TOKEN_BUDGET * CHARS_PER_TOKEN) + 1]
+    return {
+        "url": url,
+        "title": onpage_data.get("title", "N/A"),
+        "meta_description": onpage_data.get("meta_description", "N/A"),
+        "headings": headings,
+        "top_keywords": top_keywords,
+        "text": text,
+    }
+
+
+def estimate_tokens(text):
+    """Estimativa local do número de tokens (sem chamar a API)"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def chunk_text(text, max_tokens):
+    """Divide o texto em blocos de até max_tokens, respeitando o fim das frases"""
+    max_chars = max(int(max_tokens * CHARS_PER_TOKEN), 1)
+    chunks = []
+    current = ""
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        # Frases maiores que o bloco inteiro são cortadas no limite de caracteres
+        while len(sentence) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def prompt_token_budget(model):
+    """Orçamento do prompt: o configurado, sem ultrapassar o contexto do modelo"""
+    context_limit = getattr(model, "input_token_limit", None) or AI_PROMPT_TOKEN_BUDGET
+    return min(AI_PROMPT_TOKEN_BUDGET, context_limit - AI_OUTPUT_TOKEN_RESERVE)
+
+
+def build_insights_prompt(page, token_budget=AI_PROMPT_TOKEN_BUDGET):
+    """Monta o prompt estruturado (título + meta + palavras-chave + lacunas) de uma página
+
+    O conteúdo é dividido em blocos que cabem no orçamento restante depois das
+    partes fixas do prompt; apenas o primeiro bloco é enviado.
+    """
+    fields = {
+        "url": page["url"],
+        "title": page["title"],
+        "meta_description": page["meta_description"],
+        "headings": " | ".join(page["headings"]) or "nenhum",
+        "top_keywords": ", ".join(page["top_keywords"]) or "n/d",
+    }
+    overhead = estimate_tokens(PROMPT_TEMPLATE.format(text="", **fields))
+    chunks = chunk_text(page["text"], max(token_budget - overhead, 1))
+    return PROMPT_TEMPLATE.format(text=chunks[0] if chunks else "", **fields)
+
+
+def parse_insights_response(text):
+    """Converte a resposta do modelo no dicionário de insights"""
+    # Alguns modelos envolvem o JSON em blocos ```json ... ```
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        raise ValueError("Resposta da IA sem JSON")
+    data = json.loads(match.group(0))
+    return {key: data.get(key, default) for key, default in INSIGHT_DEFAULTS.items()}
+
+
+def parse_partial_insights(text):
+    """Extrai os campos já completos de uma resposta JSON ainda em streaming"""
+    partial = {}
+    for key, default in INSIGHT_DEFAULTS.items():
+        match = re.search(rf'"{key}"\s*:\s*', text)
+        if not match:
+            continue
+        rest = text[match.end():]
+        # Só entram strings cujas aspas de fechamento já chegaram
+        strings = [json.loads(f'"{s}"') for s in re.findall(r'"((?:[^"\\]|\\.)*)"', rest.split("]")[0] if isinstance(default, list) else rest)]
+        if isinstance(default, list):
+            partial[key] = strings
+        elif strings:
+            partial[key] = strings[0]
+    return partial
+
+
+# ========== CLIENTES DE MODELO ==========
+class GeminiModel:
+    """Cliente do Gemini (requer genai.configure já executado)"""
+
+    DEFAULT_INPUT_TOKEN_LIMIT = 32768
+
+    def __init__(self, model_name=GEMINI_MODEL):
+        import google.generativeai as genai
+
+        self.name = model_name
+        self._genai = genai
+        self._model = genai.GenerativeModel(model_name)
+        self._input_token_limit = None
+
+    @property
+    def input_token_limit(self):
+        """Contexto do modelo informado pela API (consultado uma única vez)"""
+        if self._input_token_limit is None:
+            try:
+                self._input_token_limit = self._genai.get_model(f"models/{self.name}").input_token_limit
+            except Exception:
+                self._input_token_limit = self.DEFAULT_INPUT_TOKEN_LIMIT
+        return self._input_token_limit
+
+    def generate_stream(self, prompt, timeout=AI_TIMEOUT_SECONDS):
+        response = self._model.generate_content(
+            prompt,
+            generation_config={"response_mime_type": "application/json"},
+            request_options={"timeout": timeout},
+            stream=True,
+        )
+        for chunk in response:
+            yield chunk.text
+
+    def generate(self, prompt, timeout=AI_TIMEOUT_SECONDS):
+        return "".join(self.generate_stream(prompt, timeout=timeout))
+
+
+class StubModel:
+    """Modelo local e determinístico para testes offline (sem chamadas de rede)"""
+
+    name = "stub"
+    input_token_limit = 8192
+
+    def __init__(self, latency=0.0, chunk_size=40):
+        self.latency = latency
+        self.chunk_size = chunk_size
+
+    def generate_stream(self, prompt, timeout=AI_TIMEOUT_SECONDS):
+        if estimate_tokens(prompt) > self.input_token_limit:
+            raise ValueError("Prompt excede o contexto do modelo")
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Tempo limite excedido")
+
+        title = re.search(r"Title atual: (.*)", prompt).group(1).strip()
+        words = re.search(r"Palavras mais frequentes: (.*)", prompt).group(1).split(", ")
+        words = [w for w in words if w and w != "n/d"] or ["conteúdo"]
+        text = json.dumps({
+            "title_suggestions": [f"{title[:40]} | Guia Completo", f"{words[0].capitalize()}: tudo o que você precisa saber"],
+            "meta_description_suggestions": [f"Descubra {words[0]} em detalhes: {', '.join(words[:3])}."],
+            "primary_keyword": words[0],
+            "secondary_keywords": words[1:6],
+            "content_gaps": [f"Perguntas frequentes sobre {words[0]}"],
+            "headings_feedback": "Estrutura gerada pelo modelo local de testes.",
+        }, ensure_ascii=False)
+
+        # A latência simulada é distribuída entre os pedaços da resposta
+        pieces = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for piece in pieces:
+            time.sleep(self.latency / len(pieces))
+            yield piece
+
+    def generate(self, prompt, timeout=AI_TIMEOUT_SECONDS):
+        return "".join(self.generate_stream(prompt, timeout=timeout))
+
+
+def get_insights_model(gemini_configured):
+    """Modelo a usar: o local se AI_INSIGHTS_STUB=1, o Gemini se configurado, senão nenhum"""
+    if os.getenv("AI_INSIGHTS_STUB") == "1":
+        return StubModel()
+    if gemini_configured:
+        return GeminiModel()
+    return None
+
+
+# ========== GERAÇÃO EM LOTE (COM STREAMING) ==========
+def _generate_one(model, url, prompt, timeout, index, updates):
+    started = time.perf_counter()
+    received = ""
+    try:
+        for piece in model.generate_stream(prompt, timeout=timeout):
+            received += piece
+            updates.put((index, received))
+        result = {"url": url, "insights": parse_insights_response(received), "error": None}
+    except Exception as e:
+        result = {"url": url, "insights": {}, "error": str(e)[:200]}
+    result["elapsed"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+@traced("external")
+def generate_insights_batch(pages, model, on_update=None, cache=None, max_concurrency=AI_MAX_CONCURRENCY, timeout=AI_TIMEOUT_SECONDS):
+    """Gera os insights de várias páginas em paralelo (uma chamada por página)
+
+    on_update(indice, insights_parciais) é chamado na thread de quem chamou a
+    função (a do job da auditoria) a cada pedaço recebido, para que a tela
+    seja preenchida progressivamente. Com um cache (ai_cache.InsightsCache),
+    páginas cujo prompt já foi respondido não chamam o modelo. Retorna a lista
+    de resultados na mesma ordem das páginas; páginas que estouram o prazo
+    total voltam com erro.
+    """
+    if not pages:
+        return []
+
+    budget = prompt_token_budget(model)
+    prompts = [build_insights_prompt(page, budget) for page in pages]
+    keys = [insights_cache_key(model.name, PROMPT_TEMPLATE_VERSION, prompt) for prompt in prompts]
+
+    results = [None] * len(pages)
+    if cache is not None:
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is not None:
+                results[i] = {"url": pages[i]["url"], "insights": cached, "error": None, "elapsed": 0.0, "cached": True}
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    updates = queue.Queue()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(pending))))
+    futures = {i: executor.submit(_generate_one, model, pages[i]["url"], prompts[i], timeout, i, updates) for i in pending}
+
+    # Prazo total: as páginas andam em "ondas" de max_concurrency chamadas
+    waves = -(-len(pending) // max(1, max_concurrency))
+    deadline = time.monotonic() + timeout * waves + 5
+    while time.monotonic() < deadline:
+        try:
+            index, received = updates.get(timeout=0.1)
+        except queue.Empty:
+            if all(future.done() for future in futures.values()):
+                break
+            continue
+        if on_update:
+            on_update(index, parse_partial_insights(received))
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for i, future in futures.items():
+        if future.done() and not future.cancelled():
+            results[i] = future.result()
+            if cache is not None and results[i]["error"] is None:
+                cache.put(keys[i], model.name, results[i]["insights"])
+        else:
+            results[i] = {"url": pages[i]["url"], "insights": {}, "error": "Tempo limite excedido", "elapsed": None}
+    return results
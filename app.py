@@ -1,43 +1,37 @@
 # ==============================================================================
 # SEÇÃO DE IMPORTAÇÕES (TODAS JUNTAS NO INÍCIO)
 # ==============================================================================
+import importlib.machinery
+
+# O Streamlit executa este script como módulo __main__ a cada rerun. Com este
+# __spec__, os processos do pool de análise (page_worker.py) não o reexecutam
+# ao iniciar, como acontece com o __main__ de `python -c`
+__spec__ = importlib.machinery.ModuleSpec("__main__", None)
+
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
 import google.generativeai as genai
 import os
-import pandas as pd
-from urllib.parse import urljoin, urlparse
 import time
+import uuid
+import pandas as pd
+from urllib.parse import urlparse
 import plotly.express as px
 import plotly.graph_objects as go
-import validators
-import json
-from collections import Counter
-from datetime import datetime, timedelta
-import re
-from textstat import flesch_reading_ease, automated_readability_index
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-
-# ==============================================================================
-# CONFIGURAÇÕES INICIAIS E DOWNLOADS
-# ==============================================================================
-
-# Download necessário para NLTK (executar apenas uma vez)
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    try:
-        nltk.download('punkt', quiet=True)
-    except:
-        nltk.download('punkt_tab', quiet=True)
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
+from seo_analysis import PSI_API_KEY, validate_url, analyze_site_strategy
+from issue_rules import default_rules, find_page_issues, issue_metrics
+from ai_insights import get_insights_model
+from ai_cache import InsightsCache
+from audit_diff import AuditHistory, diff_snapshots
+from rate_limiter import default_rate_limiter, forwarded_client_ip
+from job_queue import JobQueue, DONE as JOB_DONE, FAILED as JOB_FAILED
+from audit_pipeline import audit_options, run_audit
+from image_audit import FLAG_LABELS as IMAGE_FLAG_LABELS
+from geo_site import GEO_PERCENTILES
+from page_records import as_dict
+from shared_cache import SHARED_CACHE_TTL_SECONDS, SharedCache
+from monitoring import MONITOR_INTERVALS, MONITOR_PAGES_PER_CHECK, MonitorScheduler, MonitorStore
+from audit_export import EXPORT_DIR, EXPORT_DOWNLOAD_MAX_ROWS, EXPORT_FORMATS, export_row_count, export_to_directory, export_zip
+from instrumentation import METRICS, AUDIT_MEMORY_TRACKING, start_metrics_server, enable_memory_tracking
 
 # ========== CONFIGURAÇÃO DAS APIS ==========
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -51,214 +45,92 @@ if GEMINI_API_KEY:
 else: 
     st.warning("Chave da API Gemini (GEMINI_API_KEY) não encontrada...", icon="⚠️")
 
-PSI_API_KEY = os.getenv("PSI_API_KEY")
+# Modelo usado nos insights de IA (None quando o Gemini não está configurado)
+insights_model = get_insights_model(gemini_configured)
+
+@st.cache_resource
+def get_insights_cache():
+    """Cache em disco dos insights de IA, compartilhado por todas as sessões"""
+    return InsightsCache()
+
+@st.cache_resource
+def get_shared_cache():
+    """Páginas, PageSpeed e concorrentes já calculados, compartilhados por todas as sessões do servidor"""
+    return SharedCache()
+
+@st.cache_resource
+def get_audit_history():
+    """Histórico em disco das auditorias (retrato das páginas), para comparar execuções"""
+    return AuditHistory()
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """Expõe as métricas de tempo por etapa em METRICS_PORT (uma vez por processo)"""
+    metrics_port = os.getenv("METRICS_PORT")
+    return start_metrics_server(int(metrics_port)) if metrics_port else None
+
+start_metrics_endpoint()
+
+@st.cache_resource
+def get_rate_limiter():
+    """Limitador de taxa compartilhado por todas as sessões do servidor"""
+    return default_rate_limiter()
+
+# Intervalo, em segundos, entre as consultas ao progresso da auditoria em andamento
+AUDIT_POLL_SECONDS = float(os.getenv("AUDIT_POLL_SECONDS", "1"))
+
+@st.cache_resource
+def get_audit_queue():
+    """Pool de workers das auditorias, compartilhado por todas as sessões do servidor"""
+    return JobQueue()
+
+@st.cache_resource
+def get_monitor_scheduler():
+    """Agendador do monitoramento (um por processo), gravando no mesmo histórico das auditorias"""
+    return MonitorScheduler(MonitorStore(), get_audit_history()).start()
+
+def current_client_id():
+    """Identifica o cliente pelo IP ou pela sessão
+
+    Atrás de um proxy reverso, o ip_address é o do proxy (ou None, se ele
+    estiver no mesmo host): com RATE_LIMIT_CLIENT_HEADER, vale o IP informado
+    pelo proxy nesse cabeçalho. Cabeçalhos que o próprio cliente pode enviar
+    nunca são usados sem essa configuração.
+    """
+    context = getattr(st, "context", None)
+    client_ip = forwarded_client_ip(getattr(context, "headers", None))
+    if not client_ip:
+        client_ip = getattr(context, "ip_address", None)
+    if client_ip:
+        return f"ip:{client_ip}"
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
+    return f"session:{st.session_state.client_id}"
+
+def estimate_audit_requests(options):
+    """Requisições que uma auditoria vai fazer: é o custo dela no limitador de taxa
+
+    Conta os documentos HTML (página principal, rastreadas e concorrentes) e as
+    chamadas de API com cota: duas do PageSpeed por site (mobile e desktop,
+    com PSI_API_KEY) e uma do Gemini por site (com os insights de IA). As
+    leituras parciais de imagens, os CSS/JS/fontes do lite lab (em cache por
+    site), o sitemap.xml e os HEAD dos links quebrados ficam de fora.
+    """
+    sites = 1 + len(options['competitors'])
+    main_pages = 1 + (options['crawl_pages'] if options['extract_structure'] else 0)
+    competitor_pages = len(options['competitors']) * (2 if options['extract_structure'] else 1)
+    psi_calls = 2 * sites if PSI_API_KEY else 0
+    ai_calls = sites if options['ai_insights'] else 0
+    return main_pages + competitor_pages + psi_calls + ai_calls
+
+# Pico e memória retida por etapa (tracemalloc), ligados com AUDIT_MEMORY_BUDGET_MB ou AUDIT_MEMORY_TRACKING=1
+if AUDIT_MEMORY_TRACKING:
+    enable_memory_tracking()
 
 # ==============================================================================
-# DEFINIÇÃO DAS FUNÇÕES DE ANÁLISE
-# (Toda a sua lógica de análise permanece aqui)
+# FUNÇÕES DE VISUALIZAÇÃO
+# (As funções de análise ficam em seo_analysis.py)
 # ==============================================================================
-# Cabeçalho para simular um navegador real e evitar bloqueios
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-}
-# ========== NOVA FUNCIONALIDADE: ANÁLISE DE GEO (GENERATIVE ENGINE OPTIMIZATION) ==========
-def analyze_geo_ai_optimization(soup, url):
-    """Análise de GEO - Generative Engine Optimization para IAs"""
-    geo_analysis = {
-        "content_structure": {},
-        "factual_content": {},
-        "ai_friendly_format": {},
-        "authority_signals": {},
-        "geo_score": 0
-    }
-    
-    text_content = soup.get_text()
-    text_lower = text_content.lower()
-    
-    # === ANÁLISE DE ESTRUTURA DE CONTEÚDO PARA IAs ===
-    # Perguntas e respostas (formato FAQ)
-    faq_indicators = [
-        'o que é', 'como fazer', 'por que', 'quando', 'onde', 'quem',
-        'qual a diferença', 'como funciona', 'qual o melhor', 'pergunta',
-        'resposta', 'dúvida', 'questão'
-    ]
-    
-    faq_mentions = sum(1 for indicator in faq_indicators if indicator in text_lower)
-    geo_analysis["content_structure"]["faq_indicators"] = faq_mentions
-    
-    # Listas e estruturas organizadas
-    lists = soup.find_all(['ul', 'ol'])
-    geo_analysis["content_structure"]["lists_count"] = len(lists)
-    
-    # Tabelas (dados estruturados)
-    tables = soup.find_all('table')
-    geo_analysis["content_structure"]["tables_count"] = len(tables)
-    
-    # Headings bem estruturados
-    headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-    geo_analysis["content_structure"]["headings_count"] = len(headings)
-    
-    # Verifica hierarquia lógica de headings
-    h_levels = [int(h.name[1]) for h in headings]
-    hierarchy_score = 0
-    if h_levels:
-        # Pontos por ordem lógica (H1 -> H2 -> H3...)
-        for i in range(len(h_levels) - 1):
-            if h_levels[i+1] <= h_levels[i] + 1:  # Não pula níveis
-                hierarchy_score += 1
-        hierarchy_score = (hierarchy_score / max(len(h_levels) - 1, 1)) * 100
-    
-    geo_analysis["content_structure"]["hierarchy_score"] = round(hierarchy_score, 1)
-    
-    # === ANÁLISE DE CONTEÚDO FACTUAL ===
-    # Indicadores de conteúdo factual e autoritativo
-    factual_indicators = [
-        'segundo', 'de acordo com', 'estudos mostram', 'pesquisa indica',
-        'dados revelam', 'estatística', 'porcentagem', '%', 'número',
-        'ano', 'em 2023', 'em 2024', 'recente', 'atual'
-    ]
-    
-    factual_mentions = sum(1 for indicator in factual_indicators if indicator in text_lower)
-    geo_analysis["factual_content"]["factual_indicators"] = factual_mentions
-    
-    # Citations e referências
-    citations = soup.find_all('cite') + soup.find_all('blockquote')
-    geo_analysis["factual_content"]["citations"] = len(citations)
-    
-    # Links externos para fontes autoritárias
-    external_links = soup.find_all('a', href=True)
-    authoritative_domains = [
-        'wikipedia.org', 'edu.br', 'gov.br', 'ibge.gov.br',
-        'nature.com', 'pubmed.gov', 'scholar.google',
-        'researchgate.net', 'scielo.org'
-    ]
-    
-    authoritative_links = 0
-    for link in external_links:
-        href = link.get('href', '').lower()
-        if any(domain in href for domain in authoritative_domains):
-            authoritative_links += 1
-    
-    geo_analysis["factual_content"]["authoritative_links"] = authoritative_links
-    
-    # === ANÁLISE DE FORMATO AMIGÁVEL PARA IA ===
-    # Definições claras (importante para IAs)
-    definition_patterns = [
-        r'\b\w+\s+é\s+', r'\b\w+\s+são\s+', r'definição\s+de',
-        r'significa', r'conceito\s+de', r'refere-se\s+a'
-    ]
-    
-    definition_count = 0
-    for pattern in definition_patterns:
-        definition_count += len(re.findall(pattern, text_lower))
-    
-    geo_analysis["ai_friendly_format"]["definitions"] = definition_count
-    
-    # Exemplos práticos
-    example_indicators = [
-        'por exemplo', 'exemplo', 'como:', 'veja:', 'observe:',
-        'considere', 'imagine', 'suponha', 'caso'
-    ]
-    
-    example_mentions = sum(1 for indicator in example_indicators if indicator in text_lower)
-    geo_analysis["ai_friendly_format"]["examples"] = example_mentions
-    
-    # Comparações (úteis para IAs entenderem contexto)
-    comparison_indicators = [
-        'diferença entre', 'comparado com', 'versus', 'vs',
-        'melhor que', 'pior que', 'similar a', 'ao contrário'
-    ]
-    
-    comparison_mentions = sum(1 for indicator in comparison_indicators if indicator in text_lower)
-    geo_analysis["ai_friendly_format"]["comparisons"] = comparison_mentions
-    
-    # Instruções passo a passo
-    step_indicators = [
-        'passo', 'etapa', 'primeiro', 'segundo', 'terceiro',
-        'em seguida', 'depois', 'finalmente', 'para começar'
-    ]
-    
-    step_mentions = sum(1 for indicator in step_indicators if indicator in text_lower)
-    geo_analysis["ai_friendly_format"]["step_by_step"] = step_mentions
-    
-    # === ANÁLISE DE SINAIS DE AUTORIDADE ===
-    # Dados do autor
-    author_tags = soup.find_all(['meta'], attrs={'name': ['author', 'article:author']})
-    author_elements = soup.find_all(['span', 'div', 'p'], class_=lambda x: x and 'author' in x.lower() if x else False)
-    
-    geo_analysis["authority_signals"]["author_mentioned"] = len(author_tags) + len(author_elements) > 0
-    
-    # Data de publicação/atualização
-    date_tags = soup.find_all(['meta'], attrs={'name': ['publish_date', 'article:published_time', 'article:modified_time']})
-    time_elements = soup.find_all(['time'])
-    
-    geo_analysis["authority_signals"]["date_mentioned"] = len(date_tags) + len(time_elements) > 0
-    
-    # Schema Article
-    has_article_schema = False
-    json_scripts = soup.find_all("script", type="application/ld+json")
-    for script in json_scripts:
-        try:
-            data = json.loads(script.string.strip())
-            if isinstance(data, dict) and 'Article' in str(data.get('@type', '')):
-                has_article_schema = True
-                break
-        except:
-            continue
-    
-    geo_analysis["authority_signals"]["article_schema"] = has_article_schema
-    
-    # Comprimento do conteúdo (IAs preferem conteúdo substancial)
-    word_count = len(text_content.split())
-    geo_analysis["authority_signals"]["word_count"] = word_count
-    
-    # === CÁLCULO DO SCORE GEO ===
-    score = 0
-    
-    # Estrutura de conteúdo (25 pontos)
-    if faq_mentions >= 3: score += 8
-    elif faq_mentions >= 1: score += 5
-    
-    if len(lists) >= 2: score += 5
-    elif len(lists) >= 1: score += 3
-    
-    if len(headings) >= 3: score += 7
-    elif len(headings) >= 1: score += 4
-    
-    if hierarchy_score >= 80: score += 5
-    elif hierarchy_score >= 50: score += 3
-    
-    # Conteúdo factual (25 pontos)
-    if factual_mentions >= 5: score += 10
-    elif factual_mentions >= 2: score += 6
-    
-    if authoritative_links >= 2: score += 10
-    elif authoritative_links >= 1: score += 6
-    
-    if len(citations) >= 1: score += 5
-    
-    # Formato amigável para IA (25 pontos)
-    if definition_count >= 3: score += 8
-    elif definition_count >= 1: score += 5
-    
-    if example_mentions >= 2: score += 6
-    elif example_mentions >= 1: score += 3
-    
-    if comparison_mentions >= 1: score += 6
-    if step_mentions >= 2: score += 5
-    
-    # Sinais de autoridade (25 pontos)
-    if geo_analysis["authority_signals"]["author_mentioned"]: score += 6
-    if geo_analysis["authority_signals"]["date_mentioned"]: score += 6
-    if has_article_schema: score += 8
-    
-    if word_count >= 1000: score += 5
-    elif word_count >= 500: score += 3
-    
-    geo_analysis["geo_score"] = min(score, 100)
-    
-    return geo_analysis
-
 def create_geo_ai_dashboard(geo_analysis):
     """Cria dashboard visual para análise de GEO (IA)"""
     if not geo_analysis:
@@ -361,184 +233,6 @@ def create_geo_ai_dashboard(geo_analysis):
     
     return fig
 
-def analyze_content_advanced(soup, url):
-    """Análise avançada de conteúdo com métricas de legibilidade e estrutura"""
-    analysis = {
-        "readability": {},
-        "content_structure": {},
-        "semantic_analysis": {},
-        "content_quality": {},
-        "headings_analysis": {}
-    }
-    
-    # Extrai texto principal
-    body = soup.find("body")
-    if not body:
-        return analysis
-    
-    # Remove scripts, styles e elementos não relevantes
-    for script in body(["script", "style", "nav", "footer", "aside"]):
-        script.decompose()
-    
-    text = body.get_text()
-    
-    # Tokenização com fallback
-    try:
-        sentences = sent_tokenize(text)
-        words = word_tokenize(text.lower())
-    except:
-        # Fallback simples se NLTK não funcionar
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
-        words = re.findall(r'\b[a-záàâãéêíóôõúç]+\b', text.lower())
-    
-    # Remove stopwords
-    try:
-        stop_words = set(stopwords.words('portuguese'))
-        filtered_words = [word for word in words if word.isalnum() and word not in stop_words]
-    except:
-        # Fallback para lista básica se não conseguir carregar stopwords
-        basic_stopwords = {
-            'a', 'o', 'e', 'é', 'de', 'do', 'da', 'em', 'um', 'uma', 'para', 'com', 'por', 
-            'que', 'se', 'na', 'no', 'os', 'as', 'dos', 'das', 'ao', 'aos', 'à', 'às',
-            'mas', 'ou', 'ser', 'ter', 'seu', 'sua', 'seus', 'suas', 'foi', 'são', 'não'
-        }
-        filtered_words = [word for word in words if word.isalnum() and word not in basic_stopwords]
-    
-    # === ANÁLISE DE LEGIBILIDADE ===
-    if len(text.strip()) > 50:  # Só analisa se tiver conteúdo suficiente
-        try:
-            analysis["readability"]["flesch_score"] = round(flesch_reading_ease(text), 2)
-            analysis["readability"]["ari_score"] = round(automated_readability_index(text), 2)
-        except:
-            analysis["readability"]["flesch_score"] = "N/A"
-            analysis["readability"]["ari_score"] = "N/A"
-        
-        # Calcula métricas customizadas
-        avg_sentence_length = len(words) / len(sentences) if sentences else 0
-        analysis["readability"]["avg_sentence_length"] = round(avg_sentence_length, 2)
-        
-        # Classifica legibilidade
-        flesch = analysis["readability"]["flesch_score"]
-        if isinstance(flesch, (int, float)):
-            if flesch >= 80:
-                analysis["readability"]["level"] = "Muito Fácil"
-                analysis["readability"]["level_color"] = "#2E8B57"
-            elif flesch >= 65:
-                analysis["readability"]["level"] = "Fácil"
-                analysis["readability"]["level_color"] = "#32CD32"
-            elif flesch >= 50:
-                analysis["readability"]["level"] = "Médio"
-                analysis["readability"]["level_color"] = "#FF8C00"
-            else:
-                analysis["readability"]["level"] = "Difícil"
-                analysis["readability"]["level_color"] = "#DC143C"
-        else:
-            analysis["readability"]["level"] = "N/A"
-            analysis["readability"]["level_color"] = "#696969"
-    
-    # === ANÁLISE DE ESTRUTURA DE CONTEÚDO ===
-    headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-    
-    headings_structure = []
-    for heading in headings:
-        headings_structure.append({
-            'level': heading.name,
-            'text': heading.get_text(strip=True),
-            'length': len(heading.get_text(strip=True))
-        })
-    
-    analysis["headings_analysis"]["total_headings"] = len(headings)
-    analysis["headings_analysis"]["structure"] = headings_structure
-    
-    # Analisa hierarquia de headings
-    h_levels = [h['level'] for h in headings_structure]
-    h1_count = h_levels.count('h1')
-    h2_count = h_levels.count('h2')
-    h3_count = h_levels.count('h3')
-    
-    analysis["headings_analysis"]["h1_count"] = h1_count
-    analysis["headings_analysis"]["h2_count"] = h2_count
-    analysis["headings_analysis"]["h3_count"] = h3_count
-    
-    # Verifica hierarquia lógica
-    hierarchy_issues = []
-    if h1_count == 0:
-        hierarchy_issues.append("Ausência de H1")
-    elif h1_count > 1:
-        hierarchy_issues.append("Múltiplos H1")
-    
-    if h2_count == 0 and len(text.split()) > 500:
-        hierarchy_issues.append("Falta de H2 em conteúdo longo")
-    
-    analysis["headings_analysis"]["hierarchy_issues"] = hierarchy_issues
-    
-    # === ANÁLISE SEMÂNTICA ===
-    # Densidade de palavras-chave (top 10)
-    word_freq = Counter(filtered_words)
-    top_words = dict(word_freq.most_common(10))
-    analysis["semantic_analysis"]["top_keywords"] = top_words
-    analysis["semantic_analysis"]["vocabulary_richness"] = len(set(filtered_words)) / len(filtered_words) if filtered_words else 0
-    
-    # === QUALIDADE DO CONTEÚDO ===
-    paragraphs = soup.find_all('p')
-    paragraph_lengths = [len(p.get_text().split()) for p in paragraphs if p.get_text().strip()]
-    
-    analysis["content_quality"]["paragraph_count"] = len(paragraph_lengths)
-    analysis["content_quality"]["avg_paragraph_length"] = round(sum(paragraph_lengths) / len(paragraph_lengths), 2) if paragraph_lengths else 0
-    analysis["content_quality"]["total_words"] = len(words)
-    analysis["content_quality"]["total_sentences"] = len(sentences)
-    
-    # Detecta conteúdo duplicado simples
-    unique_sentences = set(sentences)
-    duplication_ratio = 1 - (len(unique_sentences) / len(sentences)) if sentences else 0
-    analysis["content_quality"]["duplication_ratio"] = round(duplication_ratio * 100, 2)
-    
-    # Score de qualidade geral do conteúdo
-    quality_score = 0
-    
-    # Pontuação baseada em comprimento
-    word_count = len(words)
-    if word_count >= 1000:
-        quality_score += 25
-    elif word_count >= 500:
-        quality_score += 20
-    elif word_count >= 300:
-        quality_score += 15
-    elif word_count >= 150:
-        quality_score += 10
-    
-    # Pontuação baseada em estrutura
-    if h1_count == 1:
-        quality_score += 15
-    if h2_count >= 2:
-        quality_score += 10
-    if len(paragraph_lengths) >= 3:
-        quality_score += 10
-    
-    # Pontuação baseada em legibilidade
-    if isinstance(flesch, (int, float)):
-        if flesch >= 50:
-            quality_score += 20
-        elif flesch >= 30:
-            quality_score += 15
-        else:
-            quality_score += 5
-    
-    # Pontuação baseada em variedade vocabular
-    if analysis["semantic_analysis"]["vocabulary_richness"] >= 0.7:
-        quality_score += 10
-    elif analysis["semantic_analysis"]["vocabulary_richness"] >= 0.5:
-        quality_score += 7
-    
-    # Penalidade por duplicação
-    if duplication_ratio > 0.3:
-        quality_score -= 10
-    
-    analysis["content_quality"]["quality_score"] = min(quality_score, 100)
-    
-    return analysis
-
 # ========== FUNÇÕES DE VISUALIZAÇÃO OTIMIZADAS (MONOCROMÁTICAS) ==========
 def create_content_quality_dashboard(content_analysis):
     """Cria dashboard visual minimalista para análise de conteúdo"""
@@ -646,138 +340,107 @@ def create_content_quality_dashboard(content_analysis):
     
     return fig
 
-# ========== TÓPICO 2: VALIDAÇÃO DE URL ROBUSTA ==========
-def validate_url(url):
-    """Validação robusta de URLs"""
-    if not url:
-        return False, "URL não pode estar vazia"
-    
-    # Adiciona http:// se não tiver protocolo
-    if not url.startswith(('http://', 'https://')):
-        url = 'https://' + url
-    
-    if not validators.url(url):
-        return False, "Formato de URL inválido"
-    
-    parsed = urlparse(url)
-    if parsed.scheme not in ['http', 'https']:
-        return False, "URL deve usar protocolo HTTP ou HTTPS"
-    
-    if not parsed.netloc:
-        return False, "URL deve conter um domínio válido"
+def create_timing_waterfall(trace):
+    """Cria waterfall das etapas de uma auditoria em tons de cinza"""
+    spans = sorted(trace.spans, key=lambda s: s.start)
+    if not spans:
+        return None
     
-    return True, url
-
-def test_url_accessibility(url):
-    """Testa se a URL é acessível"""
-    try:
-        response = requests.head(url, timeout=10, allow_redirects=True)
-        if response.status_code >= 400:
-            return False, f"Erro HTTP {response.status_code}"
-        return True, "URL acessível"
-    except requests.exceptions.RequestException as e:
-        return False, f"Erro de conexão: {str(e)[:100]}"
-
-# ========== TÓPICO 3: ANÁLISE DE PALAVRAS-CHAVE ==========
-def keyword_analysis(soup, target_keyword=None):
-    """Análise avançada de palavras-chave e densidade"""
-    body = soup.find("body")
-    if not body:
-        return {}
-    
-    text = body.get_text().lower()
-    words = [word.strip('.,!?";()[]{}') for word in text.split() if len(word.strip('.,!?";()[]{}')) > 2]
-    
-    analysis = {
-        "total_words": len(words),
-        "unique_words": len(set(words))
+    category_colors = {
+        'fetch': '#2F4F4F', 'crawler': '#2F4F4F',
+        'parse': '#708090', 'analyzer': '#A9A9A9',
+        'external': '#696969'
     }
     
-    if target_keyword:
-        keyword_lower = target_keyword.lower()
-        keyword_count = text.count(keyword_lower)
-        
-        # Verifica presença em elementos importantes
-        title = soup.find("title")
-        h1s = soup.find_all("h1")
-        meta_desc = soup.find("meta", attrs={"name": "description"})
-        
-        analysis.update({
-            "target_keyword": target_keyword,
-            "keyword_count": keyword_count,
-            "keyword_density": round((keyword_count / len(words)) * 100, 2) if words else 0,
-            "in_title": keyword_lower in (title.get_text().lower() if title else ""),
-            "in_h1": any(keyword_lower in h1.get_text().lower() for h1 in h1s),
-            "in_meta_desc": keyword_lower in (meta_desc.get("content", "").lower() if meta_desc else ""),
-            "keyword_prominence_score": 0
-        })
-        
-        # Calcula score de proeminência (0-100)
-        score = 0
-        if analysis["in_title"]: score += 30
-        if analysis["in_h1"]: score += 25
-        if analysis["in_meta_desc"]: score += 20
-        if 1 <= analysis["keyword_density"] <= 3: score += 25
-        elif analysis["keyword_density"] > 0: score += 15
-        
-        analysis["keyword_prominence_score"] = score
+    labels = [f"{'  ' * s.depth}{s.name} #{i + 1}" for i, s in enumerate(spans)]
+    hover_texts = [
+        f"<b>{s.name}</b><br>Categoria: {s.category}<br>Início: {s.start:.2f}s<br>"
+        f"Duração: {s.duration:.3f}s<br>Itens: {s.count}<br>Bytes: {s.bytes:,}"
+        + (f"<br>Pico de memória: {s.mem_peak / 2**20:.1f} MB<br>Memória retida: {s.mem_delta / 2**20:+.1f} MB"
+           if s.mem_peak is not None else "")
+        + (f"<br>Erro: {s.error}" if s.error else "")
+        for s in spans
+    ]
     
-    # Top 10 palavras mais frequentes
-    word_freq = Counter(words)
-    analysis["top_words"] = dict(word_freq.most_common(10))
+    fig = go.Figure(go.Bar(
+        y=labels,
+        x=[s.duration for s in spans],
+        base=[s.start for s in spans],
+        orientation='h',
+        marker_color=[category_colors.get(s.category, '#C0C0C0') for s in spans],
+        hovertemplate='%{customdata}<extra></extra>',
+        customdata=hover_texts
+    ))
     
-    return analysis
+    fig.update_layout(
+        title_text=f"⏱️ Tempo por Etapa (total: {trace.to_dict()['total']:.2f}s)",
+        title_font_color='#2F4F4F',
+        xaxis_title="Segundos desde o início da auditoria",
+        yaxis=dict(autorange="reversed", tickfont=dict(size=10)),
+        height=max(300, 22 * len(spans) + 100),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        margin=dict(l=10, r=10, t=50, b=40)
+    )
+    return fig
 
-# ========== TÓPICO 5: ANÁLISE DETALHADA DE DADOS ESTRUTURADOS ==========
-def analyze_structured_data(soup):
-    """Análise completa dos dados estruturados"""
-    structured_data = {
-        "json_ld_count": 0,
-        "microdata_count": 0,
-        "schemas_found": [],
-        "errors": [],
-        "recommendations": []
-    }
-    
-    # Análise JSON-LD
-    json_scripts = soup.find_all("script", type="application/ld+json")
-    structured_data["json_ld_count"] = len(json_scripts)
-    
-    for i, script in enumerate(json_scripts):
-        try:
-            data = json.loads(script.string.strip())
-            schema_type = data.get("@type", "Unknown")
-            structured_data["schemas_found"].append({
-                "type": schema_type,
-                "method": "JSON-LD",
-                "valid": True,
-                "position": i + 1
-            })
-        except json.JSONDecodeError as e:
-            structured_data["errors"].append(f"JSON-LD inválido na posição {i + 1}: {str(e)[:100]}")
-    
-    # Análise Microdata
-    microdata_items = soup.find_all(attrs={"itemtype": True})
-    structured_data["microdata_count"] = len(microdata_items)
-    
-    for item in microdata_items:
-        itemtype = item.get("itemtype", "")
-        if "schema.org" in itemtype:
-            schema_name = itemtype.split("/")[-1]
-            structured_data["schemas_found"].append({
-                "type": schema_name,
-                "method": "Microdata",
-                "valid": True
-            })
-    
-    # Recomendações
-    if structured_data["json_ld_count"] == 0 and structured_data["microdata_count"] == 0:
-        structured_data["recommendations"].append("Implementar dados estruturados para melhorar a visibilidade nos resultados de busca")
-    
-    if len(structured_data["schemas_found"]) == 0:
-        structured_data["recommendations"].append("Adicionar Schema.org adequado ao tipo de conteúdo (Article, Product, Organization, etc.)")
+def create_page_weight_chart(lab):
+    """Cria gráfico do peso da página por tipo de recurso em tons de cinza"""
+    type_labels = {'html': 'HTML', 'css': 'CSS', 'js': 'JavaScript', 'font': 'Fontes', 'image': 'Imagens', 'iframe': 'Iframes'}
+    weights = [(type_labels[kind], size / 1024) for kind, size in lab['bytes_by_type'].items() if size]
+    if not weights:
+        return None
     
-    return structured_data
+    fig = go.Figure(go.Bar(
+        x=[label for label, _ in weights],
+        y=[size for _, size in weights],
+        marker_color='#708090',
+        text=[f"{size:.0f} KB" for _, size in weights],
+        textposition='outside'
+    ))
+    fig.update_layout(
+        title_text=f"⚖️ Peso da Página por Tipo (total: {lab['total_bytes'] / 1024:.0f} KB)",
+        title_font_color='#2F4F4F',
+        yaxis_title="KB",
+        height=350,
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        margin=dict(l=10, r=10, t=50, b=40)
+    )
+    return fig
+
+def create_geo_site_chart(site_geo):
+    """Cria histograma do score GEO das páginas rastreadas em tons de cinza"""
+    counts, edges = site_geo.score_histogram()
+    labels = [f"{edges[i]:.0f}-{edges[i + 1]:.0f}" for i in range(len(counts))]
+    
+    fig = go.Figure(go.Bar(
+        x=labels,
+        y=counts,
+        marker_color=['#A9A9A9' if edges[i] < 50 else '#708090' if edges[i] < 70 else '#2F4F4F' for i in range(len(counts))],
+        text=counts,
+        textposition='outside'
+    ))
+    fig.update_layout(
+        title_text=f"🤖 Score GEO das Páginas Rastreadas ({site_geo.page_count} páginas)",
+        title_font_color='#2F4F4F',
+        xaxis_title="Score GEO",
+        yaxis_title="Páginas",
+        height=350,
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        margin=dict(l=10, r=10, t=50, b=40)
+    )
+    return fig
+
+def performance_label(psi, lab):
+    """Performance mobile do PSI ou, sem ela, a estimativa do lite lab"""
+    perf_mobile = (psi or {}).get('mobile', {}).get('psi_performance', 0)
+    if perf_mobile > 0:
+        return f"{perf_mobile}/100"
+    if lab:
+        return f"~{lab['estimated_score']}/100"
+    return "N/A"
 
 # ========== TÓPICO 6: DASHBOARD COM GAUGES VISUAIS MINIMALISTAS ==========
 def create_seo_score_gauge(score, title="SEO Score"):
@@ -832,149 +495,55 @@ def create_seo_score_gauge(score, title="SEO Score"):
     )
     return fig
 
-def calculate_overall_seo_score(onpage_data, psi_data, keyword_data, structured_data):
-    """Calcula um score geral de SEO baseado em múltiplos fatores"""
-    if not onpage_data:
-        return 0
-    
-    score = 0
-    
-    # CRITÉRIOS BÁSICOS (40 pontos)
-    title_len = onpage_data.get('title_length', 0)
-    if title_len == 0 or onpage_data.get('title') == 'N/A':
-        score += 0
-    elif 30 <= title_len <= 60:
-        score += 15
-    elif 20 <= title_len <= 80:
-        score += 10
-    else:
-        score += 5
-    
-    # H1 (10 pontos)
-    h1_count = onpage_data.get('h1_count', 0)
-    if h1_count == 1:
-        score += 10
-    elif h1_count > 1:
-        score += 5
-    
-    # Conteúdo (15 pontos)
-    word_count = onpage_data.get('word_count', 0)
-    if word_count >= 500:
-        score += 15
-    elif word_count >= 300:
-        score += 12
-    elif word_count >= 150:
-        score += 8
-    elif word_count > 0:
-        score += 3
-    
-    # PERFORMANCE (25 pontos)
-    if psi_data and 'mobile' in psi_data and psi_data['mobile']:
-        mobile_perf = psi_data['mobile'].get('psi_performance', 0)
-        try:
-            mobile_perf = float(mobile_perf)
-            score += (mobile_perf / 100) * 25
-        except (ValueError, TypeError):
-            pass
-    else:
-        score += 10
-    
-    # META DESCRIPTION (10 pontos)
-    meta_len = onpage_data.get('meta_description_length', 0)
-    if meta_len == 0 or onpage_data.get('meta_description') == 'N/A':
-        score += 0
-    elif 140 <= meta_len <= 160:
-        score += 10
-    elif 120 <= meta_len <= 180:
-        score += 7
-    else:
-        score += 3
-    
-    # ELEMENTOS TÉCNICOS (25 pontos)
-    if onpage_data.get('links_internos', 0) >= 5:
-        score += 5
-    elif onpage_data.get('links_internos', 0) >= 2:
-        score += 3
-    
-    # Imagens
-    total_imgs = onpage_data.get('image_count', 0)
-    imgs_sem_alt = onpage_data.get('images_sem_alt', 0)
-    if total_imgs > 0:
-        img_score = ((total_imgs - imgs_sem_alt) / total_imgs) * 5
-        score += img_score
-    
-    # Palavra-chave
-    if keyword_data and 'keyword_prominence_score' in keyword_data:
-        kw_score = keyword_data.get('keyword_prominence_score', 0)
-        try:
-            score += (float(kw_score) / 100) * 10
-        except (ValueError, TypeError):
-            pass
-    
-    # Dados estruturados
-    if structured_data and len(structured_data.get('schemas_found', [])) > 0:
-        score += 5
-    
-    return min(round(score), 100)
+# ========== VISUALIZAÇÃO DO SITEMAP ==========
+def _path_segments(page):
+    """Segmentos do caminho da página (vazio para a home)"""
+    return tuple(page['path'].strip('/').split('/')) if page['path'] != '/' else ()
 
-# ========== NOVA FUNCIONALIDADE: SITEMAP E MAPEAMENTO ==========
-def extract_site_structure(url, max_depth=2, max_pages=20):
-    """Extrai a estrutura do site para criar sitemap"""
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, timeout=10, headers=headers)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        base_domain = urlparse(url).netloc
-        
-        # Encontra todos os links internos
-        links = soup.find_all("a", href=True)
-        internal_links = []
-        
-        for link in links:
-            href = link.get('href')
-            if href:
-                # Resolve URL relativa
-                full_url = urljoin(url, href)
-                parsed = urlparse(full_url)
-                
-                # Verifica se é link interno
-                if parsed.netloc == base_domain and not href.startswith('#'):
-                    # Extrai informações do link
-                    link_info = {
-                        'url': full_url,
-                        'path': parsed.path,
-                        'text': link.get_text(strip=True)[:50],
-                        'depth': len(parsed.path.strip('/').split('/')) if parsed.path != '/' else 0
-                    }
-                    internal_links.append(link_info)
-        
-        # Remove duplicatas e limita
-        seen_urls = set()
-        unique_links = []
-        for link in internal_links:
-            if link['url'] not in seen_urls and len(unique_links) < max_pages:
-                seen_urls.add(link['url'])
-                unique_links.append(link)
-        
-        return {
-            'base_url': url,
-            'domain': base_domain,
-            'total_links_found': len(internal_links),
-            'unique_pages': len(unique_links),
-            'structure': unique_links
-        }
-        
-    except Exception as e:
-        return {
-            'error': str(e),
-            'base_url': url,
-            'structure': []
-        }
+def _sitemap_label(page, depth, index):
+    """Texto curto do nó: âncora do link ou, na falta dela, o fim da URL"""
+    page_text = page['text'].strip()
+    
+    if not page_text or len(page_text) < 3:
+        # Extrai da URL
+        path_parts = page['path'].strip('/').split('/')
+        if path_parts and path_parts[-1]:
+            page_text = path_parts[-1].replace('-', ' ').replace('_', ' ')
+            page_text = ' '.join(word.capitalize() for word in page_text.split())
+        else:
+            page_text = "Home" if depth == 0 else f"Página {index+1}"
+    
+    return page_text
+
+def _aggregate_sitemap_level(pages_at_depth, depth, max_nodes):
+    """Agrupa um nível muito populoso em seções (nível de detalhe reduzido)
+
+    Retorna uma lista de nós; cada nó tem as páginas que representa e a chave
+    de seção usada para ligá-lo ao nível anterior.
+    """
+    if len(pages_at_depth) <= max_nodes:
+        return [{'pages': [page], 'section': None} for page in pages_at_depth]
+    
+    # Agrupa pelo caminho do "pai" (segmentos até o nível anterior)
+    sections = {}
+    for page in pages_at_depth:
+        sections.setdefault(_path_segments(page)[:max(depth - 1, 1)], []).append(page)
+    
+    # Mantém as maiores seções e junta o restante em "Outros"
+    ordered = sorted(sections.items(), key=lambda item: len(item[1]), reverse=True)
+    nodes = [{'pages': members, 'section': section} for section, members in ordered[:max_nodes - 1]]
+    rest = [page for _, members in ordered[max_nodes - 1:] for page in members]
+    if rest:
+        nodes.append({'pages': rest, 'section': None})
+    return nodes
+
+def create_sitemap_visualization(site_structure, max_nodes_per_level=150, webgl_threshold=300, label_limit=12):
+    """Cria visualização profissional do sitemap em tons de cinza
 
-def create_sitemap_visualization(site_structure):
-    """Cria visualização profissional do sitemap em tons de cinza"""
+    Níveis com mais de max_nodes_per_level páginas são agregados por seção, todas
+    as conexões são desenhadas num único trace e, acima de webgl_threshold nós,
+    o gráfico passa a usar Scattergl (WebGL).
+    """
     if not site_structure.get('structure'):
         return None
     
@@ -983,16 +552,15 @@ def create_sitemap_visualization(site_structure):
     # Agrupa por profundidade
     depth_groups = {}
     for page in pages:
-        depth = page['depth']
-        if depth not in depth_groups:
-            depth_groups[depth] = []
-        depth_groups[depth].append(page)
+        depth_groups.setdefault(page['depth'], []).append(page)
     
-    # Limita páginas por nível
-    max_per_level = 12
-    for depth in depth_groups:
-        if len(depth_groups[depth]) > max_per_level:
-            depth_groups[depth] = depth_groups[depth][:max_per_level]
+    # Nível de detalhe: níveis muito grandes viram nós de seção
+    level_nodes = {
+        depth: _aggregate_sitemap_level(pages_at_depth, depth, max_nodes_per_level)
+        for depth, pages_at_depth in depth_groups.items()
+    }
+    total_nodes = sum(len(nodes) for nodes in level_nodes.values())
+    scatter = go.Scattergl if total_nodes > webgl_threshold else go.Scatter
     
     # Cria layout organograma
     fig = go.Figure()
@@ -1003,36 +571,60 @@ def create_sitemap_visualization(site_structure):
     level_height = 150
     max_width = 1200
     
-    for depth in sorted(depth_groups.keys()):
-        pages_at_depth = depth_groups[depth]
+    # Posição de cada caminho (e de cada seção agregada) já desenhado, usada para ligar filhos aos pais
+    anchors = {}
+    section_anchors = {}
+    edge_x, edge_y = [], []
+    
+    for depth in sorted(level_nodes.keys()):
+        nodes = level_nodes[depth]
         color = gray_colors[depth % len(gray_colors)]
         
         # Posicionamento horizontal
-        num_pages = len(pages_at_depth)
-        if num_pages == 1:
+        num_nodes = len(nodes)
+        if num_nodes == 1:
             x_positions = [0]
         else:
-            spacing = max_width / (num_pages + 1)
-            x_positions = [spacing * (i + 1) - max_width/2 for i in range(num_pages)]
+            spacing = max_width / (num_nodes + 1)
+            x_positions = [spacing * (i + 1) - max_width/2 for i in range(num_nodes)]
         
         y_position = -depth * level_height
         
         # Textos limpos
         clean_texts = []
         hover_texts = []
+        marker_sizes = []
+        level_anchors = {}
+        level_sections = {}
         
-        for i, page in enumerate(pages_at_depth):
-            # Extrai texto limpo
-            page_text = page['text'].strip()
+        for i, (node, x) in enumerate(zip(nodes, x_positions)):
+            members = node['pages']
             
-            if not page_text or len(page_text) < 3:
-                # Extrai da URL
-                path_parts = page['path'].strip('/').split('/')
-                if path_parts and path_parts[-1]:
-                    page_text = path_parts[-1].replace('-', ' ').replace('_', ' ')
-                    page_text = ' '.join(word.capitalize() for word in page_text.split())
-                else:
-                    page_text = "Home" if depth == 0 else f"Página {i+1}"
+            if len(members) == 1:
+                page = members[0]
+                page_text = _sitemap_label(page, depth, i)
+                
+                # Hover informativo
+                hover_text = f"<b>{page_text}</b><br>"
+                hover_text += f"URL: {page['url']}<br>"
+                hover_text += f"Nível: {depth}<br>"
+                hover_text += f"Profundidade: {len(_path_segments(page))}"
+                parent_key = _path_segments(page)[:depth - 1] if depth > 0 else None
+                size = 45 if num_nodes <= label_limit else max(8, min(45, 540 / num_nodes))
+            else:
+                section = node['section']
+                page_text = f"/{'/'.join(section)} ({len(members)})" if section else f"Outros ({len(members)})"
+                hover_text = f"<b>{page_text}</b><br>"
+                hover_text += f"Páginas agrupadas: {len(members)}<br>"
+                hover_text += f"Nível: {depth}<br>"
+                hover_text += "Exemplos:<br>" + "<br>".join(page['url'] for page in members[:5])
+                parent_key = section[:depth - 1] if section is not None else (() if depth == 1 else None)
+                size = min(60, 12 + 6 * len(str(len(members))) + len(members) ** 0.5)
+            
+            for page in members:
+                level_anchors[_path_segments(page)] = x
+            if len(members) > 1 and node['section'] is not None:
+                level_sections[node['section']] = x
             
             # Limita texto
             if len(page_text) > 15:
@@ -1041,26 +633,41 @@ def create_sitemap_visualization(site_structure):
                 display_text = page_text
             
             clean_texts.append(display_text)
-            
-            # Hover informativo
-            hover_text = f"<b>{page_text}</b><br>"
-            hover_text += f"URL: {page['url']}<br>"
-            hover_text += f"Nível: {depth}<br>"
-            hover_text += f"Profundidade: {len(page['path'].strip('/').split('/')) if page['path'] != '/' else 0}"
             hover_texts.append(hover_text)
+            marker_sizes.append(size)
+            
+            # Conexão com o nó pai (home para as páginas principais)
+            if depth > 0 and parent_key is not None:
+                parent_anchors = anchors.get(depth - 1, {})
+                parent_x = parent_anchors.get(parent_key)
+                # Pai não desenhado individualmente: usa a seção agregada que o contém
+                parent_sections = section_anchors.get(depth - 1, {})
+                for prefix_len in range(len(parent_key) - 1, 0, -1):
+                    if parent_x is not None:
+                        break
+                    parent_x = parent_sections.get(parent_key[:prefix_len])
+                if parent_x is None and depth == 1 and len(parent_anchors) == 1:
+                    parent_x = next(iter(parent_anchors.values()))
+                if parent_x is not None:
+                    edge_x += [parent_x, x, None]
+                    edge_y += [y_position + level_height, y_position, None]
+        
+        anchors[depth] = level_anchors
+        section_anchors[depth] = level_sections
+        show_labels = num_nodes <= label_limit
         
         # Adiciona nós
-        fig.add_trace(go.Scatter(
+        fig.add_trace(scatter(
             x=x_positions,
             y=[y_position] * len(x_positions),
-            mode='markers+text',
+            mode='markers+text' if show_labels else 'markers',
             marker=dict(
-                size=45,
+                size=marker_sizes,
                 color='white',  # Fundo branco
-                line=dict(width=3, color=color),  # Borda colorida
+                line=dict(width=3 if show_labels else 1, color=color),  # Borda colorida
                 symbol='circle'
             ),
-            text=clean_texts,
+            text=clean_texts if show_labels else None,
             textposition="middle center",
             textfont=dict(
                 size=10, 
@@ -1084,36 +691,23 @@ def create_sitemap_visualization(site_structure):
             xanchor="right"
         )
     
-    # Conexões
-    for depth in sorted(depth_groups.keys())[:-1]:
-        next_depth = depth + 1
-        if next_depth in depth_groups:
-            current_level = depth_groups[depth]
-            next_level = depth_groups[next_depth]
-            
-            current_y = -depth * level_height
-            next_y = -next_depth * level_height
-            
-            # Home para principais
-            if depth == 0 and len(current_level) == 1:
-                home_x = 0
-                next_spacing = max_width / (len(next_level) + 1)
-                
-                for i, _ in enumerate(next_level):
-                    next_x = next_spacing * (i + 1) - max_width/2
-                    
-                    fig.add_trace(go.Scatter(
-                        x=[home_x, next_x],
-                        y=[current_y, next_y],
-                        mode='lines',
-                        line=dict(
-                            color='rgba(105,105,105,0.4)', 
-                            width=2,
-                            dash='dot'
-                        ),
-                        showlegend=False,
-                        hoverinfo='skip'
-                    ))
+    # Conexões: um único trace, com None separando cada segmento
+    if edge_x:
+        fig.add_trace(scatter(
+            x=edge_x,
+            y=edge_y,
+            mode='lines',
+            line=dict(
+                color='rgba(105,105,105,0.4)', 
+                width=2 if total_nodes <= webgl_threshold else 1,
+                dash='dot'
+            ),
+            connectgaps=False,
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+        # As linhas ficam atrás dos nós
+        fig.data = (fig.data[-1],) + fig.data[:-1]
     
     # Layout final
     fig.update_layout(
@@ -1153,102 +747,6 @@ def create_sitemap_visualization(site_structure):
     
     return fig
 
-def analyze_site_strategy(site_structure):
-    """Analisa a estratégia de estrutura do site"""
-    if not site_structure.get('structure'):
-        return "Não foi possível analisar a estrutura do site."
-    
-    pages = site_structure['structure']
-    depth_analysis = {}
-    
-    for page in pages:
-        depth = page['depth']
-        if depth not in depth_analysis:
-            depth_analysis[depth] = []
-        depth_analysis[depth].append(page)
-    
-    insights = []
-    
-    # Análise de profundidade
-    max_depth = max(depth_analysis.keys()) if depth_analysis else 0
-    if max_depth <= 2:
-        insights.append("✅ **Estrutura rasa**: Boa para SEO, fácil navegação")
-    elif max_depth <= 4:
-        insights.append("⚠️ **Estrutura média**: Adequada, mas pode ser otimizada")
-    else:
-        insights.append("❌ **Estrutura muito profunda**: Pode dificultar indexação")
-    
-    return "\n".join(insights)
-
-# ========== FUNÇÕES EXISTENTES ==========
-def get_pagespeed_insights(url_to_check: str) -> dict:
-    if not PSI_API_KEY: return {}
-    insights_data = {"redirected": False}
-    strategies = ["mobile", "desktop"]
-    for strategy in strategies:
-        api_url = f"https://www.googleapis.com/pagespeedonline/v5/runPagespeed?url={url_to_check}&strategy={strategy}&key={PSI_API_KEY}"
-        try:
-            response = requests.get(api_url, timeout=60)
-            response.raise_for_status()
-            data = response.json()
-            final_url = data.get('lighthouseResult', {}).get('finalUrl', url_to_check)
-            insights_data['final_url'] = final_url
-            if url_to_check != final_url: insights_data['redirected'] = True
-            categories = data.get('lighthouseResult', {}).get('categories', {})
-            scores = {f"psi_{category.replace('-', '_')}": int(categories.get(category, {}).get('score', 0) * 100) for category in ['performance', 'accessibility', 'best-practices', 'seo']}
-            insights_data[strategy] = scores
-        except requests.exceptions.RequestException: insights_data[strategy] = {}
-    return insights_data
-
-def check_broken_links(base_url: str, internal_links: list) -> list:
-    broken_links = []
-    headers = {"User-Agent": "Mozilla/5.0"}
-    for link in internal_links[:10]:
-        full_url = urljoin(base_url, link)
-        try:
-            response = requests.head(full_url, headers=headers, timeout=5, allow_redirects=True)
-            if response.status_code >= 400: broken_links.append({"url": full_url, "status": response.status_code})
-        except requests.RequestException: broken_links.append({"url": full_url, "status": "Erro de Conexão"})
-        time.sleep(0.1)
-    return broken_links
-
-def onpage_checks(url):
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, timeout=10, headers=headers)
-        response.raise_for_status()
-    except requests.exceptions.RequestException: return None, [], None
-    
-    soup = BeautifulSoup(response.text, "html.parser")
-    checks = {}
-    
-    title_tag = soup.title
-    checks["title"] = title_tag.string.strip() if title_tag else "N/A"
-    checks["title_length"] = len(checks["title"]) if title_tag else 0
-    
-    meta_desc = soup.find("meta", attrs={"name": "description"})
-    checks["meta_description"] = meta_desc["content"].strip() if meta_desc and meta_desc.get("content") else "N/A"
-    checks["meta_description_length"] = len(checks["meta_description"]) if meta_desc and meta_desc.get("content") else 0
-    
-    checks["h1_count"] = len(soup.find_all("h1"))
-    
-    all_links = soup.find_all("a", href=True)
-    valid_links = [a['href'] for a in all_links if a['href'] and not a['href'].startswith(('#', 'tel:', 'mailto:'))]
-    internal_links = [link for link in valid_links if urlparse(url).netloc in link or link.startswith('/')]
-    checks["links_internos"] = len(internal_links)
-    
-    checks["image_count"] = len(soup.find_all("img"))
-    
-    # Conta imagens sem alt text
-    images = soup.find_all("img")
-    images_sem_alt = [img for img in images if not img.get("alt", "").strip()]
-    checks["images_sem_alt"] = len(images_sem_alt)
-    
-    body_text = soup.find("body").get_text(separator=" ", strip=True) if soup.find("body") else ""
-    checks["word_count"] = len(body_text.split())
-    
-    return checks, internal_links, soup
-
 # ==============================================================================
 # INTERFACE DO STREAMLIT (A "CONSTRUÇÃO" DO APP)
 # ==============================================================================
@@ -1278,761 +776,1230 @@ def show_tool_info():
         ---
         """)
 
-# Sidebar
-with st.sidebar:
-    st.header("⚙️ Configurações de Análise")
-    
-    deep_analysis = st.checkbox("🔍 Análise profunda", value=True,
-                                help="Inclui análise de dados estruturados")
-    
-    extract_structure = st.checkbox("🗺️ Mapear estrutura do site", value=True,
-                                    help="Cria mapa visual da arquitetura do site")
-    
-    content_analysis_enabled = st.checkbox("📝 Análise avançada de conteúdo", value=True,
-                                           help="Análise de legibilidade, estrutura e qualidade do conteúdo")
-    
-    # <-- LINHA CORRIGIDA E MOVIDA PARA O LUGAR CERTO
-    geo_seo_enabled = st.checkbox("🤖 Análise de GEO (Generative Engine Optimization)", value=True,
-                                  help="Otimização para IAs generativas como ChatGPT, Gemini, Claude")
-    
-    max_pages_sitemap = st.slider("Máx. páginas para sitemap", 10, 50, 20,
-                                  help="Limite de páginas para análise de estrutura")
+def show_ai_insights(ai_result):
+    """Exibe as sugestões geradas pela IA para uma página"""
+    if ai_result.get('error'):
+        st.warning(f"Não foi possível gerar os insights de IA: {ai_result['error']}")
+        return
+    
+    insights = ai_result.get('insights', {})
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if insights.get('title_suggestions'):
+            st.markdown("**🏷️ Sugestões de Title:**")
+            for suggestion in insights['title_suggestions']:
+                st.markdown(f"- {suggestion} *({len(suggestion)} caracteres)*")
+        
+        if insights.get('meta_description_suggestions'):
+            st.markdown("**📝 Sugestões de Meta Description:**")
+            for suggestion in insights['meta_description_suggestions']:
+                st.markdown(f"- {suggestion} *({len(suggestion)} caracteres)*")
+    
+    with col2:
+        if insights.get('primary_keyword'):
+            st.metric("🔑 Palavra-chave Principal", insights['primary_keyword'])
+        if insights.get('secondary_keywords'):
+            st.markdown("**Secundárias:** " + ", ".join(insights['secondary_keywords']))
+        
+        if insights.get('content_gaps'):
+            st.markdown("**🧩 Lacunas de Conteúdo:**")
+            for gap in insights['content_gaps']:
+                st.markdown(f"- {gap}")
     
-    st.divider()
-    st.markdown("### 📊 Métricas Ideais")
-    st.info("""
-    **Title:** 30-60 caracteres  
-    **Meta Description:** 150-160 caracteres  
-    **H1:** Apenas 1 por página  
-    **Conteúdo:** Mínimo 300 palavras  
-    **Performance:** Acima de 80  
-    **Legibilidade:** Score Flesch > 60  
-    **GEO (IA):** FAQ, definições, exemplos e estrutura para IAs
-    """)
-
-st.title("🔭 Auditoria de SEO e GEO On-Page")
-st.markdown("Análise completa de SEO tradicional e otimização para IAs generativas (GEO - Generative Engine Optimization).")
-
-# Mostra informações apenas se análise não foi iniciada
-show_tool_info()
-
-st.subheader("🚀 Análise Principal")
-url_principal = st.text_input("Insira a URL do seu site:", key="url_principal",
-                              placeholder="https://seusite.com.br")
-
-# Validação em tempo real
-if url_principal:
-    is_valid, validation_result = validate_url(url_principal)
-    if not is_valid:
-        st.error(f"❌ {validation_result}")
-    else:
-        if validation_result != url_principal:
-            st.info(f"✅ URL corrigida para: {validation_result}")
-            url_principal = validation_result
+    if insights.get('headings_feedback'):
+        st.markdown(f"**🏗️ Estrutura de Cabeçalhos:** {insights['headings_feedback']}")
 
-st.subheader("🏆 Análise Competitiva (Opcional)")
-competidores_raw = st.text_area("URLs dos concorrentes (uma por linha):", 
-                                 key="url_competidores", height=100,
-                                 placeholder="https://concorrente1.com\nhttps://concorrente2.com")
+# ========== DASHBOARD DA AUDITORIA ==========
+def render_audit_results(result):
+    """Desenha o dashboard a partir do resultado do job
 
-if st.button("🛰️ Iniciar Análise Completa", type="primary"):
-    if not url_principal:
-        st.error("Por favor, insira a URL do seu site.")
-    else:
-        # Marca que análise foi iniciada
-        st.session_state.analysis_started = True
+    Chamada a cada rerun e também enquanto o job roda, com os resultados parciais:
+    cada seção aparece assim que seus dados ficam prontos, e as etapas ainda em
+    andamento (PSI, links, estrutura, concorrentes) ficam como "aguardando".
+    """
+    options = result['options']
+    url_principal = options['url']
+    if 'onpage' not in result:
+        return
+    
+    # On-page, conteúdo e GEO ficam no job como registros compactos
+    onpage_principal = as_dict(result['onpage'])
+    structured_data = result['structured']
+    site_structure = result.get('site_structure')
+    content_analysis = as_dict(result['content'])
+    geo_analysis = as_dict(result['geo'])
+    ai_page = result['ai_page']
+    psi_principal = result.get('psi')
+    broken_links_principal = result.get('broken_links')
+    image_audit_principal = result.get('images')
+    lab_principal = result.get('lab')
+    overall_score = result.get('score')
+    audit_trace = result.get('trace')
+    
+    if overall_score is not None:
+        st.success("✅ Análise principal concluída!")
+    
+    # --- DASHBOARD PRINCIPAL ---
+    st.divider()
+    st.subheader(f"📊 Dashboard: {urlparse(url_principal).netloc}")
+    if result.get('reused'):
+        st.caption(f"♻️ Reaproveitado de auditorias dos últimos {SHARED_CACHE_TTL_SECONDS / 60:.0f} min neste servidor: "
+                   f"{', '.join(result['reused'])}")
+    
+    # === SEÇÃO DE ANÁLISE DE CONTEÚDO ===
+    if content_analysis:
+        quality_data = content_analysis.get('content_quality', {})
+        quality_score = quality_data.get('quality_score', 0)
         
-        # Validação final
-        is_valid, url_principal = validate_url(url_principal)
-        if not is_valid:
-            st.error(f"URL inválida: {url_principal}")
-            st.stop()
-        
-        # --- ANÁLISE PRINCIPAL ---
-        with st.spinner(f"🔍 Analisando {urlparse(url_principal).netloc}..."):
-            try:
-                onpage_principal, links_principais, soup_principal = onpage_checks(url_principal)
-                if onpage_principal is None:
-                    st.error(f"Não foi possível analisar {url_principal}")
-                    st.stop()
-                
-                # Análises adicionais
-                structured_data = {}
-                site_structure = {}
-                content_analysis = {}
-                geo_analysis = {}
-                
-                if deep_analysis:
-                    structured_data = analyze_structured_data(soup_principal)
-                
-                if extract_structure:
-                    with st.spinner("🗺️ Mapeando estrutura do site..."):
-                        site_structure = extract_site_structure(url_principal, max_pages=max_pages_sitemap)
-                
-                if content_analysis_enabled:
-                    with st.spinner("📝 Analisando qualidade do conteúdo..."):
-                        content_analysis = analyze_content_advanced(soup_principal, url_principal)
+        # Só exibe se houver dados relevantes
+        if quality_score > 0:
+            st.markdown("#### 📝 Análise Avançada de Conteúdo")
+            
+            # Dashboard de conteúdo
+            content_dashboard = create_content_quality_dashboard(content_analysis)
+            if content_dashboard:
+                st.plotly_chart(content_dashboard, use_container_width=True)
+            
+            # Métricas detalhadas
+            col1, col2, col3, col4 = st.columns(4)
+            
+            readability_data = content_analysis.get('readability', {})
+            headings_data = content_analysis.get('headings_analysis', {})
+            
+            with col1:
+                st.metric("🎯 Score de Qualidade", f"{quality_score}/100")
+                word_count = quality_data.get('total_words', 0)
+                st.metric("📝 Total de Palavras", word_count)
+            
+            with col2:
+                flesch_score = readability_data.get('flesch_score', 'N/A')
+                if isinstance(flesch_score, (int, float)) and flesch_score > 0:
+                    st.metric("📖 Legibilidade (Flesch)", f"{flesch_score:.1f}")
+                else:
+                    st.metric("📖 Legibilidade", "N/A")
                 
-                if geo_seo_enabled:
-                    with st.spinner("🤖 Analisando GEO para IAs..."):
-                        geo_analysis = analyze_geo_ai_optimization(soup_principal, url_principal)
+                level = readability_data.get('level', 'N/A')
+                level_color = readability_data.get('level_color', '#696969')
+                if level != 'N/A':
+                    st.markdown(f"<span style='color: {level_color}'>**{level}**</span>", unsafe_allow_html=True)
+            
+            with col3:
+                total_headings = headings_data.get('total_headings', 0)
+                st.metric("🏷️ Total de Headings", total_headings)
                 
-                psi_principal = get_pagespeed_insights(url_principal)
-                broken_links_principal = check_broken_links(url_principal, links_principais)
+                h1_count = headings_data.get('h1_count', 0)
+                h1_status = "✅" if h1_count == 1 else "⚠️" if h1_count > 1 else "❌"
+                st.metric("H1 Count", f"{h1_count} {h1_status}")
+            
+            with col4:
+                paragraph_count = quality_data.get('paragraph_count', 0)
+                st.metric("📄 Parágrafos", paragraph_count)
                 
-            except Exception as e:
-                st.error(f"Erro na análise: {str(e)}")
-                st.stop()
-        
-        st.success("✅ Análise principal concluída!")
-        
-        # --- DASHBOARD PRINCIPAL ---
-        st.divider()
-        st.subheader(f"📊 Dashboard: {urlparse(url_principal).netloc}")
-        
-        # Calcula score geral
-        overall_score = calculate_overall_seo_score(onpage_principal, psi_principal, {}, structured_data)
-        
-        # === SEÇÃO DE ANÁLISE DE CONTEÚDO ===
-        if content_analysis_enabled and content_analysis:
-            quality_data = content_analysis.get('content_quality', {})
-            quality_score = quality_data.get('quality_score', 0)
+                avg_paragraph = quality_data.get('avg_paragraph_length', 0)
+                st.metric("📏 Média Palavras/Parágrafo", f"{avg_paragraph:.1f}")
+            
+            # Insights de conteúdo
+            content_insights = []
             
-            # Só exibe se houver dados relevantes
+            if quality_score >= 80:
+                content_insights.append("🏆 **Excelente qualidade de conteúdo!**")
+            elif quality_score >= 60:
+                content_insights.append("👍 **Boa qualidade, com espaço para melhorias**")
+            else:
+                content_insights.append("⚠️ **Conteúdo precisa de otimização**")
+            
+            if isinstance(flesch_score, (int, float)):
+                if flesch_score < 30:
+                    content_insights.append("📚 **Texto muito complexo** - Simplifique frases")
+                elif flesch_score > 80:
+                    content_insights.append("📖 **Texto muito simples** - Considere mais profundidade")
+            
+            hierarchy_issues = headings_data.get('hierarchy_issues', [])
+            if hierarchy_issues:
+                for issue in hierarchy_issues:
+                    content_insights.append(f"🏷️ **Estrutura:** {issue}")
+            
+            if content_insights:
+                with st.expander("💡 Insights de Conteúdo"):
+                    for insight in content_insights:
+                        st.markdown(f"- {insight}")
+            
+            # Tabela detalhada de análise de conteúdo
             if quality_score > 0:
-                st.markdown("#### 📝 Análise Avançada de Conteúdo")
-                
-                # Dashboard de conteúdo
-                content_dashboard = create_content_quality_dashboard(content_analysis)
-                if content_dashboard:
-                    st.plotly_chart(content_dashboard, use_container_width=True)
-                
-                # Métricas detalhadas
-                col1, col2, col3, col4 = st.columns(4)
-                
-                readability_data = content_analysis.get('readability', {})
-                headings_data = content_analysis.get('headings_analysis', {})
-                
-                with col1:
-                    st.metric("🎯 Score de Qualidade", f"{quality_score}/100")
-                    word_count = quality_data.get('total_words', 0)
-                    st.metric("📝 Total de Palavras", word_count)
-                
-                with col2:
-                    flesch_score = readability_data.get('flesch_score', 'N/A')
-                    if isinstance(flesch_score, (int, float)) and flesch_score > 0:
-                        st.metric("📖 Legibilidade (Flesch)", f"{flesch_score:.1f}")
-                    else:
-                        st.metric("📖 Legibilidade", "N/A")
-                    
-                    level = readability_data.get('level', 'N/A')
-                    level_color = readability_data.get('level_color', '#696969')
-                    if level != 'N/A':
-                        st.markdown(f"<span style='color: {level_color}'>**{level}**</span>", unsafe_allow_html=True)
-                
-                with col3:
-                    total_headings = headings_data.get('total_headings', 0)
-                    st.metric("🏷️ Total de Headings", total_headings)
+                with st.expander("📋 Tabela Detalhada de Análise de Conteúdo"):
+                    semantic_data = content_analysis.get('semantic_analysis', {})
+                    top_words = semantic_data.get('top_keywords', {})
                     
-                    h1_count = headings_data.get('h1_count', 0)
-                    h1_status = "✅" if h1_count == 1 else "⚠️" if h1_count > 1 else "❌"
-                    st.metric("H1 Count", f"{h1_count} {h1_status}")
-                
-                with col4:
-                    paragraph_count = quality_data.get('paragraph_count', 0)
-                    st.metric("📄 Parágrafos", paragraph_count)
-                    
-                    avg_paragraph = quality_data.get('avg_paragraph_length', 0)
-                    st.metric("📏 Média Palavras/Parágrafo", f"{avg_paragraph:.1f}")
-                
-                # Insights de conteúdo
-                content_insights = []
-                
-                if quality_score >= 80:
-                    content_insights.append("🏆 **Excelente qualidade de conteúdo!**")
-                elif quality_score >= 60:
-                    content_insights.append("👍 **Boa qualidade, com espaço para melhorias**")
-                else:
-                    content_insights.append("⚠️ **Conteúdo precisa de otimização**")
-                
-                if isinstance(flesch_score, (int, float)):
-                    if flesch_score < 30:
-                        content_insights.append("📚 **Texto muito complexo** - Simplifique frases")
-                    elif flesch_score > 80:
-                        content_insights.append("📖 **Texto muito simples** - Considere mais profundidade")
-                
-                hierarchy_issues = headings_data.get('hierarchy_issues', [])
-                if hierarchy_issues:
-                    for issue in hierarchy_issues:
-                        content_insights.append(f"🏷️ **Estrutura:** {issue}")
-                
-                if content_insights:
-                    with st.expander("💡 Insights de Conteúdo"):
-                        for insight in content_insights:
-                            st.markdown(f"- {insight}")
-                
-                # Tabela detalhada de análise de conteúdo
-                if quality_score > 0:
-                    with st.expander("📋 Tabela Detalhada de Análise de Conteúdo"):
-                        semantic_data = content_analysis.get('semantic_analysis', {})
-                        top_words = semantic_data.get('top_keywords', {})
+                    if top_words:
+                        # Cria DataFrame com top palavras
+                        df_words = pd.DataFrame([
+                            {"Palavra": palavra, "Frequência": freq} 
+                            for palavra, freq in list(top_words.items())[:10]
+                        ])
+                        df_words.index = range(len(df_words))  # Reseta índice
                         
-                        if top_words:
-                            # Cria DataFrame com top palavras
-                            df_words = pd.DataFrame([
-                                {"Palavra": palavra, "Frequência": freq} 
-                                for palavra, freq in list(top_words.items())[:10]
-                            ])
-                            df_words.index = range(len(df_words))  # Reseta índice
-                            
-                            col1, col2 = st.columns(2)
+                        col1, col2 = st.columns(2)
+                        
+                        with col1:
+                            st.markdown("**🔑 Top 10 Palavras-chave:**")
+                            st.dataframe(df_words, use_container_width=True, hide_index=False)
+                        
+                        with col2:
+                            # Métricas adicionais
+                            vocab_richness = semantic_data.get('vocabulary_richness', 0)
+                            st.metric("📊 Riqueza Vocabular", f"{vocab_richness:.2%}")
                             
-                            with col1:
-                                st.markdown("**🔑 Top 10 Palavras-chave:**")
-                                st.dataframe(df_words, use_container_width=True, hide_index=False)
+                            duplication = quality_data.get('duplication_ratio', 0)
+                            st.metric("📄 Taxa de Duplicação", f"{duplication:.1f}%")
                             
-                            with col2:
-                                # Métricas adicionais
-                                vocab_richness = semantic_data.get('vocabulary_richness', 0)
-                                st.metric("📊 Riqueza Vocabular", f"{vocab_richness:.2%}")
-                                
-                                duplication = quality_data.get('duplication_ratio', 0)
-                                st.metric("📄 Taxa de Duplicação", f"{duplication:.1f}%")
-                                
-                                avg_sentence = readability_data.get('avg_sentence_length', 0)
-                                st.metric("📏 Palavras por Frase", f"{avg_sentence:.1f}")
-                
-                st.divider()
+                            avg_sentence = readability_data.get('avg_sentence_length', 0)
+                            st.metric("📏 Palavras por Frase", f"{avg_sentence:.1f}")
+            
+            st.divider()
+    
+    # === SEÇÃO DE ANÁLISE GEO (IA) ===
+    if geo_analysis:
+        geo_score = geo_analysis.get('geo_score', 0)
         
-        # === SEÇÃO DE ANÁLISE GEO (IA) ===
-        if geo_seo_enabled and geo_analysis:
-            geo_score = geo_analysis.get('geo_score', 0)
+        if geo_score > 0:
+            st.markdown("#### 🤖 Análise de GEO - Generative Engine Optimization")
+            
+            # Dashboard GEO
+            geo_dashboard = create_geo_ai_dashboard(geo_analysis)
+            if geo_dashboard:
+                st.plotly_chart(geo_dashboard, use_container_width=True)
+            
+            # Métricas GEO
+            col1, col2, col3, col4 = st.columns(4)
+            
+            content_structure = geo_analysis.get('content_structure', {})
+            factual_content = geo_analysis.get('factual_content', {})
+            ai_format = geo_analysis.get('ai_friendly_format', {})
+            authority_signals = geo_analysis.get('authority_signals', {})
             
-            if geo_score > 0:
-                st.markdown("#### 🤖 Análise de GEO - Generative Engine Optimization")
+            with col1:
+                st.metric("🎯 Score GEO (IA)", f"{geo_score}/100")
                 
-                # Dashboard GEO
-                geo_dashboard = create_geo_ai_dashboard(geo_analysis)
-                if geo_dashboard:
-                    st.plotly_chart(geo_dashboard, use_container_width=True)
+                faq_count = content_structure.get('faq_indicators', 0)
+                st.metric("❓ Indicadores FAQ", faq_count)
+            
+            with col2:
+                definitions = ai_format.get('definitions', 0)
+                st.metric("📖 Definições", definitions)
                 
-                # Métricas GEO
-                col1, col2, col3, col4 = st.columns(4)
+                examples = ai_format.get('examples', 0)
+                st.metric("💡 Exemplos", examples)
+            
+            with col3:
+                factual_indicators = factual_content.get('factual_indicators', 0)
+                st.metric("📊 Indicadores Factuais", factual_indicators)
                 
-                content_structure = geo_analysis.get('content_structure', {})
-                factual_content = geo_analysis.get('factual_content', {})
-                ai_format = geo_analysis.get('ai_friendly_format', {})
-                authority_signals = geo_analysis.get('authority_signals', {})
+                auth_links = factual_content.get('authoritative_links', 0)
+                st.metric("🔗 Links Autoritários", auth_links)
+            
+            with col4:
+                author_mentioned = "✅" if authority_signals.get('author_mentioned') else "❌"
+                st.metric("👤 Autor Mencionado", author_mentioned)
+                
+                article_schema = "✅" if authority_signals.get('article_schema') else "❌"
+                st.metric("📰 Schema Article", article_schema)
+            
+            # Insights GEO para IA
+            geo_insights = []
+            
+            if geo_score >= 80:
+                geo_insights.append("🏆 **Excelente otimização para IAs generativas!**")
+            elif geo_score >= 60:
+                geo_insights.append("👍 **Bom conteúdo para IA, pode melhorar**")
+            else:
+                geo_insights.append("⚠️ **Conteúdo precisa ser otimizado para IAs**")
+            
+            if faq_count == 0:
+                geo_insights.append("❓ **Adicione formato FAQ** - IAs preferem perguntas e respostas claras")
+            
+            if definitions == 0:
+                geo_insights.append("📖 **Inclua definições claras** - Essencial para compreensão das IAs")
+            
+            if factual_indicators < 2:
+                geo_insights.append("📊 **Adicione mais dados factuais** - IAs valorizam informações verificáveis")
+            
+            if auth_links == 0:
+                geo_insights.append("🔗 **Inclua fontes autoritárias** - Aumenta credibilidade para IAs")
+            
+            if not authority_signals.get('author_mentioned'):
+                geo_insights.append("👤 **Mencione autoria** - IAs consideram autoridade do autor")
+            
+            if examples == 0:
+                geo_insights.append("💡 **Adicione exemplos práticos** - Facilita compreensão das IAs")
+            
+            # Análise de estrutura hierárquica
+            hierarchy_score = content_structure.get('hierarchy_score', 0)
+            if hierarchy_score < 70:
+                geo_insights.append("🏗️ **Melhore hierarquia de headings** - IAs seguem estrutura lógica")
+            
+            if geo_insights:
+                with st.expander("💡 Insights de GEO para IAs"):
+                    for insight in geo_insights:
+                        st.markdown(f"- {insight}")
+            
+            # Detalhes técnicos GEO
+            with st.expander("🔧 Detalhes Técnicos GEO"):
+                col1, col2 = st.columns(2)
                 
                 with col1:
-                    st.metric("🎯 Score GEO (IA)", f"{geo_score}/100")
+                    st.markdown("**📋 Estrutura de Conteúdo:**")
+                    st.write(f"• Listas: {content_structure.get('lists_count', 0)}")
+                    st.write(f"• Tabelas: {content_structure.get('tables_count', 0)}")
+                    st.write(f"• Headings: {content_structure.get('headings_count', 0)}")
+                    st.write(f"• Hierarquia: {hierarchy_score:.1f}%")
                     
-                    faq_count = content_structure.get('faq_indicators', 0)
-                    st.metric("❓ Indicadores FAQ", faq_count)
+                    st.markdown("**🤖 Formato Amigável para IA:**")
+                    st.write(f"• Comparações: {ai_format.get('comparisons', 0)}")
+                    st.write(f"• Instruções passo-a-passo: {ai_format.get('step_by_step', 0)}")
                 
                 with col2:
-                    definitions = ai_format.get('definitions', 0)
-                    st.metric("📖 Definições", definitions)
+                    st.markdown("**📊 Conteúdo Factual:**")
+                    st.write(f"• Citações: {factual_content.get('citations', 0)}")
+                    st.write(f"• Palavras: {authority_signals.get('word_count', 0)}")
                     
-                    examples = ai_format.get('examples', 0)
-                    st.metric("💡 Exemplos", examples)
-                
-                with col3:
-                    factual_indicators = factual_content.get('factual_indicators', 0)
-                    st.metric("📊 Indicadores Factuais", factual_indicators)
+                    st.markdown("**🏛️ Sinais de Autoridade:**")
+                    st.write(f"• Data mencionada: {'✅' if authority_signals.get('date_mentioned') else '❌'}")
+                    st.write(f"• Schema Article: {'✅' if authority_signals.get('article_schema') else '❌'}")
+            
+            # GEO de todas as páginas rastreadas (chega junto com a estrutura do site)
+            site_geo = (site_structure or {}).get('geo')
+            if site_geo is None and site_structure is None and options.get('geo_site') and options['extract_structure']:
+                st.caption("⏳ Calculando o GEO das páginas rastreadas...")
+            elif site_geo is not None and site_geo.page_count > 1:
+                geo_summary = site_geo.summary()
+                with st.expander(f"🌐 GEO do Site ({geo_summary['pages']} páginas rastreadas)"):
+                    score_p = geo_summary['percentiles']['geo_score']
+                    missing = geo_summary['missing_share']
+                    col_g1, col_g2, col_g3, col_g4 = st.columns(4)
+                    with col_g1:
+                        st.metric("🎯 Score GEO Mediano", f"{score_p[2]:.0f}/100",
+                                  help=f"Média {geo_summary['mean_score']} · 10% das páginas abaixo de {score_p[0]:.0f}")
+                    with col_g2:
+                        st.metric("📰 Sem Schema Article", f"{missing['article_schema']:.0%}")
+                    with col_g3:
+                        st.metric("👤 Sem Autor", f"{missing['author_mentioned']:.0%}")
+                    with col_g4:
+                        st.metric("📅 Sem Data", f"{missing['date_mentioned']:.0%}",
+                                  help=f"{missing['all']:.0%} das páginas não têm nenhum dos três sinais")
                     
-                    auth_links = factual_content.get('authoritative_links', 0)
-                    st.metric("🔗 Links Autoritários", auth_links)
-                
-                with col4:
-                    author_mentioned = "✅" if authority_signals.get('author_mentioned') else "❌"
-                    st.metric("👤 Autor Mencionado", author_mentioned)
+                    st.plotly_chart(create_geo_site_chart(site_geo), use_container_width=True)
                     
-                    article_schema = "✅" if authority_signals.get('article_schema') else "❌"
-                    st.metric("📰 Schema Article", article_schema)
-                
-                # Insights GEO para IA
-                geo_insights = []
-                
-                if geo_score >= 80:
-                    geo_insights.append("🏆 **Excelente otimização para IAs generativas!**")
-                elif geo_score >= 60:
-                    geo_insights.append("👍 **Bom conteúdo para IA, pode melhorar**")
-                else:
-                    geo_insights.append("⚠️ **Conteúdo precisa ser otimizado para IAs**")
-                
-                if faq_count == 0:
-                    geo_insights.append("❓ **Adicione formato FAQ** - IAs preferem perguntas e respostas claras")
-                
-                if definitions == 0:
-                    geo_insights.append("📖 **Inclua definições claras** - Essencial para compreensão das IAs")
-                
-                if factual_indicators < 2:
-                    geo_insights.append("📊 **Adicione mais dados factuais** - IAs valorizam informações verificáveis")
-                
-                if auth_links == 0:
-                    geo_insights.append("🔗 **Inclua fontes autoritárias** - Aumenta credibilidade para IAs")
-                
-                if not authority_signals.get('author_mentioned'):
-                    geo_insights.append("👤 **Mencione autoria** - IAs consideram autoridade do autor")
-                
-                if examples == 0:
-                    geo_insights.append("💡 **Adicione exemplos práticos** - Facilita compreensão das IAs")
-                
-                # Análise de estrutura hierárquica
-                hierarchy_score = content_structure.get('hierarchy_score', 0)
-                if hierarchy_score < 70:
-                    geo_insights.append("🏗️ **Melhore hierarquia de headings** - IAs seguem estrutura lógica")
-                
-                if geo_insights:
-                    with st.expander("💡 Insights de GEO para IAs"):
-                        for insight in geo_insights:
-                            st.markdown(f"- {insight}")
-                
-                # Detalhes técnicos GEO
-                with st.expander("🔧 Detalhes Técnicos GEO"):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.markdown("**📋 Estrutura de Conteúdo:**")
-                        st.write(f"• Listas: {content_structure.get('lists_count', 0)}")
-                        st.write(f"• Tabelas: {content_structure.get('tables_count', 0)}")
-                        st.write(f"• Headings: {content_structure.get('headings_count', 0)}")
-                        st.write(f"• Hierarquia: {hierarchy_score:.1f}%")
-                        
-                        st.markdown("**🤖 Formato Amigável para IA:**")
-                        st.write(f"• Comparações: {ai_format.get('comparisons', 0)}")
-                        st.write(f"• Instruções passo-a-passo: {ai_format.get('step_by_step', 0)}")
+                    st.markdown("**📊 Distribuição por Página:**")
+                    indicator_labels = {
+                        'geo_score': "Score GEO", 'word_count': "Palavras", 'faq_indicators': "Indicadores FAQ",
+                        'definitions': "Definições", 'factual_indicators': "Indicadores Factuais",
+                        'authoritative_links': "Links Autoritários", 'hierarchy_score': "Hierarquia (%)",
+                    }
+                    st.dataframe(pd.DataFrame(
+                        [geo_summary['percentiles'][name] for name in indicator_labels],
+                        index=list(indicator_labels.values()),
+                        columns=[f"p{q}" for q in GEO_PERCENTILES]
+                    ), use_container_width=True)
                     
-                    with col2:
-                        st.markdown("**📊 Conteúdo Factual:**")
-                        st.write(f"• Citações: {factual_content.get('citations', 0)}")
-                        st.write(f"• Palavras: {authority_signals.get('word_count', 0)}")
-                        
-                        st.markdown("**🏛️ Sinais de Autoridade:**")
-                        st.write(f"• Data mencionada: {'✅' if authority_signals.get('date_mentioned') else '❌'}")
-                        st.write(f"• Schema Article: {'✅' if authority_signals.get('article_schema') else '❌'}")
+                    st.markdown("**⚠️ Páginas com Menor Score GEO:**")
+                    signal_labels = {'article_schema': "Schema Article", 'author_mentioned': "Autor", 'date_mentioned': "Data"}
+                    st.dataframe(pd.DataFrame([{
+                        'URL': page['url'],
+                        'Score GEO': page['geo_score'],
+                        'Palavras': page['word_count'],
+                        'Sinais Ausentes': ", ".join(signal_labels[name] for name in page['missing']) or "—",
+                    } for page in geo_summary['worst']]), use_container_width=True, hide_index=True)
+            
+            st.divider()
+    
+    # === SEÇÃO DE INSIGHTS DE IA ===
+    if ai_page:
+        st.markdown("#### ✨ Insights de IA (Gemini)")
+        ai_result = result.get('ai_result')
+        if ai_result is None:
+            # Resposta ainda em streaming: mostra o que já chegou
+            show_ai_insights({'insights': result.get('ai_partial', {})})
+            st.caption("⏳ Gerando insights...")
+        else:
+            show_ai_insights(ai_result)
+            cache_stats = get_insights_cache().stats()
+            origin = "♻️ Resposta do cache" if ai_result.get('cached') else f"⏱️ Gerado em {ai_result.get('elapsed')}s"
+            st.caption(f"{origin} · Cache de IA: {cache_stats['entries']} páginas, {cache_stats['hit_rate']:.0%} de acertos")
+        st.divider()
+    
+    # === SEÇÃO DE SITEMAP ===
+    if site_structure is None and options['extract_structure']:
+        st.markdown("#### 🗺️ Mapa da Estrutura do Site")
+        st.info("⏳ Mapeando a estrutura do site...")
+        st.divider()
+    elif site_structure and site_structure.get('structure'):
+        st.markdown("#### 🗺️ Mapa da Estrutura do Site")
+        
+        col_info1, col_info2, col_info3 = st.columns(3)
+        with col_info1:
+            st.metric("📄 Páginas Encontradas", site_structure.get('unique_pages', 0))
+        with col_info2:
+            st.metric("🔗 Total de Links", site_structure.get('total_links_found', 0))
+        with col_info3:
+            max_depth = max([page['depth'] for page in site_structure['structure']]) if site_structure['structure'] else 0
+            st.metric("📏 Profundidade Máxima", max_depth)
+        
+        # Visualização do sitemap
+        sitemap_fig = create_sitemap_visualization(site_structure)
+        if sitemap_fig:
+            st.plotly_chart(sitemap_fig, use_container_width=True)
+        
+        # Análise estratégica
+        strategy_insights = analyze_site_strategy(site_structure)
+        if strategy_insights:
+            st.markdown("**💡 Insights da Estrutura:**")
+            st.markdown(strategy_insights)
+        
+        # Grafo de links internos (PageRank, graus e profundidade de clique)
+        link_graph = site_structure.get('link_graph')
+        if link_graph and link_graph.edge_count > 0:
+            with st.expander("🕸️ Grafo de Links Internos"):
+                df_graph = link_graph.to_frame(root_url=url_principal)
+                
+                col_g1, col_g2, col_g3, col_g4 = st.columns(4)
+                with col_g1:
+                    st.metric("🧭 Páginas Rastreadas", site_structure.get('pages_crawled', 0))
+                with col_g2:
+                    st.metric("🔗 Arestas", link_graph.edge_count)
+                with col_g3:
+                    if site_structure.get('sitemap_urls'):
+                        st.metric("👻 Páginas Órfãs", len(link_graph.orphan_pages(root_url=url_principal)),
+                                  help=f"Páginas do sitemap.xml ({site_structure['sitemap_urls']} URLs) sem links vindos das páginas rastreadas")
+                    else:
+                        st.metric("👻 Páginas Órfãs", "—", help="Sem sitemap.xml não há lista de páginas para comparar com os links")
+                with col_g4:
+                    reachable = df_graph[df_graph['click_depth'] >= 0]['click_depth']
+                    st.metric("🖱️ Profundidade de Clique Máx.", int(reachable.max()) if not reachable.empty else 0)
                 
-                st.divider()
+                st.markdown("**🏆 Páginas com maior PageRank interno:**")
+                st.dataframe(df_graph.sort_values('pagerank', ascending=False).head(10).rename(columns={
+                    "url": "URL",
+                    "pagerank": "PageRank",
+                    "in_degree": "Links Recebidos",
+                    "out_degree": "Links Enviados",
+                    "click_depth": "Cliques desde a Home"
+                }), use_container_width=True, hide_index=True)
         
-        # === SEÇÃO DE SITEMAP ===
-        if site_structure and site_structure.get('structure'):
-            st.markdown("#### 🗺️ Mapa da Estrutura do Site")
-            
-            col_info1, col_info2, col_info3 = st.columns(3)
-            with col_info1:
-                st.metric("📄 Páginas Encontradas", site_structure.get('unique_pages', 0))
-            with col_info2:
-                st.metric("🔗 Total de Links", site_structure.get('total_links_found', 0))
-            with col_info3:
-                max_depth = max([page['depth'] for page in site_structure['structure']]) if site_structure['structure'] else 0
-                st.metric("📏 Profundidade Máxima", max_depth)
+        # CSS/JS/fontes das páginas rastreadas (cada recurso compartilhado é baixado uma vez)
+        subresources = site_structure.get('subresources')
+        if subresources and subresources['unique']:
+            with st.expander("📦 CSS e JS Compartilhados"):
+                col_s1, col_s2, col_s3 = st.columns(3)
+                with col_s1:
+                    st.metric("📦 Recursos Distintos", subresources['unique'])
+                with col_s2:
+                    st.metric("⚖️ CSS/JS por Página", f"{subresources['avg_page_bytes'] / 1024:.0f} KB")
+                with col_s3:
+                    st.metric("⬇️ Baixados", f"{subresources['unique_bytes'] / 1024:.0f} KB",
+                              help=f"As páginas somam {subresources['pages_bytes'] / 1024:.0f} KB; os recursos repetidos vêm do cache")
+                st.dataframe(pd.DataFrame([{
+                    'Recurso': asset['url'],
+                    'Tipo': asset['type'].upper(),
+                    'Páginas': asset['pages'],
+                    'Peso (KB)': round(asset['bytes'] / 1024, 1) if asset['bytes'] else None,
+                } for asset in subresources['shared']]), use_container_width=True, hide_index=True)
+        
+        st.divider()
+    
+    # Primeira linha: Score geral e métricas principais
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    
+    with col1:
+        if overall_score is None:
+            st.info("⏳ Score de SEO aguardando o PageSpeed Insights...")
+        elif overall_score > 0:
+            fig_score = create_seo_score_gauge(overall_score, "Score Geral de SEO")
+            if fig_score:
+                st.plotly_chart(fig_score, use_container_width=True)
+        else:
+            st.info("📊 Score de SEO não disponível")
+    
+    with col2:
+        st.metric("📝 Palavras", onpage_principal.get("word_count", 0))
+        st.metric("🖼️ Imagens", onpage_principal.get("image_count", 0))
+    
+    with col3:
+        st.metric("🔗 Links Internos", onpage_principal.get("links_internos", 0))
+        st.metric("❌ Imgs sem Alt", onpage_principal.get("images_sem_alt", 0))
+    
+    with col4:
+        if psi_principal is None and lab_principal is None:
+            st.metric("📱 Performance", "⏳")
+        else:
+            # "~" indica a estimativa local, usada quando o PSI não mediu
+            st.metric("📱 Performance", performance_label(psi_principal, lab_principal))
+        
+        if broken_links_principal is None:
+            st.metric("🔗 Links Quebrados", "⏳")
+        elif broken_links_principal:
+            st.metric("🔗 Links Quebrados", len(broken_links_principal), delta_color="inverse")
+        else:
+            st.metric("🔗 Links Quebrados", "0 ✅")
+    
+    # Performance detalhada
+    if psi_principal:
+        mobile_perf = psi_principal.get('mobile', {}).get('psi_performance', 0)
+        desktop_perf = psi_principal.get('desktop', {}).get('psi_performance', 0)
+        
+        if mobile_perf > 0 or desktop_perf > 0:
+            st.markdown("#### 🚀 Performance Detalhada")
+            col1, col2 = st.columns(2)
             
-            # Visualização do sitemap
-            sitemap_fig = create_sitemap_visualization(site_structure)
-            if sitemap_fig:
-                st.plotly_chart(sitemap_fig, use_container_width=True)
+            with col1:
+                st.markdown("**📱 Mobile**")
+                mobile_data = psi_principal.get('mobile', {})
+                perf = mobile_data.get('psi_performance', 0)
+                seo = mobile_data.get('psi_seo', 0)
+                
+                if perf > 0:
+                    fig_mobile = create_seo_score_gauge(perf, "Performance Mobile")
+                    if fig_mobile:
+                        st.plotly_chart(fig_mobile, use_container_width=True)
+                if seo > 0:
+                    st.metric("SEO Score", f"{seo}/100")
             
-            # Análise estratégica
-            strategy_insights = analyze_site_strategy(site_structure)
-            if strategy_insights:
-                st.markdown("**💡 Insights da Estrutura:**")
-                st.markdown(strategy_insights)
+            with col2:
+                st.markdown("**🖥️ Desktop**")
+                desktop_data = psi_principal.get('desktop', {})
+                perf_desk = desktop_data.get('psi_performance', 0)
+                seo_desk = desktop_data.get('psi_seo', 0)
+                
+                if perf_desk > 0:
+                    fig_desktop = create_seo_score_gauge(perf_desk, "Performance Desktop")
+                    if fig_desktop:
+                        st.plotly_chart(fig_desktop, use_container_width=True)
+                if seo_desk > 0:
+                    st.metric("SEO Score", f"{seo_desk}/100")
+
+        # Estratégias do PSI que falharam mesmo depois das novas tentativas
+        for strategy, error in psi_principal.get('errors', {}).items():
+            st.caption(f"⚠️ PageSpeed Insights ({strategy}) indisponível: {error}")
+    
+    # === PESO DAS IMAGENS ===
+    if options['image_audit']:
+        st.markdown("#### 🖼️ Peso das Imagens")
+        if image_audit_principal is None:
+            st.info("⏳ Verificando o peso das imagens...")
+        elif not image_audit_principal['checked']:
+            st.info("Nenhuma imagem encontrada na página.")
+        else:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("🖼️ Imagens Verificadas", image_audit_principal['checked'])
+            with col2:
+                st.metric("⚖️ Peso Total", f"{image_audit_principal['total_bytes'] / 1024:.0f} KB")
+            with col3:
+                st.metric("🐘 Pesadas", image_audit_principal['oversized'])
+            with col4:
+                st.metric("📐 Maiores que o Exibido", image_audit_principal['unscaled'])
             
-            st.divider()
-        
-        # Primeira linha: Score geral e métricas principais
-        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
-        
-        with col1:
-            if overall_score > 0:
-                fig_score = create_seo_score_gauge(overall_score, "Score Geral de SEO")
-                if fig_score:
-                    st.plotly_chart(fig_score, use_container_width=True)
+            flagged = [image for image in image_audit_principal['images'] if image['flags']]
+            if flagged:
+                df_images = pd.DataFrame([{
+                    'Imagem': image['url'],
+                    'Formato': (image.get('format') or '?').upper(),
+                    'Dimensões': f"{image['width']}x{image['height']}" if image.get('width') else "-",
+                    'Exibida (px)': image.get('display_width') or "-",
+                    'Peso (KB)': round(image['bytes'] / 1024, 1) if image.get('bytes') else None,
+                    'Problemas': ", ".join(IMAGE_FLAG_LABELS[flag] for flag in image['flags']),
+                } for image in sorted(flagged, key=lambda image: image.get('bytes') or 0, reverse=True)])
+                st.dataframe(df_images, use_container_width=True, hide_index=True)
             else:
-                st.info("📊 Score de SEO não disponível")
+                st.success("✅ Nenhuma imagem pesada, fora de escala ou em formato antigo.")
+            if image_audit_principal['errors']:
+                st.caption(f"⚠️ {image_audit_principal['errors']} imagens não puderam ser verificadas.")
+    
+    # === LITE LAB: PESO E PERFORMANCE ESTIMADA ===
+    if options['lite_lab']:
+        st.markdown("#### 🧪 Peso da Página e Performance Estimada")
+        if lab_principal is None:
+            st.info("⏳ Medindo os recursos da página...")
+        else:
+            lab_metrics = lab_principal['metrics']
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("🧪 Performance Estimada", f"{lab_principal['estimated_score']}/100")
+                st.metric("📦 Requisições", lab_principal['requests'])
+            with col2:
+                st.metric("🎨 FCP Estimado", f"{lab_metrics['fcp_ms'] / 1000:.1f} s")
+                st.metric("🖼️ LCP Estimado", f"{lab_metrics['lcp_ms'] / 1000:.1f} s")
+            with col3:
+                st.metric("⏱️ TBT Estimado", f"{lab_metrics['tbt_ms']} ms")
+                st.metric("🚧 Bloqueando Renderização", len(lab_principal['render_blocking']))
+            with col4:
+                st.metric("🌐 Terceiros", f"{lab_principal['third_party_share']:.0%}",
+                          help=f"{lab_principal['third_party_requests']} requisições de outros domínios")
+                st.metric("💤 Sem Lazy Loading", lab_principal['lazy_missing'])
+            
+            weight_chart = create_page_weight_chart(lab_principal)
+            if weight_chart:
+                st.plotly_chart(weight_chart, use_container_width=True)
+            
+            if lab_principal['render_blocking']:
+                with st.expander("🚧 Recursos que bloqueiam a renderização"):
+                    st.dataframe(pd.DataFrame([{
+                        'Recurso': resource['url'],
+                        'Tipo': resource['type'].upper(),
+                        'Peso (KB)': round(resource['bytes'] / 1024, 1) if resource['bytes'] else None,
+                    } for resource in lab_principal['render_blocking']]), use_container_width=True, hide_index=True)
+            st.caption("Estimativa local num perfil móvel lento (150 ms de RTT, 1,6 Mbps), sem navegador: "
+                       "use como ordem de grandeza. Com PSI_API_KEY, o score geral usa a medição do PageSpeed Insights.")
+
+    # --- ANÁLISE COMPETITIVA (SE HOUVER) ---
+    if options['competitors']:
+        st.divider()
+        st.subheader("🏆 Comparação Competitiva")
+    
+    if options['competitors'] and 'competitors' not in result:
+        st.info("⏳ Os concorrentes são analisados depois do site principal; a comparação aparece quando todos terminarem.")
+    elif options['competitors']:
+        for warning in result['warnings']:
+            st.warning(warning)
         
-        with col2:
-            st.metric("📝 Palavras", onpage_principal.get("word_count", 0))
-            st.metric("🖼️ Imagens", onpage_principal.get("image_count", 0))
+        # Site principal primeiro, depois os concorrentes analisados
+        competitor_dashboards = [dict(comp, onpage=as_dict(comp['onpage']), content=as_dict(comp['content']))
+                                 for comp in result['competitors']]
+        todos_os_resultados = [result['row']] + [comp['row'] for comp in competitor_dashboards]
         
-        with col3:
-            st.metric("🔗 Links Internos", onpage_principal.get("links_internos", 0))
-            st.metric("❌ Imgs sem Alt", onpage_principal.get("images_sem_alt", 0))
+        # Problemas de todos os sites avaliados numa única passada do motor de regras
+        issue_rows = [issue_metrics(onpage_principal, psi_principal, content_analysis, structured_data, broken_links_principal,
+                                    image_audit_principal, lab_principal)]
+        issue_rows += [issue_metrics(comp['onpage'], comp['psi'], comp['content'], comp['structured'], lab_data=comp['lab'])
+                       for comp in competitor_dashboards]
+        issue_frame = pd.DataFrame.from_records(issue_rows)
+        issue_matrix = default_rules().evaluate(issue_frame)
+        issues_por_site = default_rules().findings(issue_frame, issue_matrix)
         
-        with col4:
-            if psi_principal and 'mobile' in psi_principal:
-                perf_mobile = psi_principal['mobile'].get('psi_performance', 0)
-                if perf_mobile > 0:
-                    st.metric("📱 Performance", f"{perf_mobile}/100")
-                else:
-                    st.metric("📱 Performance", "N/A")
-            else:
-                st.metric("📱 Performance", "N/A")
+        # === DASHBOARDS INDIVIDUAIS DOS CONCORRENTES ===
+        if competitor_dashboards:
+            st.markdown("#### 🏢 Análise Individual dos Concorrentes")
             
-            if broken_links_principal:
-                st.metric("🔗 Links Quebrados", len(broken_links_principal), delta_color="inverse")
+            # Tabs para cada concorrente
+            tab_names = [f"🏢 {comp['domain']}" for comp in competitor_dashboards]
+            if len(tab_names) == 1:
+                tabs = [st.container()]
             else:
-                st.metric("🔗 Links Quebrados", "0 ✅")
-        
-        # Performance detalhada
-        if psi_principal:
-            mobile_perf = psi_principal.get('mobile', {}).get('psi_performance', 0)
-            desktop_perf = psi_principal.get('desktop', {}).get('psi_performance', 0)
+                tabs = st.tabs(tab_names)
             
-            if mobile_perf > 0 or desktop_perf > 0:
-                st.markdown("#### 🚀 Performance Detalhada")
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown("**📱 Mobile**")
-                    mobile_data = psi_principal.get('mobile', {})
-                    perf = mobile_data.get('psi_performance', 0)
-                    seo = mobile_data.get('psi_seo', 0)
+            competitor_ai_results = result.get('competitor_ai_results') or [None] * len(competitor_dashboards)
+            for i, (tab, comp_data) in enumerate(zip(tabs, competitor_dashboards)):
+                with tab:
+                    st.markdown(f"**Análise de: {comp_data['domain']}**")
                     
-                    if perf > 0:
-                        fig_mobile = create_seo_score_gauge(perf, "Performance Mobile")
-                        if fig_mobile:
-                            st.plotly_chart(fig_mobile, use_container_width=True)
-                    if seo > 0:
-                        st.metric("SEO Score", f"{seo}/100")
-                
-                with col2:
-                    st.markdown("**🖥️ Desktop**")
-                    desktop_data = psi_principal.get('desktop', {})
-                    perf_desk = desktop_data.get('psi_performance', 0)
-                    seo_desk = desktop_data.get('psi_seo', 0)
+                    # Mini dashboard para cada concorrente
+                    col1, col2, col3, col4 = st.columns(4)
                     
-                    if perf_desk > 0:
-                        fig_desktop = create_seo_score_gauge(perf_desk, "Performance Desktop")
-                        if fig_desktop:
-                            st.plotly_chart(fig_desktop, use_container_width=True)
-                    if seo_desk > 0:
-                        st.metric("SEO Score", f"{seo_desk}/100")
-        
-        # --- ANÁLISE COMPETITIVA (SE HOUVER) ---
-        urls_competidores_limpas = [url.strip() for url in competidores_raw.splitlines() if url.strip()][:3]  # Máximo 3
-        
-        if urls_competidores_limpas:
-            st.divider()
-            st.subheader("🏆 Comparação Competitiva")
+                    with col1:
+                        if comp_data['score'] > 0:
+                            mini_gauge = create_seo_score_gauge(comp_data['score'], f"Score: {comp_data['domain']}")
+                            if mini_gauge:
+                                st.plotly_chart(mini_gauge, use_container_width=True)
+                        else:
+                            st.info("Score não disponível")
+                    
+                    with col2:
+                        st.metric("📝 Palavras", comp_data['onpage'].get("word_count", 0))
+                        st.metric("🔗 Links Internos", comp_data['onpage'].get("links_internos", 0))
+                    
+                    with col3:
+                        st.metric("🖼️ Imagens", comp_data['onpage'].get("image_count", 0))
+                        st.metric("📱 Performance", performance_label(comp_data['psi'], comp_data['lab']))
+                    
+                    with col4:
+                        st.metric("🏷️ Title Length", comp_data['onpage'].get('title_length', 0))
+                        h1_count = comp_data['onpage'].get('h1_count', 0)
+                        st.metric("📋 H1 Count", h1_count)
+                    
+                    # Análises adicionais do concorrente
+                    if comp_data.get('content'):
+                        content_score = comp_data['content'].get('content_quality', {}).get('quality_score', 0)
+                        if content_score > 0:
+                            with st.expander("📝 Análise de Conteúdo"):
+                                flesch_score = comp_data['content'].get('readability', {}).get('flesch_score', 'N/A')
+                                st.metric("Qualidade do Conteúdo", f"{content_score}/100")
+                                if isinstance(flesch_score, (int, float)) and flesch_score > 0:
+                                    st.metric("Legibilidade Flesch", f"{flesch_score:.1f}")
+                    
+                    # Problemas do concorrente (mesmas regras do site principal)
+                    comp_issues = issues_por_site[i + 1]
+                    if comp_issues:
+                        with st.expander(f"🚨 Problemas Identificados ({len(comp_issues)})"):
+                            for finding in comp_issues:
+                                st.markdown(finding["message"])
+                    
+                    # Insights de IA do concorrente (gerados em lote pelo job)
+                    if competitor_ai_results[i]:
+                        with st.expander("✨ Insights de IA", expanded=True):
+                            show_ai_insights(competitor_ai_results[i])
+                    
+                    # Sitemap do concorrente (se disponível)
+                    if comp_data.get('site_structure') and comp_data['site_structure'].get('structure'):
+                        with st.expander(f"🗺️ Ver estrutura de {comp_data['domain']}"):
+                            sitemap_comp = create_sitemap_visualization(comp_data['site_structure'])
+                            if sitemap_comp:
+                                st.plotly_chart(sitemap_comp, use_container_width=True)
+                            
+                            strategy_comp = analyze_site_strategy(comp_data['site_structure'])
+                            if strategy_comp:
+                                st.markdown("**Estratégia de Estrutura:**")
+                                st.markdown(strategy_comp)
             
-            todos_os_resultados = []
+        # Exibe comparação
+        if len(todos_os_resultados) > 1:
+            df_comparativo = pd.DataFrame(todos_os_resultados)
             
-            # Adiciona resultado principal
-            resultado_principal = {
-                "URL": url_principal, 
-                "Site": urlparse(url_principal).netloc, 
-                **onpage_principal,
-                "Performance Mobile": psi_principal.get('mobile', {}).get('psi_performance', 0),
-                "SEO Score": overall_score
-            }
+            # Colunas para exibição da comparação
+            display_columns = [
+                "Site", "SEO Score", "word_count", "Performance Mobile", 
+                "links_internos", "image_count", "title_length"
+            ]
             
-            # Adiciona métricas das novas análises
-            if content_analysis:
-                resultado_principal["Content Score"] = content_analysis.get('content_quality', {}).get('quality_score', 0)
-                resultado_principal["Flesch Score"] = content_analysis.get('readability', {}).get('flesch_score', 0)
+            # Adiciona novas métricas se disponíveis
+            if "Content Score" in df_comparativo.columns:
+                display_columns.insert(-2, "Content Score")
+            if "Performance Estimada" in df_comparativo.columns:
+                display_columns += ["Performance Estimada", "Peso da Página (KB)"]
             
-            todos_os_resultados.append(resultado_principal)
-
-            # Analisa concorrentes
-            progress_bar = st.progress(0)
-            competitor_dashboards = []  # Lista para armazenar dashboards dos concorrentes
+            df_display = df_comparativo[display_columns].rename(columns={
+                "word_count": "Palavras", 
+                "links_internos": "Links Internos", 
+                "image_count": "Imagens",
+                "title_length": "Tam. Título",
+                "Content Score": "Score Conteúdo"
+            })
             
-            for i, url_comp in enumerate(urls_competidores_limpas):
-                is_valid, url_comp = validate_url(url_comp)
-                if is_valid:
-                    try:
-                        with st.spinner(f"Analisando {urlparse(url_comp).netloc}..."):
-                            onpage_comp, _, soup_comp = onpage_checks(url_comp)
-                            if onpage_comp:
-                                psi_comp = get_pagespeed_insights(url_comp)
-                                structured_comp = analyze_structured_data(soup_comp) if deep_analysis else {}
-                                site_structure_comp = extract_site_structure(url_comp, max_pages=max_pages_sitemap//2) if extract_structure else {}
-                                content_comp = analyze_content_advanced(soup_comp, url_comp) if content_analysis_enabled else {}
-                                
-                                comp_score = calculate_overall_seo_score(onpage_comp, psi_comp, {}, structured_comp)
-                                
-                                # Armazena dados do concorrente para dashboard individual
-                                competitor_dashboards.append({
-                                    'url': url_comp,
-                                    'domain': urlparse(url_comp).netloc,
-                                    'onpage': onpage_comp,
-                                    'psi': psi_comp,
-                                    'structured': structured_comp,
-                                    'site_structure': site_structure_comp,
-                                    'content': content_comp,
-                                    'score': comp_score
-                                })
-                                
-                                resultado_comp = {
-                                    "URL": url_comp, 
-                                    "Site": urlparse(url_comp).netloc, 
-                                    **onpage_comp,
-                                    "Performance Mobile": psi_comp.get('mobile', {}).get('psi_performance', 0),
-                                    "SEO Score": comp_score
-                                }
-                                
-                                # Adiciona métricas das novas análises
-                                if content_comp:
-                                    resultado_comp["Content Score"] = content_comp.get('content_quality', {}).get('quality_score', 0)
-                                    resultado_comp["Flesch Score"] = content_comp.get('readability', {}).get('flesch_score', 0)
-                                
-                                todos_os_resultados.append(resultado_comp)
-                    except Exception as e:
-                        st.warning(f"Erro ao analisar {url_comp}: {str(e)[:100]}")
-                
-                progress_bar.progress((i + 1) / len(urls_competidores_limpas))
+            st.dataframe(df_display, use_container_width=True)
             
-            # === DASHBOARDS INDIVIDUAIS DOS CONCORRENTES ===
-            if competitor_dashboards:
-                st.markdown("#### 🏢 Análise Individual dos Concorrentes")
-                
-                # Tabs para cada concorrente
-                tab_names = [f"🏢 {comp['domain']}" for comp in competitor_dashboards]
-                if len(tab_names) == 1:
-                    tabs = [st.container()]
-                else:
-                    tabs = st.tabs(tab_names)
-                
-                for i, (tab, comp_data) in enumerate(zip(tabs, competitor_dashboards)):
-                    with tab:
-                        st.markdown(f"**Análise de: {comp_data['domain']}**")
-                        
-                        # Mini dashboard para cada concorrente
-                        col1, col2, col3, col4 = st.columns(4)
-                        
-                        with col1:
-                            if comp_data['score'] > 0:
-                                mini_gauge = create_seo_score_gauge(comp_data['score'], f"Score: {comp_data['domain']}")
-                                if mini_gauge:
-                                    st.plotly_chart(mini_gauge, use_container_width=True)
-                            else:
-                                st.info("Score não disponível")
-                        
-                        with col2:
-                            st.metric("📝 Palavras", comp_data['onpage'].get("word_count", 0))
-                            st.metric("🔗 Links Internos", comp_data['onpage'].get("links_internos", 0))
-                        
-                        with col3:
-                            st.metric("🖼️ Imagens", comp_data['onpage'].get("image_count", 0))
-                            perf_mobile = comp_data['psi'].get('mobile', {}).get('psi_performance', 0)
-                            st.metric("📱 Performance", f"{perf_mobile}/100" if perf_mobile > 0 else "N/A")
-                        
-                        with col4:
-                            st.metric("🏷️ Title Length", comp_data['onpage'].get('title_length', 0))
-                            h1_count = comp_data['onpage'].get('h1_count', 0)
-                            st.metric("📋 H1 Count", h1_count)
-                        
-                        # Análises adicionais do concorrente
-                        if comp_data.get('content'):
-                            content_score = comp_data['content'].get('content_quality', {}).get('quality_score', 0)
-                            if content_score > 0:
-                                with st.expander("📝 Análise de Conteúdo"):
-                                    flesch_score = comp_data['content'].get('readability', {}).get('flesch_score', 'N/A')
-                                    st.metric("Qualidade do Conteúdo", f"{content_score}/100")
-                                    if isinstance(flesch_score, (int, float)) and flesch_score > 0:
-                                        st.metric("Legibilidade Flesch", f"{flesch_score:.1f}")
-                        
-                        # Sitemap do concorrente (se disponível)
-                        if comp_data.get('site_structure') and comp_data['site_structure'].get('structure'):
-                            with st.expander(f"🗺️ Ver estrutura de {comp_data['domain']}"):
-                                sitemap_comp = create_sitemap_visualization(comp_data['site_structure'])
-                                if sitemap_comp:
-                                    st.plotly_chart(sitemap_comp, use_container_width=True)
-                                
-                                strategy_comp = analyze_site_strategy(comp_data['site_structure'])
-                                if strategy_comp:
-                                    st.markdown("**Estratégia de Estrutura:**")
-                                    st.markdown(strategy_comp)
+            # Frequência de cada problema entre os sites comparados e, ao lado, entre as
+            # páginas rastreadas do site principal (métricas on-page do retrato do crawl;
+            # as regras que dependem de PSI, conteúdo ou lab não se aplicam a essas páginas)
+            df_issues = default_rules().aggregate(issue_matrix).rename(columns={
+                "label": "Problema",
+                "severity": "Severidade",
+                "pages": "Sites Afetados",
+                "share": "Proporção (Sites)"
+            })
+            affected = df_issues["Sites Afetados"] > 0
+            snapshot = (site_structure or {}).get('snapshot')
+            if snapshot is not None and snapshot.page_count:
+                page_issue_matrix = default_rules().evaluate(pd.DataFrame({
+                    name: snapshot.metric(name) for name in ("title_length", "h1_count", "word_count", "images_sem_alt")
+                }))
+                df_pages = default_rules().aggregate(page_issue_matrix)[["rule_id", "pages", "share"]]
+                df_issues = df_issues.merge(df_pages.rename(columns={
+                    "pages": f"Páginas Afetadas (de {snapshot.page_count})",
+                    "share": "Proporção (Páginas)"
+                }), on="rule_id", how="left")
+                affected = affected.to_numpy() | (df_pages["pages"].to_numpy() > 0)
+            df_issues = df_issues[affected]
+            if not df_issues.empty:
+                with st.expander("🚨 Problemas por Regra"):
+                    if snapshot is not None and snapshot.page_count:
+                        st.caption(f"Sites: página inicial de cada site comparado. Páginas: regras on-page (title, H1, "
+                                   f"conteúdo e alt) sobre as {snapshot.page_count} páginas rastreadas do site principal.")
+                    st.dataframe(df_issues.drop(columns=["rule_id"]), use_container_width=True, hide_index=True)
             
-            # Exibe comparação
-            if len(todos_os_resultados) > 1:
-                df_comparativo = pd.DataFrame(todos_os_resultados)
-                
-                # Colunas para exibição da comparação
-                display_columns = [
-                    "Site", "SEO Score", "word_count", "Performance Mobile", 
-                    "links_internos", "image_count", "title_length"
-                ]
-                
-                # Adiciona novas métricas se disponíveis
-                if "Content Score" in df_comparativo.columns:
-                    display_columns.insert(-2, "Content Score")
-                
-                df_display = df_comparativo[display_columns].rename(columns={
-                    "word_count": "Palavras", 
-                    "links_internos": "Links Internos", 
-                    "image_count": "Imagens",
-                    "title_length": "Tam. Título",
-                    "Content Score": "Score Conteúdo"
-                })
-                
-                st.dataframe(df_display, use_container_width=True)
-                
-                # Gráficos comparativos em tons de cinza
-                st.markdown("#### 📈 Comparação Visual")
-                
-                site_principal = urlparse(url_principal).netloc
-                
-                # Paleta monocromática para gráficos
-                def create_monochrome_colors(n_colors, highlight_index=0):
-                    """Cria paleta monocromática com destaque para o site principal"""
-                    colors = []
-                    for i in range(n_colors):
-                        if i == highlight_index:
-                            colors.append('#2F4F4F')  # Destaque para site principal
-                        else:
-                            gray_intensity = 0.4 + (i * 0.2)  # Varia tons de cinza
-                            colors.append(f'rgba(105,105,105,{min(gray_intensity, 1.0)})')
-                    return colors
-                
-                n_sites = len(df_display)
-                colors = create_monochrome_colors(n_sites)
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    fig_comp_seo = px.bar(df_display, x='Site', y='SEO Score', 
-                                          title="Score Geral de SEO",
-                                          color_discrete_sequence=colors)
-                    fig_comp_seo.update_layout(
-                        plot_bgcolor='white',
-                        paper_bgcolor='white',
-                        title_font_color='#2F4F4F'
-                    )
-                    st.plotly_chart(fig_comp_seo, use_container_width=True)
+            # Gráficos comparativos em tons de cinza
+            st.markdown("#### 📈 Comparação Visual")
+            
+            site_principal = urlparse(url_principal).netloc
+            
+            # Paleta monocromática para gráficos
+            def create_monochrome_colors(n_colors, highlight_index=0):
+                """Cria paleta monocromática com destaque para o site principal"""
+                colors = []
+                for i in range(n_colors):
+                    if i == highlight_index:
+                        colors.append('#2F4F4F')  # Destaque para site principal
+                    else:
+                        gray_intensity = 0.4 + (i * 0.2)  # Varia tons de cinza
+                        colors.append(f'rgba(105,105,105,{min(gray_intensity, 1.0)})')
+                return colors
+            
+            n_sites = len(df_display)
+            colors = create_monochrome_colors(n_sites)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                fig_comp_seo = px.bar(df_display, x='Site', y='SEO Score', 
+                                      title="Score Geral de SEO",
+                                      color_discrete_sequence=colors)
+                fig_comp_seo.update_layout(
+                    plot_bgcolor='white',
+                    paper_bgcolor='white',
+                    title_font_color='#2F4F4F'
+                )
+                st.plotly_chart(fig_comp_seo, use_container_width=True)
+            
+            with col2:
+                fig_comp_perf = px.bar(df_display, x='Site', y='Performance Mobile',
+                                       title="Performance Mobile",
+                                       color_discrete_sequence=colors)
+                fig_comp_perf.update_layout(
+                    plot_bgcolor='white',
+                    paper_bgcolor='white',
+                    title_font_color='#2F4F4F'
+                )
+                st.plotly_chart(fig_comp_perf, use_container_width=True)
+            
+            # Gráfico adicional se há dados de conteúdo
+            if "Score Conteúdo" in df_display.columns:
+                col3, col4 = st.columns(2)
                 
-                with col2:
-                    fig_comp_perf = px.bar(df_display, x='Site', y='Performance Mobile',
-                                           title="Performance Mobile",
-                                           color_discrete_sequence=colors)
-                    fig_comp_perf.update_layout(
+                with col3:
+                    fig_content = px.bar(df_display, x='Site', y='Score Conteúdo',
+                                         title="Qualidade do Conteúdo",
+                                         color_discrete_sequence=colors)
+                    fig_content.update_layout(
                         plot_bgcolor='white',
                         paper_bgcolor='white',
                         title_font_color='#2F4F4F'
                     )
-                    st.plotly_chart(fig_comp_perf, use_container_width=True)
-                
-                # Gráfico adicional se há dados de conteúdo
-                if "Score Conteúdo" in df_display.columns:
-                    col3, col4 = st.columns(2)
-                    
-                    with col3:
-                        fig_content = px.bar(df_display, x='Site', y='Score Conteúdo',
-                                             title="Qualidade do Conteúdo",
-                                             color_discrete_sequence=colors)
-                        fig_content.update_layout(
-                            plot_bgcolor='white',
-                            paper_bgcolor='white',
-                            title_font_color='#2F4F4F'
-                        )
-                        st.plotly_chart(fig_content, use_container_width=True)
-        
-        # --- RECOMENDAÇÕES FINAIS ---
-        st.divider()
-        st.subheader("💡 Resumo e Próximos Passos")
-        
-        # Identifica principais problemas
-        issues = []
-        if onpage_principal.get('title_length', 0) == 0:
-            issues.append("❌ **Title ausente** - Crítico para SEO")
-        elif onpage_principal.get('title_length', 0) > 60:
-            issues.append("⚠️ **Title muito longo** - Pode ser cortado nos resultados")
-        
-        if onpage_principal.get('h1_count', 0) == 0:
-            issues.append("❌ **H1 ausente** - Importante para estrutura")
-        elif onpage_principal.get('h1_count', 0) > 1:
-            issues.append("⚠️ **Múltiplos H1** - Use apenas um H1 por página")
+                    st.plotly_chart(fig_content, use_container_width=True)
+    
+    # Resumo e tempos só com a auditoria concluída
+    if audit_trace is None:
+        return
+    
+    # --- RECOMENDAÇÕES FINAIS ---
+    st.divider()
+    st.subheader("💡 Resumo e Próximos Passos")
+    
+    # Identifica principais problemas (regras declaradas em issue_rules.py)
+    issue_findings = find_page_issues(issue_metrics(
+        onpage_principal, psi_principal, content_analysis, structured_data, broken_links_principal,
+        image_audit_principal, lab_principal
+    ))
+    issues = [finding["message"] for finding in issue_findings]
+    
+    # Exibe problemas encontrados
+    if issues:
+        st.markdown("#### 🚨 Problemas Identificados")
+        for issue in issues[:8]:  # Mostra no máximo 8 problemas principais, dos mais graves aos menos
+            st.markdown(issue)
+    else:
+        st.success("🎉 **Excelente!** Nenhum problema crítico encontrado!")
+    
+    # Recomendações baseadas no score
+    st.markdown("#### 🎯 Prioridades de Otimização")
+    
+    if overall_score >= 80:
+        st.success("🏆 **Site bem otimizado!** Foque em:")
+        recommendations = [
+            "🔍 Monitoramento contínuo de performance",
+            "📝 Criação de conteúdo de qualidade regular",
+            "📊 Análise de comportamento de usuários",
+            "🎯 Otimização para featured snippets"
+        ]
+    elif overall_score >= 60:
+        st.warning("🚀 **Bom potencial!** Otimize:")
+        recommendations = [
+            "📱 Performance mobile (Core Web Vitals)",
+            "🎯 Qualidade e estrutura do conteúdo",
+            "🖼️ Alt text em todas as imagens",
+            "🏗️ Implementação de dados estruturados"
+        ]
+    else:
+        st.error("⚠️ **Necessita atenção urgente!** Priorize:")
+        recommendations = [
+            "📝 Title e meta description adequados",
+            "🏷️ Estrutura H1 correta",
+            "📄 Conteúdo mais robusto (mín. 300 palavras)",
+            "🔧 Correção de problemas técnicos básicos",
+            "📚 Melhoria da legibilidade do texto"
+        ]
+    
+    for rec in recommendations:
+        st.markdown(f"- {rec}")
+    
+    # Dados técnicos completos (expansível)
+    with st.expander("🔧 Ver todos os dados técnicos"):
+        tab1, tab2, tab3, tab4 = st.tabs(["📊 On-Page", "🚀 Performance", "📝 Conteúdo", "🏗️ Estruturados"])
         
-        if onpage_principal.get('word_count', 0) < 300:
-            issues.append("⚠️ **Conteúdo insuficiente** - Mínimo recomendado: 300 palavras")
+        with tab1:
+            st.json(onpage_principal)
         
-        if onpage_principal.get('images_sem_alt', 0) > 0:
-            issues.append(f"⚠️ **{onpage_principal.get('images_sem_alt', 0)} imagens sem alt text** - Prejudica acessibilidade")
+        with tab2:
+            if psi_principal:
+                st.json(psi_principal)
+            else:
+                st.info("Dados de performance não disponíveis")
         
-        if broken_links_principal:
-            issues.append(f"❌ **{len(broken_links_principal)} links quebrados** - Prejudica experiência do usuário")
+        with tab3:
+            if content_analysis:
+                st.json(content_analysis)
+            else:
+                st.info("Análise de conteúdo não realizada")
         
-        if psi_principal and psi_principal.get('mobile', {}).get('psi_performance', 0) < 60:
-            issues.append("⚠️ **Performance baixa** - Afeta ranking e experiência")
+        with tab4:
+            if structured_data:
+                st.json(structured_data)
+            else:
+                st.info("Análise de dados estruturados não realizada")
+    
+    # Comparação com outra auditoria guardada do mesmo site
+    if audit_trace is not None and result.get('snapshot_id'):
+        with st.expander("🔀 Comparar com Auditoria Anterior"):
+            show_audit_diff(result['site_structure']['snapshot'].site, result['snapshot_id'])
+    
+    # Exportação de todas as tabelas (só com a auditoria concluída)
+    if audit_trace is not None:
+        with st.expander("📤 Exportar Resultados"):
+            st.caption("Métricas por página, problemas, grafo de links, links quebrados, imagens e GEO das páginas rastreadas, "
+                       "um arquivo por tabela.")
+            export_format = st.radio("Formato", EXPORT_FORMATS, horizontal=True, format_func=str.upper,
+                                     key="export_format")
+            export_name = f"auditoria_{urlparse(url_principal).netloc.replace(':', '_')}_{audit_trace.started_at:%Y%m%d-%H%M%S}"
+            export_rows = export_row_count(result)
+            if export_rows <= EXPORT_DOWNLOAD_MAX_ROWS:
+                # O .zip só é gerado quando o botão é clicado
+                st.download_button(f"⬇️ Baixar ({export_format.upper()}, .zip)",
+                                   lambda: export_zip(result, export_format),
+                                   file_name=f"{export_name}-{export_format}.zip", mime="application/zip",
+                                   on_click="ignore")
+            else:
+                st.caption(f"📦 {export_rows} linhas: grande demais para download, grave os arquivos no servidor.")
+            if st.button(f"💾 Gravar em {EXPORT_DIR}/", key="export_to_disk"):
+                paths = export_to_directory(result, os.path.join(EXPORT_DIR, export_name), export_format)
+                st.success(f"✅ {len(paths)} arquivos gravados em `{os.path.dirname(paths[0])}`")
+    
+    # Waterfall de tempo por etapa (exportável em JSON)
+    with st.expander("⏱️ Tempo por Etapa"):
+        waterfall_fig = create_timing_waterfall(audit_trace)
+        if waterfall_fig:
+            st.plotly_chart(waterfall_fig, use_container_width=True)
         
-        if deep_analysis and structured_data and len(structured_data.get('schemas_found', [])) == 0:
-            issues.append("⚠️ **Dados estruturados ausentes** - Oportunidade perdida para rich snippets")
+        if audit_trace.memory_peak is not None:
+            budget_text = f" (orçamento: {audit_trace.memory_budget / 2**20:g} MB)" if audit_trace.memory_budget else ""
+            st.caption(f"🧠 Pico de memória desta auditoria: {audit_trace.memory_peak / 2**20:.1f} MB{budget_text}")
         
-        # Problemas de conteúdo
-        if content_analysis:
-            content_score = content_analysis.get('content_quality', {}).get('quality_score', 0)
-            if content_score < 50 and content_score > 0:
-                issues.append("📝 **Qualidade do conteúdo baixa** - Revise estrutura e legibilidade")
-            
-            flesch_score = content_analysis.get('readability', {}).get('flesch_score', 0)
-            if isinstance(flesch_score, (int, float)) and flesch_score < 30 and flesch_score > 0:
-                issues.append("📚 **Texto muito complexo** - Simplifique para melhor compreensão")
+        df_stages = pd.DataFrame(METRICS.summary())
+        if not df_stages.empty:
+            st.markdown("**📈 Percentis por etapa (todas as auditorias deste servidor):**")
+            st.dataframe(df_stages.rename(columns={
+                "stage": "Etapa", "category": "Categoria", "count": "Execuções",
+                "sum": "Tempo Total (s)", "bytes": "Bytes", "errors": "Erros",
+                "p50": "p50 (s)", "p90": "p90 (s)", "p99": "p99 (s)", "mem_peak_max": "Maior Pico de Memória (bytes)"
+            }), use_container_width=True, hide_index=True)
         
-        # Exibe problemas encontrados
-        if issues:
-            st.markdown("#### 🚨 Problemas Identificados")
-            for issue in issues[:8]:  # Mostra no máximo 8 problemas principais
-                st.markdown(issue)
+        st.download_button("⬇️ Exportar trace (JSON)", audit_trace.to_json(),
+                           file_name=f"trace_{urlparse(url_principal).netloc}.json",
+                           mime="application/json")
+
+@st.fragment
+def show_audit_diff(site, current_id):
+    """Compara duas auditorias guardadas do site (por padrão, a atual com a anterior)
+
+    Fragmento: trocar as auditorias comparadas redesenha só este painel.
+    """
+    audits = get_audit_history().list(site)
+    if len(audits) < 2:
+        st.info("📭 Esta é a primeira auditoria guardada deste site. Rode outra depois do próximo deploy para comparar.")
+        return
+    
+    labels = {audit['id']: f"{time.strftime('%d/%m/%Y %H:%M', time.localtime(audit['created_at']))} · {audit['pages']} páginas"
+              for audit in audits}
+    ids = [audit['id'] for audit in audits]
+    current_index = ids.index(current_id) if current_id in ids else 0
+    col_a, col_b = st.columns(2)
+    with col_a:
+        base_id = st.selectbox("Auditoria base", ids, index=min(current_index + 1, len(ids) - 1),
+                               format_func=labels.get, key="diff_base")
+    with col_b:
+        target_id = st.selectbox("Comparar com", ids, index=current_index, format_func=labels.get, key="diff_target")
+    if base_id == target_id:
+        st.caption("Escolha duas auditorias diferentes.")
+        return
+    
+    base, target = get_audit_history().load(base_id), get_audit_history().load(target_id)
+    if base is None or target is None:
+        st.warning("Auditoria removida do histórico.")
+        return
+    diff = diff_snapshots(base, target)
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("➕ Páginas Novas", len(diff['added']))
+    with col2:
+        st.metric("➖ Páginas Removidas", len(diff['removed']))
+    with col3:
+        st.metric("✏️ Texto Alterado", len(diff['text_changed']))
+    with col4:
+        st.metric("📉 Regressões de Score", len(diff['regressions']))
+    with col5:
+        st.metric("🔗 Links Quebrados Novos", len(diff['new_broken']),
+                  help=f"{len(diff['fixed_broken'])} links que estavam quebrados foram corrigidos")
+    
+    mean_seo = diff['mean_delta'].get('seo_score')
+    if mean_seo is not None:
+        st.caption(f"Score SEO on-page médio das páginas presentes nas duas auditorias: {mean_seo:+.1f} pontos")
+    
+    if not diff['regressions'].empty:
+        st.markdown("**📉 Páginas que perderam score:**")
+        st.dataframe(diff['regressions'].replace({'metric': {'seo_score': "SEO", 'geo_score': "GEO"}}).rename(columns={
+            'url': "URL", 'metric': "Score", 'before': "Antes", 'after': "Depois", 'delta': "Variação"
+        }), use_container_width=True, hide_index=True)
+    if not diff['changes'].empty:
+        st.markdown("**🏷️ Title, meta description e H1 alterados:**")
+        st.dataframe(diff['changes'].replace({'field': {'title': "Title", 'meta_description': "Meta Description", 'h1': "H1"}}).rename(columns={
+            'url': "URL", 'field': "Campo", 'before': "Antes", 'after': "Depois"
+        }), use_container_width=True, hide_index=True)
+    if not diff['new_broken'].empty:
+        st.markdown("**🔗 Links quebrados novos:**")
+        st.dataframe(diff['new_broken'].rename(columns={'url': "URL", 'status': "Status"}),
+                     use_container_width=True, hide_index=True)
+    if diff['added'] or diff['removed']:
+        st.markdown("**🗺️ Páginas novas e removidas:**")
+        st.dataframe(pd.DataFrame(
+            [{'URL': url, 'Mudança': "Nova"} for url in diff['added']]
+            + [{'URL': url, 'Mudança': "Removida"} for url in diff['removed']]
+        ), use_container_width=True, hide_index=True)
+
+def show_monitoring(url):
+    """Sites com monitoramento agendado: cadastro, próximas verificações e resumo das últimas"""
+    scheduler = get_monitor_scheduler()
+    st.caption("Cada verificação busca de novo as páginas com mais chance de ter mudado (as mais importantes "
+               "primeiro), dentro do orçamento de páginas por hora do site. O retrato entra no histórico de "
+               "auditorias: compare as execuções em \"Comparar com Auditoria Anterior\".")
+    
+    col_interval, col_pages, col_add = st.columns([2, 2, 1])
+    with col_interval:
+        interval_label = st.selectbox("Frequência", list(MONITOR_INTERVALS), index=2, key="monitor_interval")
+    with col_pages:
+        monitor_pages = st.number_input("Páginas por verificação", 1, 500, MONITOR_PAGES_PER_CHECK, key="monitor_pages")
+    with col_add:
+        st.write("")
+        if st.button("➕ Monitorar", key="monitor_add", disabled=not url,
+                     help=f"Agenda verificações de {urlparse(url).netloc}" if url else "Informe a URL do site acima"):
+            site = scheduler.store.add_site(url, MONITOR_INTERVALS[interval_label], monitor_pages)
+            st.success(f"📡 {site} será verificado {interval_label.lower()}.")
+    
+    sites = scheduler.store.sites()
+    if not sites:
+        st.info("Nenhum site monitorado ainda.")
+        return
+    
+    running = scheduler.running()
+    interval_names = {seconds: label for label, seconds in MONITOR_INTERVALS.items()}
+    st.dataframe(pd.DataFrame([{
+        "Site": entry['site'],
+        "Frequência": interval_names.get(entry['interval'], f"{entry['interval'] / 3600:g} h"),
+        "Páginas por Verificação": entry['pages'],
+        "Páginas Conhecidas": entry['known_pages'],
+        "Próxima Verificação": "⏳ em andamento" if entry['site'] in running
+                               else time.strftime('%d/%m/%Y %H:%M', time.localtime(entry['next_run'])),
+    } for entry in sites]), use_container_width=True, hide_index=True)
+    
+    site = st.selectbox("Site", [entry['site'] for entry in sites], key="monitor_site")
+    col_now, col_remove = st.columns(2)
+    with col_now:
+        st.button("🔄 Verificar agora", key="monitor_check_now", on_click=scheduler.check_now, args=(site,),
+                  disabled=site in running)
+    with col_remove:
+        st.button("🗑️ Parar de monitorar", key="monitor_remove", on_click=scheduler.store.remove_site, args=(site,))
+    
+    runs = scheduler.store.runs(site, limit=10)
+    if runs:
+        st.markdown("**🕒 Últimas verificações:**")
+        st.dataframe(pd.DataFrame([{
+            "Início": time.strftime('%d/%m/%Y %H:%M', time.localtime(run['started_at'])),
+            "Duração (s)": round(run['duration'], 1),
+            "Buscadas": run['fetched'],
+            "Sem Mudança (304)": run['not_modified'],
+            "Alteradas": run['changed'],
+            "Descobertas": run['discovered'],
+            "Falhas": run['failed'],
+            "Regressões": run['regressions'],
+            "Links Quebrados Novos": run['new_broken'],
+        } for run in runs]), use_container_width=True, hide_index=True)
+
+@st.fragment(run_every=AUDIT_POLL_SECONDS)
+def show_audit_progress(job_id):
+    """Acompanha o job em andamento sem refazer a página; ao terminar, redesenha o app com o resultado
+
+    A cada consulta desenha também as seções cujos dados o job já publicou.
+    """
+    job = get_audit_queue().get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    
+    st.progress(job.progress, text=job.message)
+    elapsed = time.time() - (job.started_at or job.created_at)
+    col_status, col_cancel = st.columns([3, 1])
+    with col_status:
+        if job.cancel_requested:
+            st.caption("⛔ Cancelando após a etapa atual...")
         else:
-            st.success("🎉 **Excelente!** Nenhum problema crítico encontrado!")
+            st.caption(f"⏱️ {elapsed:.0f}s · Auditoria `{job.id}` em segundo plano: pode fechar a aba e voltar por este link")
+    with col_cancel:
+        st.button("⛔ Cancelar auditoria", on_click=get_audit_queue().cancel, args=(job_id,),
+                  disabled=job.cancel_requested)
+    
+    # Cópia rasa: o job continua publicando enquanto a página é desenhada
+    partial = dict(job.partial)
+    if 'options' in partial:
+        render_audit_results(partial)
+
+# Sidebar
+with st.sidebar:
+    st.header("⚙️ Configurações de Análise")
+    
+    deep_analysis = st.checkbox("🔍 Análise profunda", value=True,
+                                help="Inclui análise de dados estruturados")
+    
+    extract_structure = st.checkbox("🗺️ Mapear estrutura do site", value=True,
+                                    help="Cria mapa visual da arquitetura do site")
+    
+    content_analysis_enabled = st.checkbox("📝 Análise avançada de conteúdo", value=True,
+                                           help="Análise de legibilidade, estrutura e qualidade do conteúdo")
+    
+    # <-- LINHA CORRIGIDA E MOVIDA PARA O LUGAR CERTO
+    geo_seo_enabled = st.checkbox("🤖 Análise de GEO (Generative Engine Optimization)", value=True,
+                                  help="Otimização para IAs generativas como ChatGPT, Gemini, Claude")
+    
+    geo_site_enabled = st.checkbox("🌐 GEO de todas as páginas rastreadas", value=True,
+                                   disabled=not (geo_seo_enabled and extract_structure),
+                                   help="Roda a análise GEO em cada página do crawl e mostra a distribuição do site")
+    
+    lite_lab_enabled = st.checkbox("🧪 Performance estimada (lite lab)", value=True,
+                                   help="Mede o peso dos recursos da página e estima a performance sem a API do PageSpeed")
+    
+    image_audit_enabled = st.checkbox("🖼️ Auditoria de peso das imagens", value=True,
+                                      help="Lê só o início de cada imagem para medir peso, dimensões e formato")
+    
+    ai_insights_enabled = st.checkbox("✨ Insights de IA (Gemini)", value=insights_model is not None,
+                                      disabled=insights_model is None,
+                                      help="Sugestões de title e meta description, palavras-chave e lacunas de conteúdo (requer GEMINI_API_KEY)")
+    
+    max_pages_sitemap = st.slider("Máx. páginas para sitemap", 10, 50, 20,
+                                  help="Limite de páginas para análise de estrutura")
+    
+    crawl_pages = st.slider("🕸️ Páginas rastreadas para o grafo de links", 1, 50, 5,
+                            help="Quantas páginas visitar para montar o grafo de links internos (PageRank, órfãs e profundidade de clique)")
+    
+    st.caption(f"🎟️ Cota disponível: {get_rate_limiter().remaining(current_client_id())} requisições "
+               "(renovada continuamente ao longo da hora)")
+    
+    reuse_cache = st.checkbox("♻️ Reaproveitar resultados recentes", value=True,
+                              help=f"Páginas, PageSpeed e concorrentes já analisados por qualquer sessão nos últimos "
+                                   f"{SHARED_CACHE_TTL_SECONDS / 60:.0f} min não são buscados de novo. "
+                                   "Desmarque logo depois de publicar mudanças no site")
+    shared_stats = get_shared_cache().stats()
+    st.caption(f"♻️ Cache compartilhado: {shared_stats['entries']} resultados, {shared_stats['bytes'] / 2**20:.1f} MB, "
+               f"{shared_stats['hit_rate']:.0%} de acertos")
+    
+    st.divider()
+    st.markdown("### 📊 Métricas Ideais")
+    st.info("""
+    **Title:** 30-60 caracteres  
+    **Meta Description:** 150-160 caracteres  
+    **H1:** Apenas 1 por página  
+    **Conteúdo:** Mínimo 300 palavras  
+    **Performance:** Acima de 80  
+    **Legibilidade:** Score Flesch > 60  
+    **GEO (IA):** FAQ, definições, exemplos e estrutura para IAs
+    """)
+
+st.title("🔭 Auditoria de SEO e GEO On-Page")
+st.markdown("Análise completa de SEO tradicional e otimização para IAs generativas (GEO - Generative Engine Optimization).")
+
+# Mostra informações apenas se análise não foi iniciada
+show_tool_info()
+
+st.subheader("🚀 Análise Principal")
+url_principal = st.text_input("Insira a URL do seu site:", key="url_principal",
+                              placeholder="https://seusite.com.br")
+
+# Validação em tempo real
+if url_principal:
+    is_valid, validation_result = validate_url(url_principal)
+    if not is_valid:
+        st.error(f"❌ {validation_result}")
+    else:
+        if validation_result != url_principal:
+            st.info(f"✅ URL corrigida para: {validation_result}")
+            url_principal = validation_result
+
+st.subheader("🏆 Análise Competitiva (Opcional)")
+competidores_raw = st.text_area("URLs dos concorrentes (uma por linha):", 
+                                 key="url_competidores", height=100,
+                                 placeholder="https://concorrente1.com\nhttps://concorrente2.com")
+
+# O id do job fica na sessão e na URL (?auditoria=<id>): reruns e reabrir o link recuperam a auditoria
+audit_job_id = st.session_state.get("audit_job_id") or st.query_params.get("auditoria")
+audit_job = get_audit_queue().get(audit_job_id) if audit_job_id else None
+audit_running = audit_job is not None and not audit_job.finished
+
+if st.button("🛰️ Iniciar Análise Completa", type="primary", disabled=audit_running):
+    if not url_principal:
+        st.error("Por favor, insira a URL do seu site.")
+    else:
+        # Marca que análise foi iniciada
+        st.session_state.analysis_started = True
         
-        # Recomendações baseadas no score
-        st.markdown("#### 🎯 Prioridades de Otimização")
+        # Validação final
+        is_valid, url_principal = validate_url(url_principal)
+        if not is_valid:
+            st.error(f"URL inválida: {url_principal}")
+            st.stop()
         
-        if overall_score >= 80:
-            st.success("🏆 **Site bem otimizado!** Foque em:")
-            recommendations = [
-                "🔍 Monitoramento contínuo de performance",
-                "📝 Criação de conteúdo de qualidade regular",
-                "📊 Análise de comportamento de usuários",
-                "🎯 Otimização para featured snippets"
-            ]
-        elif overall_score >= 60:
-            st.warning("🚀 **Bom potencial!** Otimize:")
-            recommendations = [
-                "📱 Performance mobile (Core Web Vitals)",
-                "🎯 Qualidade e estrutura do conteúdo",
-                "🖼️ Alt text em todas as imagens",
-                "🏗️ Implementação de dados estruturados"
-            ]
-        else:
-            st.error("⚠️ **Necessita atenção urgente!** Priorize:")
-            recommendations = [
-                "📝 Title e meta description adequados",
-                "🏷️ Estrutura H1 correta",
-                "📄 Conteúdo mais robusto (mín. 300 palavras)",
-                "🔧 Correção de problemas técnicos básicos",
-                "📚 Melhoria da legibilidade do texto"
-            ]
+        options = audit_options(
+            url_principal, competidores_raw.splitlines(),
+            deep_analysis=deep_analysis, extract_structure=extract_structure,
+            content_analysis=content_analysis_enabled, geo_analysis=geo_seo_enabled, geo_site=geo_site_enabled,
+            ai_insights=ai_insights_enabled and insights_model is not None, image_audit=image_audit_enabled,
+            lite_lab=lite_lab_enabled,
+            max_pages_sitemap=max_pages_sitemap, crawl_pages=crawl_pages, reuse_cache=reuse_cache
+        )
         
-        for rec in recommendations:
-            st.markdown(f"- {rec}")
+        # Limite de taxa compartilhado entre sessões: por cliente e global do servidor
+        audit_requests = estimate_audit_requests(options)
+        rate_decision = get_rate_limiter().acquire(current_client_id(), audit_requests)
+        if not rate_decision.allowed:
+            if rate_decision.retry_after is None:
+                st.error(f"⏳ Esta auditoria faz {audit_requests} requisições, mais do que a cota por hora permite. "
+                         "Reduza os concorrentes ou as páginas rastreadas.")
+            elif rate_decision.scope == "client":
+                st.error(f"⏳ Limite de auditorias atingido. Esta auditoria faz {audit_requests} requisições e sua cota "
+                         f"atual é de {rate_decision.remaining}; tente novamente em {rate_decision.retry_after / 60:.0f} min.")
+            else:
+                st.error(f"⏳ O servidor está no limite de auditorias no momento. "
+                         f"Tente novamente em {rate_decision.retry_after / 60:.0f} min.")
+            st.stop()
         
-        # Dados técnicos completos (expansível)
-        with st.expander("🔧 Ver todos os dados técnicos"):
-            tab1, tab2, tab3, tab4 = st.tabs(["📊 On-Page", "🚀 Performance", "📝 Conteúdo", "🏗️ Estruturados"])
-            
-            with tab1:
-                st.json(onpage_principal)
-            
-            with tab2:
-                if psi_principal:
-                    st.json(psi_principal)
-                else:
-                    st.info("Dados de performance não disponíveis")
-            
-            with tab3:
-                if content_analysis:
-                    st.json(content_analysis)
-                else:
-                    st.info("Análise de conteúdo não realizada")
-            
-            with tab4:
-                if structured_data:
-                    st.json(structured_data)
-                else:
-                    st.info("Análise de dados estruturados não realizada")
+        # A auditoria roda em segundo plano; a página só acompanha o progresso
+        audit_job = get_audit_queue().submit(run_audit, options, insights_model=insights_model,
+                                             insights_cache=get_insights_cache(), history=get_audit_history(),
+                                             shared_cache=get_shared_cache(), label=url_principal)
+        audit_job_id = audit_job.id
+        st.session_state.audit_job_id = audit_job_id
+        st.query_params["auditoria"] = audit_job_id
+
+# ========== ACOMPANHAMENTO DA AUDITORIA ==========
+if audit_job_id and audit_job is None:
+    st.info("Esta auditoria expirou ou o servidor foi reiniciado. Inicie uma nova análise.")
+    st.session_state.pop("audit_job_id", None)
+    st.query_params.pop("auditoria", None)
+elif audit_job is not None:
+    st.session_state.analysis_started = True
+    if not audit_job.finished:
+        show_audit_progress(audit_job.id)
+    elif audit_job.status == JOB_DONE:
+        render_audit_results(audit_job.result)
+    elif audit_job.status == JOB_FAILED:
+        st.error(f"Erro na análise: {audit_job.error}")
+    else:
+        st.warning("⛔ Auditoria cancelada.")
+
+# ========== MONITORAMENTO AGENDADO ==========
+with st.expander("📡 Monitoramento Agendado"):
+    show_monitoring(url_principal if url_principal and validate_url(url_principal)[0] else None)
 
 # Footer
 st.markdown("---")
@@ -2044,12 +2011,3 @@ st.markdown("""
 </div>
 
 """, unsafe_allow_html=True)
-
-# Rate limiting
-if 'analysis_count' not in st.session_state:
-    st.session_state.analysis_count = 0
-    st.session_state.last_analysis_time = datetime.now()
-
-if datetime.now() - st.session_state.last_analysis_time > timedelta(hours=1):
-    st.session_state.analysis_count = 0
-    st.session_state.last_analysis_time = datetime.now()
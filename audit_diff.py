@@ -0,0 +1,161 @@
+# ==============================================================================
+# HISTÓRICO E COMPARAÇÃO DE AUDITORIAS
+# Cada auditoria concluída guarda o retrato das páginas rastreadas
+# (site_snapshot.SiteSnapshot) em SQLite. A comparação de duas auditorias do
+# mesmo site junta as páginas pela URL (índice hash do pandas) e calcula as
+# diferenças com operações vetorizadas sobre os arrays: páginas novas e
+# removidas, texto alterado (hash), quedas de score, mudanças de title, meta
+# description e H1 e links quebrados novos.
+# ==============================================================================
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from site_snapshot import SNAPSHOT_METRICS, SiteSnapshot
+
+AUDIT_HISTORY_PATH = os.getenv("AUDIT_HISTORY_PATH", os.path.join(".cache", "audit_history.sqlite"))
+# Auditorias guardadas por site (as mais antigas saem primeiro)
+AUDIT_HISTORY_MAX_PER_SITE = int(os.getenv("AUDIT_HISTORY_MAX_PER_SITE", "20"))
+# Queda mínima de score (pontos) para contar como regressão
+DIFF_SCORE_DROP = float(os.getenv("DIFF_SCORE_DROP", "5"))
+
+
+class AuditHistory:
+    """Retratos das auditorias em SQLite, por site"""
+
+    def __init__(self, path=AUDIT_HISTORY_PATH, max_per_site=AUDIT_HISTORY_MAX_PER_SITE):
+        self.path = path
+        self.max_per_site = max_per_site
+        self._lock = threading.Lock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS audits ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " site TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " pages INTEGER NOT NULL,"
+            " strings TEXT NOT NULL,"
+            " arrays BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_audits_site ON audits (site, created_at)")
+        self._conn.commit()
+
+    def save(self, snapshot):
+        """Guarda o retrato e descarta os mais antigos do site além do limite; retorna o id"""
+        strings, arrays = snapshot.to_storage()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO audits (site, created_at, pages, strings, arrays) VALUES (?, ?, ?, ?, ?)",
+                (snapshot.site, snapshot.created_at, snapshot.page_count, strings, arrays),
+            )
+            self._conn.execute(
+                "DELETE FROM audits WHERE site = ? AND id NOT IN"
+                " (SELECT id FROM audits WHERE site = ? ORDER BY created_at DESC LIMIT ?)",
+                (snapshot.site, snapshot.site, self.max_per_site),
+            )
+            self._conn.commit()
+        return cursor.lastrowid
+
+    def list(self, site):
+        """Auditorias guardadas do site, da mais recente para a mais antiga"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, created_at, pages FROM audits WHERE site = ? ORDER BY created_at DESC", (site,)
+            ).fetchall()
+        return [{"id": audit_id, "created_at": created_at, "pages": pages} for audit_id, created_at, pages in rows]
+
+    def load(self, audit_id):
+        """SiteSnapshot guardado (None se não existe mais)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT site, created_at, strings, arrays FROM audits WHERE id = ?", (audit_id,)
+            ).fetchone()
+        return SiteSnapshot.from_storage(*row) if row else None
+
+
+# ========== COMPARAÇÃO ==========
+def _changed_text(old, new, ia, ib, field, urls):
+    """Linhas (url, campo, antes, depois) das páginas em que o texto mudou"""
+    before, after = old[ia], new[ib]
+    changed = np.flatnonzero(before != after)
+    return pd.DataFrame({
+        "url": urls[changed],
+        "field": field,
+        "before": before[changed],
+        "after": after[changed],
+    })
+
+
+def diff_snapshots(old, new, score_drop=DIFF_SCORE_DROP):
+    """O que mudou entre dois retratos do mesmo site
+
+    Retorna contagens e tabelas (DataFrames): páginas novas e removidas, páginas
+    com texto alterado, regressões de score (queda >= score_drop no score SEO
+    on-page ou no GEO), mudanças de title/meta/H1 e links quebrados novos.
+    """
+    # Posição de cada URL nova no retrato antigo (-1 = página nova)
+    positions = pd.Index(old.urls).get_indexer(new.urls)
+    matched = positions >= 0
+    ib = np.flatnonzero(matched)
+    ia = positions[ib]
+    kept = np.zeros(old.page_count, dtype=bool)
+    kept[ia] = True
+
+    new_urls = np.array(new.urls, dtype=object)
+    common_urls = new_urls[ib]
+
+    text_changed = old.hashes[ia] != new.hashes[ib]
+    delta = new.metrics[ib] - old.metrics[ia]
+
+    regressions = []
+    for name in ("seo_score", "geo_score"):
+        j = SNAPSHOT_METRICS.index(name)
+        with np.errstate(invalid="ignore"):
+            dropped = np.flatnonzero(delta[:, j] <= -score_drop)
+        # Piores quedas primeiro
+        dropped = dropped[np.argsort(delta[dropped, j], kind="stable")]
+        regressions.append(pd.DataFrame({
+            "url": common_urls[dropped],
+            "metric": name,
+            "before": old.metrics[ia[dropped], j],
+            "after": new.metrics[ib[dropped], j],
+            "delta": delta[dropped, j],
+        }))
+    regressions = pd.concat(regressions, ignore_index=True)
+
+    changes = pd.concat([
+        _changed_text(old.titles, new.titles, ia, ib, "title", common_urls),
+        _changed_text(old.metas, new.metas, ia, ib, "meta_description", common_urls),
+        _changed_text(old.h1s, new.h1s, ia, ib, "h1", common_urls),
+    ], ignore_index=True)
+
+    new_broken = pd.DataFrame(
+        [(url, status) for url, status in new.broken.items() if url not in old.broken], columns=["url", "status"]
+    )
+    fixed_broken = [url for url in old.broken if url not in new.broken]
+
+    # Variação média de cada métrica nas páginas presentes nas duas auditorias (NaN = métrica não medida)
+    measured = ~np.isnan(delta)
+    counts = measured.sum(axis=0)
+    sums = np.where(measured, delta, 0.0).sum(axis=0)
+    mean_delta = {name: float(sums[j] / counts[j]) for j, name in enumerate(SNAPSHOT_METRICS) if counts[j]}
+
+    return {
+        "old_pages": old.page_count,
+        "new_pages": new.page_count,
+        "added": new_urls[~matched].tolist(),
+        "removed": [old.urls[i] for i in np.flatnonzero(~kept)],
+        "text_changed": common_urls[text_changed].tolist(),
+        "regressions": regressions,
+        "changes": changes,
+        "new_broken": new_broken,
+        "fixed_broken": fixed_broken,
+        "mean_delta": mean_delta,
+    }
@@ -0,0 +1,270 @@
+# ==============================================================================
+# EXPORTAÇÃO DOS RESULTADOS DA AUDITORIA
+# Todas as métricas por página, problemas, links, imagens e o GEO das páginas
+# rastreadas em CSV, JSONL ou Parquet. Cada tabela é um gerador de linhas lido
+# direto dos resultados do job (registros, arrays do grafo e do GEO do site) e
+# gravado em fluxo: uma linha por vez no CSV/JSONL e lotes de
+# EXPORT_BATCH_ROWS linhas no Parquet, sem montar um DataFrame com tudo.
+# ==============================================================================
+import csv
+import io
+import json
+import os
+import zipfile
+from urllib.parse import urlparse
+
+from geo_site import GEO_COLUMNS, GEO_FLAGS
+from issue_rules import default_rules, issue_metrics
+from page_records import ContentRecord, GeoRecord, OnPageRecord, PageRecord, as_dict
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet é opcional: sem pyarrow só CSV e JSONL
+    pa = pq = None
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))
+# Acima disso o app grava os arquivos em EXPORT_DIR em vez de oferecer o download
+EXPORT_DOWNLOAD_MAX_ROWS = int(os.getenv("EXPORT_DOWNLOAD_MAX_ROWS", "50000"))
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet") if pa is not None else ("csv", "jsonl")
+
+_ARROW_TYPES = {"str": "string", "int": "int64", "float": "float64", "bool": "bool_"}
+
+
+# ========== COLUNAS ==========
+def _record_columns(prefix, record_class, kinds):
+    """Colunas com os valores escalares de um registro (listas e dicionários ficam de fora); contagens por padrão"""
+    return tuple((f"{prefix}{key}", kinds.get(key, "int"))
+                 for _, key in record_class.LAYOUT if key not in record_class.PACKED)
+
+
+PAGE_COLUMNS = (
+    ("role", "str"), ("url", "str"), ("site", "str"), ("seo_score", "int"),
+    ("psi_mobile", "float"), ("psi_desktop", "float"),
+    ("lab_score", "int"), ("lab_total_bytes", "int"), ("lab_requests", "int"),
+    ("images_checked", "int"), ("images_bytes", "int"), ("broken_links", "int"),
+    *_record_columns("", OnPageRecord, {"title": "str", "meta_description": "str"}),
+    *_record_columns("content_", ContentRecord, {
+        "flesch_score": "float", "ari_score": "float", "avg_sentence_length": "float", "level": "str", "level_color": "str",
+        "vocabulary_richness": "float", "avg_paragraph_length": "float", "duplication_ratio": "float",
+    }),
+    *_record_columns("geo_", GeoRecord, {
+        "hierarchy_score": "float", "author_mentioned": "bool", "date_mentioned": "bool", "article_schema": "bool",
+    }),
+)
+ISSUE_COLUMNS = (("site", "str"), ("url", "str"), ("rule_id", "str"), ("severity", "str"), ("message", "str"))
+LINK_COLUMNS = (
+    ("site", "str"), ("url", "str"), ("click_depth", "int"), ("pagerank", "float"),
+    ("in_degree", "int"), ("out_degree", "int"),
+)
+BROKEN_LINK_COLUMNS = (("site", "str"), ("url", "str"), ("status", "str"))
+IMAGE_COLUMNS = (
+    ("site", "str"), ("page_url", "str"), ("url", "str"), ("format", "str"), ("width", "int"), ("height", "int"),
+    ("display_width", "int"), ("display_height", "int"), ("bytes", "int"), ("status", "int"), ("flags", "str"),
+    ("error", "str"),
+)
+GEO_PAGE_COLUMNS = (("url", "str"), *((name, "float") for name in GEO_COLUMNS), *((name, "bool") for name in GEO_FLAGS))
+
+
+# ========== LINHAS ==========
+def _sites(result):
+    """(papel, resultado) do site principal e de cada concorrente"""
+    yield "principal", result
+    for competitor in result.get('competitors') or []:
+        yield "concorrente", competitor
+
+
+def _record_values(prefix, record_class, value):
+    if not value:
+        return {}
+    if not isinstance(value, PageRecord):
+        value = record_class.from_dict(value)
+    return {f"{prefix}{key}": getattr(value, key, None)
+            for _, key in record_class.LAYOUT if key not in record_class.PACKED}
+
+
+def page_rows(result):
+    """Uma linha por página auditada (site principal e concorrentes)"""
+    for role, site in _sites(result):
+        url = site.get('url') or result['options']['url']
+        psi = site.get('psi') or {}
+        lab = site.get('lab') or {}
+        images = site.get('images') or {}
+        broken = site.get('broken_links')
+        yield {
+            "role": role,
+            "url": url,
+            "site": urlparse(url).netloc,
+            "seo_score": site.get('score'),
+            "psi_mobile": psi.get('mobile', {}).get('psi_performance'),
+            "psi_desktop": psi.get('desktop', {}).get('psi_performance'),
+            "lab_score": lab.get('estimated_score'),
+            "lab_total_bytes": lab.get('total_bytes'),
+            "lab_requests": lab.get('requests'),
+            "images_checked": images.get('checked'),
+            "images_bytes": images.get('total_bytes'),
+            "broken_links": len(broken) if broken is not None else None,
+            **_record_values("", OnPageRecord, site.get('onpage')),
+            **_record_values("content_", ContentRecord, site.get('content')),
+            **_record_values("geo_", GeoRecord, site.get('geo')),
+        }
+
+
+def issue_rows(result):
+    """Uma linha por problema encontrado pelo motor de regras, em todos os sites"""
+    sites = [site for _, site in _sites(result)]
+    metrics = [issue_metrics(as_dict(site['onpage']), site.get('psi'), as_dict(site.get('content')), site.get('structured'),
+                             site.get('broken_links'), site.get('images'), site.get('lab')) for site in sites]
+    for site, findings in zip(sites, default_rules().findings(metrics)):
+        url = site.get('url') or result['options']['url']
+        for finding in findings:
+            yield {"site": urlparse(url).netloc, "url": url, **finding}
+
+
+def link_rows(result):
+    """Uma linha por página do grafo de links internos de cada site"""
+    for _, site in _sites(result):
+        structure = site.get('site_structure') or {}
+        graph = structure.get('link_graph')
+        if graph is None or graph.node_count == 0:
+            continue
+        root = structure.get('base_url')
+        depth, rank = graph.click_depth(root), graph.pagerank()
+        in_degree, out_degree = graph.in_degree(), graph.out_degree()
+        site_name = structure.get('domain') or urlparse(root).netloc
+        for i, url in enumerate(graph.urls):
+            yield {
+                "site": site_name, "url": url, "click_depth": int(depth[i]), "pagerank": float(rank[i]),
+                "in_degree": int(in_degree[i]), "out_degree": int(out_degree[i]),
+            }
+
+
+def broken_link_rows(result):
+    for _, site in _sites(result):
+        url = site.get('url') or result['options']['url']
+        for link in site.get('broken_links') or []:
+            yield {"site": urlparse(url).netloc, "url": link['url'], "status": link['status']}
+
+
+def image_rows(result):
+    """Uma linha por imagem verificada pela auditoria de imagens"""
+    for _, site in _sites(result):
+        url = site.get('url') or result['options']['url']
+        for image in (site.get('images') or {}).get('images', []):
+            yield {
+                **image,
+                "site": urlparse(url).netloc,
+                "page_url": url,
+                "flags": ";".join(image.get('flags', [])),
+            }
+
+
+def geo_page_rows(result):
+    """Indicadores GEO de cada página rastreada (ver geo_site.SiteGeo)"""
+    site_geo = (result.get('site_structure') or {}).get('geo')
+    if site_geo is None:
+        return
+    names = GEO_COLUMNS + GEO_FLAGS
+    for i, url in enumerate(site_geo.urls):
+        yield {"url": url, **dict(zip(names, site_geo.values[i].tolist() + site_geo.flags[i].tolist()))}
+
+
+# Nome: (colunas, gerador de linhas)
+EXPORT_TABLES = {
+    "pages": (PAGE_COLUMNS, page_rows),
+    "issues": (ISSUE_COLUMNS, issue_rows),
+    "links": (LINK_COLUMNS, link_rows),
+    "broken_links": (BROKEN_LINK_COLUMNS, broken_link_rows),
+    "images": (IMAGE_COLUMNS, image_rows),
+    "geo_pages": (GEO_PAGE_COLUMNS, geo_page_rows),
+}
+
+
+def export_row_count(result):
+    """Quantidade aproximada de linhas da exportação, sem gerar as tabelas"""
+    rows = 0
+    for _, site in _sites(result):
+        graph = (site.get('site_structure') or {}).get('link_graph')
+        rows += 1 + (graph.node_count if graph is not None else 0) + len((site.get('images') or {}).get('images', []))
+    site_geo = (result.get('site_structure') or {}).get('geo')
+    return rows + (site_geo.page_count if site_geo is not None else 0)
+
+
+# ========== GRAVAÇÃO EM FLUXO ==========
+def _coerce(value, kind):
+    """Valor no tipo da coluna (o Parquet exige um tipo por coluna; "N/A" vira nulo)"""
+    if value is None:
+        return None
+    try:
+        if kind == "str":
+            return str(value)
+        if kind == "int":
+            return int(value)
+        if kind == "float":
+            return float(value)
+        return bool(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _write_csv(rows, columns, stream):
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="", write_through=True)
+    writer = csv.DictWriter(text, fieldnames=[name for name, _ in columns], extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+    text.detach()
+
+
+def _write_jsonl(rows, columns, stream):
+    names = [name for name, _ in columns]
+    for row in rows:
+        stream.write(json.dumps({name: row.get(name) for name in names}, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+def _write_parquet(rows, columns, stream):
+    schema = pa.schema([(name, getattr(pa, _ARROW_TYPES[kind])()) for name, kind in columns])
+    with pq.ParquetWriter(stream, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append({name: _coerce(row.get(name), kind) for name, kind in columns})
+            if len(batch) >= EXPORT_BATCH_ROWS:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch = []
+        # Sempre ao menos um lote: uma tabela vazia ainda tem o esquema
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+
+_WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+
+def write_table(result, table, fmt, stream):
+    """Grava uma tabela (ver EXPORT_TABLES) no formato pedido num arquivo binário já aberto"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportação indisponível: {fmt}")
+    columns, rows = EXPORT_TABLES[table]
+    _WRITERS[fmt](rows(result), columns, stream)
+
+
+def export_zip(result, fmt):
+    """Todas as tabelas num .zip em memória (um arquivo por tabela), para o botão de download"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for table in EXPORT_TABLES:
+            with archive.open(f"{table}.{fmt}", "w") as stream:
+                write_table(result, table, fmt, stream)
+    return buffer.getvalue()
+
+
+def export_to_directory(result, directory, fmt):
+    """Grava cada tabela direto em disco (execuções grandes); devolve os caminhos gravados"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for table in EXPORT_TABLES:
+        path = os.path.join(directory, f"{table}.{fmt}")
+        with open(path, "wb") as stream:
+            write_table(result, table, fmt, stream)
+        paths.append(path)
+    return paths
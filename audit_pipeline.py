@@ -0,0 +1,286 @@
+# ==============================================================================
+# PIPELINE DA AUDITORIA
+# A parte de análise de uma auditoria completa (site principal e concorrentes),
+# sem dependência do Streamlit: roda como job em segundo plano (job_queue.py) e
+# publica cada resultado compacto no job assim que ele fica pronto, para o app
+# desenhar as seções progressivamente.
+# ==============================================================================
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import requests
+
+from seo_analysis import (
+    validate_url, calculate_overall_seo_score, extract_site_structure, get_pagespeed_insights,
+    check_broken_links, fetch_page
+)
+from page_worker import PageAnalysis
+from page_records import as_dict
+from image_audit import audit_images
+from lite_lab import run_lite_lab
+from ai_insights import generate_insights_batch
+from instrumentation import MemoryBudgetExceeded, start_trace, finish_trace
+from shared_cache import cache_key
+
+MAX_COMPETITORS = 3
+
+# Opções que mudam o resultado de um concorrente (parte da chave no cache compartilhado)
+COMPETITOR_CACHE_OPTIONS = ('deep_analysis', 'extract_structure', 'content_analysis', 'ai_insights', 'lite_lab',
+                            'max_pages_sitemap')
+
+# Como cada etapa do site principal aparece na mensagem de progresso enquanto é aguardada
+STAGE_LABELS = {
+    'psi': "PageSpeed Insights",
+    'site_structure': "estrutura do site",
+    'broken_links': "links quebrados",
+    'images': "peso das imagens",
+    'lab': "estimativa de performance",
+    'ai_result': "insights de IA",
+}
+
+
+class AuditError(Exception):
+    """Falha que interrompe a auditoria, com mensagem para o usuário"""
+
+
+def audit_options(url, competitors, deep_analysis=True, extract_structure=True, content_analysis=True,
+                  geo_analysis=True, geo_site=True, ai_insights=False, image_audit=True, lite_lab=True,
+                  max_pages_sitemap=20, crawl_pages=5, reuse_cache=True):
+    """Opções de uma auditoria, fixadas no momento da submissão"""
+    return {
+        'url': url,
+        'competitors': [url.strip() for url in competitors if url.strip()][:MAX_COMPETITORS],
+        'deep_analysis': deep_analysis,
+        'extract_structure': extract_structure,
+        'content_analysis': content_analysis,
+        'geo_analysis': geo_analysis,
+        # GEO em todas as páginas rastreadas (só do site principal)
+        'geo_site': geo_analysis and geo_site,
+        'ai_insights': ai_insights,
+        'image_audit': image_audit,
+        'lite_lab': lite_lab,
+        'max_pages_sitemap': max_pages_sitemap,
+        'crawl_pages': crawl_pages,
+        # Reaproveitar páginas, PageSpeed e concorrentes já calculados por outras sessões (dentro do TTL)
+        'reuse_cache': reuse_cache,
+    }
+
+
+def comparison_row(url, onpage, psi, score, content, lab=None):
+    """Linha da tabela comparativa de um site (onpage e content como dicionários)"""
+    row = {
+        "URL": url,
+        "Site": urlparse(url).netloc,
+        **onpage,
+        "Performance Mobile": psi.get('mobile', {}).get('psi_performance', 0),
+        "SEO Score": score
+    }
+    if lab:
+        row["Performance Estimada"] = lab['estimated_score']
+        row["Peso da Página (KB)"] = round(lab['total_bytes'] / 1024)
+    if content:
+        row["Content Score"] = content.get('content_quality', {}).get('quality_score', 0)
+        row["Flesch Score"] = content.get('readability', {}).get('flesch_score', 0)
+    return row
+
+
+def _submit_in_context(executor, func, *args, **kwargs):
+    """Roda func numa thread do executor dentro do trace (contextvars) da auditoria"""
+    return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+def _cached(job, cache, options, label, key, compute, cacheable=None):
+    """compute() pelo cache compartilhado entre sessões (shared_cache.py), quando há um
+
+    Sem reuse_cache o valor é recalculado (e guardado para as próximas). O que
+    veio do cache é listado em `reused` do job, para o app avisar.
+    """
+    if cache is None:
+        return compute()
+    value, reused = cache.fetch(cache_key(*key), compute, refresh=not options['reuse_cache'], cacheable=cacheable)
+    if reused and job is not None:
+        job.partial.setdefault('reused', []).append(label)
+    return value
+
+
+def _psi_cacheable(psi):
+    """Só resultados completos do PageSpeed vão para o cache (sem chave da API ou com falha, não)"""
+    return bool(psi) and not psi.get('errors')
+
+
+def _fetch_page(job, cache, options, url, label="página"):
+    return _cached(job, cache, options, label, ("page", url), lambda: fetch_page(url))
+
+
+def _pagespeed(job, cache, options, url, label="PageSpeed Insights"):
+    return _cached(job, cache, options, label, ("psi", url), lambda: get_pagespeed_insights(url), _psi_cacheable)
+
+
+def _generate_ai(job, ai_page, model, cache):
+    """Insights de IA do site principal, publicados no job à medida que chegam"""
+    def publish_partial(_, partial):
+        job.publish(ai_partial=partial)
+    return generate_insights_batch([ai_page], model, on_update=publish_partial, cache=cache)[0]
+
+
+def _analyze_main(job, options, steps, insights_model=None, insights_cache=None, shared_cache=None):
+    """Site principal: cada resultado é publicado no job assim que fica pronto
+
+    O corpo da página vai para o pool de processos enquanto PSI e o crawl da
+    estrutura rodam em paralelo; links quebrados, peso das imagens e insights de
+    IA começam assim que a análise da página termina. A página e o PageSpeed
+    podem vir do cache compartilhado; o crawl, os links e as imagens são
+    sempre buscados de novo (o retrato vai para o histórico).
+    """
+    url = options['url']
+    job.report(0.0, f"🔍 Analisando {urlparse(url).netloc}...")
+    try:
+        content, encoding = _fetch_page(job, shared_cache, options, url)
+    except requests.exceptions.RequestException:
+        raise AuditError(f"Não foi possível analisar {url}")
+
+    analysis = PageAnalysis(content, encoding, url, options)
+    del content
+
+    external = ThreadPoolExecutor(max_workers=4, thread_name_prefix="audit-stage")
+    try:
+        stages = {_submit_in_context(external, _pagespeed, job, shared_cache, options, url): 'psi'}
+        if options['extract_structure']:
+            stages[_submit_in_context(external, extract_site_structure, url, max_pages=options['max_pages_sitemap'],
+                                      crawl_pages=options['crawl_pages'], measure_assets=options['lite_lab'],
+                                      geo_pages=options['geo_site'], snapshot_pages=True)] = 'site_structure'
+
+        job.report(1 / steps, "📝 Analisando conteúdo e GEO...")
+        page = analysis.result()
+        job.publish(onpage=page['onpage'], structured=page['structured'], content=page['content'],
+                    geo=page['geo'], ai_page=page['ai_page'])
+
+        stages[_submit_in_context(external, check_broken_links, url, page['internal_links'])] = 'broken_links'
+        if options['image_audit']:
+            stages[_submit_in_context(external, audit_images, page['images'])] = 'images'
+        elif options['lite_lab']:
+            stages[_submit_in_context(external, run_lite_lab, url, page['html_bytes'], page['assets'], page['images'])] = 'lab'
+        if page['ai_page'] and insights_model is not None:
+            stages[_submit_in_context(external, _generate_ai, job, page['ai_page'], insights_model, insights_cache)] = 'ai_result'
+
+        # Espera em intervalos curtos: o cancelamento é verificado a cada volta
+        pending = set(stages)
+        while pending:
+            waiting = ", ".join(STAGE_LABELS[stages[future]] for future in pending)
+            job.report((1 + len(stages) - len(pending)) / steps, f"⏳ Aguardando {waiting}...")
+            finished, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job.publish(**{stages[future]: future.result()})
+                # O lite lab reaproveita o peso das imagens em vez de buscá-las de novo
+                if stages[future] == 'images' and options['lite_lab']:
+                    lab = _submit_in_context(external, run_lite_lab, url, page['html_bytes'], page['assets'], page['images'],
+                                             future.result())
+                    stages[lab] = 'lab'
+                    pending.add(lab)
+    finally:
+        external.shutdown(wait=False, cancel_futures=True)
+
+    result = job.partial
+    result.setdefault('site_structure', {})
+    lab = result.get('lab')
+    onpage = as_dict(result['onpage'])
+    score = calculate_overall_seo_score(onpage, result['psi'], {}, result['structured'], lab_data=lab)
+    job.publish(score=score, row=comparison_row(url, onpage, result['psi'], score, as_dict(result['content']), lab))
+    return result
+
+
+def _analyze_competitor(url, options, shared_cache=None):
+    """Um concorrente: mesmas análises do site principal, com crawl reduzido"""
+    try:
+        content, encoding = _fetch_page(None, shared_cache, options, url)
+    except requests.exceptions.RequestException:
+        return None
+    analysis = PageAnalysis(content, encoding, url, dict(options, geo_analysis=False, image_audit=False))
+    del content
+
+    psi = _pagespeed(None, shared_cache, options, url)
+    site_structure = extract_site_structure(url, max_pages=options['max_pages_sitemap'] // 2,
+                                            measure_assets=options['lite_lab']) if options['extract_structure'] else {}
+    page = analysis.result()
+    lab = run_lite_lab(url, page['html_bytes'], page['assets'], page['images']) if options['lite_lab'] else None
+
+    onpage, structured = as_dict(page['onpage']), page['structured']
+    score = calculate_overall_seo_score(onpage, psi, {}, structured, lab_data=lab)
+    # On-page e conteúdo ficam guardados como registros compactos (page_records.py)
+    return {
+        'url': url,
+        'domain': urlparse(url).netloc,
+        'onpage': page['onpage'],
+        'psi': psi,
+        'structured': structured,
+        'site_structure': site_structure,
+        'content': page['content'],
+        'score': score,
+        'ai_input': page['ai_page'],
+        'lab': lab,
+        'row': comparison_row(url, onpage, psi, score, as_dict(page['content']), lab),
+    }
+
+
+def run_audit(job, options, insights_model=None, insights_cache=None, history=None, shared_cache=None):
+    """Executa a auditoria completa como job; o progresso e o cancelamento passam por `job`
+
+    O resultado é o próprio job.partial, preenchido ao longo da execução. Com
+    `history` (audit_diff.AuditHistory), o retrato das páginas rastreadas do
+    site principal é guardado para comparações futuras (`snapshot_id`). Com
+    `shared_cache` (shared_cache.SharedCache), páginas, PageSpeed e concorrentes
+    já calculados por outras sessões são reaproveitados.
+    """
+    trace = start_trace(options['url'])
+    job.publish(options=options)
+    try:
+        with_ai = options['ai_insights'] and insights_model is not None
+        main_steps = (3 + bool(options['extract_structure']) + bool(options['image_audit']) + bool(options['lite_lab'])
+                      + with_ai)
+        competitors = options['competitors']
+        total_steps = main_steps + len(competitors) + (with_ai and bool(competitors))
+
+        try:
+            result = _analyze_main(job, options, total_steps, insights_model, insights_cache, shared_cache)
+        except MemoryBudgetExceeded as e:
+            raise AuditError(f"🧠 {e}")
+
+        snapshot = result['site_structure'].get('snapshot')
+        if history is not None and snapshot is not None:
+            job.publish(snapshot_id=history.save(snapshot.with_broken_links(result.get('broken_links'))))
+
+        competitor_results = []
+        warnings = []
+        for i, url_comp in enumerate(competitors):
+            is_valid, url_comp = validate_url(url_comp)
+            job.report((main_steps + i) / total_steps, f"🏆 Analisando {urlparse(url_comp).netloc or url_comp}...")
+            if not is_valid:
+                continue
+            try:
+                competitor = _cached(
+                    job, shared_cache, options, f"concorrente {urlparse(url_comp).netloc}",
+                    ("competitor", url_comp, {name: options[name] for name in COMPETITOR_CACHE_OPTIONS}),
+                    lambda: _analyze_competitor(url_comp, options, shared_cache), lambda value: value is not None,
+                )
+                if competitor:
+                    competitor_results.append(competitor)
+            except MemoryBudgetExceeded as e:
+                warnings.append(f"🧠 {e}. Os concorrentes restantes não foram analisados.")
+                break
+            except Exception as e:
+                warnings.append(f"Erro ao analisar {url_comp}: {str(e)[:100]}")
+
+        # Insights de IA de todos os concorrentes num único lote paralelo
+        ai_inputs = [comp['ai_input'] for comp in competitor_results if comp['ai_input']]
+        if ai_inputs and with_ai:
+            job.report((total_steps - 1) / total_steps, "✨ Gerando insights de IA dos concorrentes...")
+            ai_results = iter(generate_insights_batch(ai_inputs, insights_model, cache=insights_cache))
+            job.publish(competitor_ai_results=[next(ai_results) if comp['ai_input'] else None for comp in competitor_results])
+        job.publish(warnings=warnings, competitors=competitor_results)
+
+        job.report(1.0, "✅ Análise concluída!")
+    finally:
+        finish_trace(trace)
+    result['trace'] = trace
+    return result
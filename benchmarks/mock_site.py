@@ -0,0 +1,471 @@
+# ==============================================================================
+# SITE SINTÉTICO LOCAL (MOCK) PARA TESTES DE CARGA
+# Servidor HTTP que gera um site determinístico a partir de uma semente:
+# número de páginas, links por página, latência, taxa de erros, redirecionamentos,
+# links quebrados e tamanho do HTML são configuráveis. Também responde como um
+# stub do PageSpeed Insights, para medir crawler, checagem de links e PSI sem
+# acesso à internet.
+#
+# Uso:
+#   python benchmarks/mock_site.py --port 8765 --pages 200 --latency-ms 50
+#   PSI_API_KEY=mock PSI_API_URL=http://127.0.0.1:8765/pagespeedonline/v5/runPagespeed streamlit run app.py
+# ==============================================================================
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import urlopen
+
+PSI_PATH = "/pagespeedonline/v5/runPagespeed"
+CONTROL_PREFIX = "/__"
+
+FILLER_WORDS = (
+    "auditoria conteúdo página busca resultado análise estrutura link usuário site "
+    "performance dados técnica otimização relevância autoridade pesquisa navegação "
+    "content search ranking crawler index schema mobile speed quality signal"
+).split()
+
+_PAGE_PATH = re.compile(r"^/s(\d+)/p(\d+)$")
+_REDIRECT_PATH = re.compile(r"^/go/(\d+)$")
+_IMAGE_PATH = re.compile(r"^/img/(\d+)-(\d+)\.(jpg|png|webp)$")
+_RANGE = re.compile(r"^bytes=(\d+)-(\d*)$")
+_STATIC_PATH = re.compile(r"^/static/(site\.css|app\.js|s(\d+)\.js)$")
+
+IMAGE_FORMATS = ("jpg", "png", "webp")
+IMAGE_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+# CSS e JS compartilhados: um de cada para o site todo (no <head>, bloqueando) e um script por seção
+STATIC_SIZES_KB = {"site.css": 40, "app.js": 120, "section.js": 25}
+
+
+def _unit(*parts):
+    """Número determinístico em [0, 1) derivado das partes (independe do processo)"""
+    digest = hashlib.blake2b(":".join(map(str, parts)).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+
+class SyntheticSite:
+    """Descrição determinística de um site sintético"""
+
+    def __init__(self, pages=50, fanout=5, sections=5, payload_kb=20, latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, redirect_rate=0.0, broken_rate=0.0, images=4, seed=0,
+                 psi_latency_ms=0, psi_error_rate=0.0):
+        self.pages = max(int(pages), 1)
+        self.fanout = fanout
+        self.sections = max(int(sections), 1)
+        self.payload_kb = payload_kb
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.redirect_rate = redirect_rate
+        self.broken_rate = broken_rate
+        self.images = images
+        self.seed = seed
+        self.psi_latency_ms = psi_latency_ms
+        self.psi_error_rate = psi_error_rate
+
+    def page_path(self, page):
+        return "/" if page == 0 else f"/s{page % self.sections}/p{page}"
+
+    def is_error_page(self, page):
+        return page != 0 and _unit(self.seed, "error", page) < self.error_rate
+
+    def latency(self, path):
+        """Atraso (s) de uma resposta: fixo mais um jitter determinístico pelo caminho"""
+        return (self.latency_ms + self.jitter_ms * _unit(self.seed, "jitter", path)) / 1000
+
+    def links(self, page):
+        """Links da página: início, próxima página (garante alcance) e `fanout` sorteados"""
+        rng = random.Random(f"{self.seed}:links:{page}")
+        targets = [0, (page + 1) % self.pages]
+        others = [p for p in range(self.pages) if p != page]
+        targets += rng.sample(others, min(self.fanout, len(others)))
+
+        links = []
+        for j, target in enumerate(targets):
+            roll = rng.random()
+            if roll < self.broken_rate:
+                links.append(f"/missing/{page}-{j}")
+            elif roll < self.broken_rate + self.redirect_rate:
+                links.append(f"/go/{target}")
+            else:
+                links.append(self.page_path(target))
+        return links
+
+    def image(self, page, i):
+        """Formato, largura, altura e tamanho (bytes) de uma imagem da página"""
+        ext = IMAGE_FORMATS[i % len(IMAGE_FORMATS)]
+        width = 200 + int(2200 * _unit(self.seed, "img-width", page, i))
+        height = width * 2 // 3
+        size = 8 * 1024 + int(400 * 1024 * _unit(self.seed, "img-size", page, i))
+        return ext, width, height, size
+
+    def image_body(self, page, i):
+        """Arquivo com cabeçalho válido do formato (dimensões legíveis) e enchimento até o tamanho"""
+        ext, width, height, size = self.image(page, i)
+        if ext == "jpg":
+            header = (b"\xff\xd8" + b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+                      + b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00")
+        elif ext == "png":
+            header = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+        else:
+            header = (b"RIFF" + struct.pack("<I", size - 8) + b"WEBPVP8X" + struct.pack("<I", 10) + b"\x00" * 4
+                      + (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little"))
+        return header + b"\x00" * (size - len(header))
+
+    def render_page(self, page):
+        rng = random.Random(f"{self.seed}:page:{page}")
+        title = f"Página {page} - seção {page % self.sections} | Site Sintético"
+        parts = [
+            "<!DOCTYPE html>",
+            '<html lang="pt-BR"><head><meta charset="utf-8">',
+            f"<title>{title}</title>",
+            f'<meta name="description" content="Página sintética {page} para testes de carga do auditor de SEO.">',
+        ]
+        if page % 3 == 0:
+            parts.append('<script type="application/ld+json">{"@context": "https://schema.org", "@type": "Article", '
+                         f'"headline": "{title}"}}</script>')
+        parts.append('<link rel="stylesheet" href="/static/site.css"><script src="/static/app.js"></script>')
+        parts.append("</head><body><nav>")
+        parts += [f'<a href="{href}">Link {i}</a>' for i, href in enumerate(self.links(page))]
+        parts.append(f"</nav><main><h1>Página sintética {page}</h1>")
+        for i in range(self.images):
+            alt = f' alt="Imagem {i} da página {page}"' if i % 2 == 0 else ""
+            ext, width, _, _ = self.image(page, i)
+            # Metade das imagens é exibida com metade da largura real
+            size = f' width="{width // 2}"' if i % 2 == 1 else ""
+            parts.append(f'<img src="/img/{page}-{i}.{ext}"{alt}{size}>')
+
+        # Parágrafos de texto até atingir o tamanho configurado
+        size = sum(len(p) for p in parts)
+        target = int(self.payload_kb * 1024)
+        section = 0
+        while size < target:
+            if section % 4 == 0:
+                heading = f"<h2>Seção {section // 4 + 1}: {rng.choice(FILLER_WORDS)}?</h2>"
+                parts.append(heading)
+                size += len(heading)
+            sentence_count = rng.randint(3, 6)
+            sentences = [" ".join(rng.choice(FILLER_WORDS) for _ in range(rng.randint(8, 18))).capitalize() + "."
+                         for _ in range(sentence_count)]
+            paragraph = f"<p>{' '.join(sentences)}</p>"
+            parts.append(paragraph)
+            size += len(paragraph)
+            section += 1
+        parts.append(f'</main><footer><p>© Site Sintético</p></footer><script src="/static/s{page % self.sections}.js" defer></script>')
+        parts.append("</body></html>")
+        return "\n".join(parts).encode("utf-8")
+
+    def psi_response(self, url, strategy):
+        """Resposta no formato do PSI v5 com scores determinísticos por URL e estratégia"""
+        categories = {
+            category: {"score": round(0.3 + 0.7 * _unit(self.seed, "psi", url, strategy, category), 2)}
+            for category in ("performance", "accessibility", "best-practices", "seo")
+        }
+        return {"lighthouseResult": {"finalUrl": url, "categories": categories}}
+
+
+class _MockSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body):
+        server = self.server
+        if self.path.startswith(CONTROL_PREFIX):
+            return self._control(send_body)
+
+        server.request_started()
+        try:
+            status, headers, body, delay = server.route(self.path)
+            if status == 200 and "ETag" in headers and self.headers.get("If-None-Match") == headers["ETag"]:
+                # Requisição condicional com a versão atual: 304 sem corpo
+                status, body = 304, b""
+            elif status == 200 and (byte_range := _RANGE.match(self.headers.get("Range", ""))):
+                # Leitura parcial (Range: bytes=início-fim), como um servidor de arquivos estáticos
+                start = int(byte_range.group(1))
+                end = min(int(byte_range.group(2) or len(body) - 1), len(body) - 1)
+                status = 206
+                headers = dict(headers, **{"Content-Range": f"bytes {start}-{end}/{len(body)}"})
+                body = body[start:end + 1]
+            if delay:
+                time.sleep(delay)
+            server.request_served(status, len(body) if send_body else 0)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+        finally:
+            server.request_finished()
+
+    def _control(self, send_body):
+        """Endpoints de controle (não entram nas estatísticas): /__stats e /__reset"""
+        if self.path == CONTROL_PREFIX + "reset":
+            self.server.reset_stats()
+        body = json.dumps(self.server.stats()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockSiteServer(ThreadingHTTPServer):
+    """Servidor do site sintético, com estatísticas de requisições e concorrência"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, site, host="127.0.0.1", port=0):
+        super().__init__((host, port), _MockSiteHandler)
+        self.site = site
+        self._lock = threading.Lock()
+        self._psi_attempts = {}
+        self._thread = None
+        self.reset_stats()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def psi_url(self):
+        return self.base_url.rstrip("/") + PSI_PATH
+
+    def page_url(self, page):
+        return self.base_url.rstrip("/") + self.site.page_path(page)
+
+    # ----- roteamento -----
+    def route(self, raw_path):
+        """Retorna (status, headers, corpo, atraso) para o caminho pedido"""
+        parsed = urlparse(raw_path)
+        path = parsed.path
+        site = self.site
+        html = {"Content-Type": "text/html; charset=utf-8"}
+
+        if path == PSI_PATH:
+            return self._route_psi(parse_qs(parsed.query))
+
+        delay = site.latency(path)
+        page = None
+        if path == "/":
+            page = 0
+        elif match := _PAGE_PATH.match(path):
+            page = int(match.group(2))
+            if page >= site.pages or site.page_path(page) != path:
+                page = None
+        elif match := _REDIRECT_PATH.match(path):
+            target = int(match.group(1))
+            if target < site.pages:
+                return 301, {"Location": site.page_path(target)}, b"", delay
+        elif match := _STATIC_PATH.match(path):
+            name = match.group(1)
+            if match.group(2) is None or int(match.group(2)) < site.sections:
+                content_type = "text/css" if name.endswith(".css") else "application/javascript"
+                size = STATIC_SIZES_KB["section.js" if match.group(2) else name] * 1024
+                filler = (f"/* {name} */\n" + "." * 63 + "\n").encode("ascii")
+                headers = {"Content-Type": content_type, "ETag": f'"{site.seed}-{name}-{size}"'}
+                return 200, headers, (filler * (size // len(filler) + 1))[:size], delay
+            page = None
+        elif match := _IMAGE_PATH.match(path):
+            page, i, ext = int(match.group(1)), int(match.group(2)), match.group(3)
+            if page < site.pages and i < site.images:
+                return 200, {"Content-Type": IMAGE_TYPES[ext], "Accept-Ranges": "bytes"}, site.image_body(page, i), delay
+            page = None
+
+        if page is None:
+            return 404, html, b"<html><body><h1>404</h1></body></html>", delay
+        if site.is_error_page(page):
+            return 500, html, b"<html><body><h1>500</h1></body></html>", delay
+        return 200, html, site.render_page(page), delay
+
+    def _route_psi(self, query):
+        site = self.site
+        url = query.get("url", [""])[0]
+        strategy = query.get("strategy", ["mobile"])[0]
+        json_headers = {"Content-Type": "application/json"}
+        if not url:
+            return 400, json_headers, b'{"error": {"code": 400, "message": "url ausente"}}', 0
+
+        # Falhas transitórias: cada tentativa para a mesma URL/estratégia sorteia de novo
+        with self._lock:
+            attempt = self._psi_attempts.get((url, strategy), 0)
+            self._psi_attempts[(url, strategy)] = attempt + 1
+        delay = site.psi_latency_ms / 1000
+        if _unit(site.seed, "psi-error", url, strategy, attempt) < site.psi_error_rate:
+            return 500, json_headers, b'{"error": {"code": 500, "message": "erro simulado"}}', delay
+        body = json.dumps(site.psi_response(url, strategy)).encode("utf-8")
+        return 200, json_headers, body, delay
+
+    # ----- estatísticas -----
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.bytes_sent = 0
+            self.status_counts = {}
+            self._psi_attempts.clear()
+
+    def request_started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def request_served(self, status, sent):
+        with self._lock:
+            self.bytes_sent += sent
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def request_finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "max_in_flight": self.max_in_flight,
+                "bytes_sent": self.bytes_sent,
+                "status_counts": {str(k): v for k, v in sorted(self.status_counts.items())},
+            }
+
+    # ----- ciclo de vida -----
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-site", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def start_mock_site(host="127.0.0.1", port=0, **site_options):
+    """Sobe o site sintético numa thread de fundo (porta 0 = porta livre qualquer)"""
+    return MockSiteServer(SyntheticSite(**site_options), host, port).start()
+
+
+def _free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class MockSiteProcess:
+    """Site sintético rodando em outro processo
+
+    Usado nos benchmarks para que o servidor não dispute o GIL nem apareça no
+    tracemalloc do processo medido. As estatísticas vêm de /__stats.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, **site_options):
+        self.site = SyntheticSite(**site_options)
+        self.host = host
+        self.port = port or _free_port(host)
+        self.base_url = f"http://{host}:{self.port}/"
+        self.psi_url = self.base_url.rstrip("/") + PSI_PATH
+        args = [sys.executable, os.path.abspath(__file__), "--host", host, "--port", str(self.port)]
+        for name, value in site_options.items():
+            args += [f"--{name.replace('_', '-')}", str(value)]
+        self._process = subprocess.Popen(args, stdout=subprocess.DEVNULL)
+        self._wait_ready()
+
+    def _wait_ready(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                self.stats()
+                return
+            except OSError:
+                if self._process.poll() is not None:
+                    raise RuntimeError("O servidor do site sintético terminou ao iniciar")
+                time.sleep(0.05)
+        self.stop()
+        raise TimeoutError("O servidor do site sintético não respondeu a tempo")
+
+    def _control(self, name):
+        with urlopen(f"{self.base_url}{CONTROL_PREFIX[1:]}{name}", timeout=5) as response:
+            return json.loads(response.read())
+
+    def page_url(self, page):
+        return self.base_url.rstrip("/") + self.site.page_path(page)
+
+    def stats(self):
+        return self._control("stats")
+
+    def reset_stats(self):
+        return self._control("reset")
+
+    def stop(self):
+        self._process.terminate()
+        self._process.wait(timeout=5)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Site sintético local e stub do PageSpeed Insights")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--fanout", type=int, default=5, help="links sorteados por página")
+    parser.add_argument("--sections", type=int, default=5)
+    parser.add_argument("--payload-kb", type=float, default=20, help="tamanho aproximado de cada página")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de páginas que respondem 500")
+    parser.add_argument("--redirect-rate", type=float, default=0.0, help="fração de links que passam por um 301")
+    parser.add_argument("--broken-rate", type=float, default=0.0, help="fração de links que levam a 404")
+    parser.add_argument("--images", type=int, default=4, help="imagens por página (metade sem alt)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--psi-latency-ms", type=float, default=0)
+    parser.add_argument("--psi-error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    options = {k: v for k, v in vars(args).items() if k not in ("host", "port")}
+    server = MockSiteServer(SyntheticSite(**options), args.host, args.port)
+    print(f"Site sintético em {server.base_url}")
+    print(f"Stub do PSI em {server.psi_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
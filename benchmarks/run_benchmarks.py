@@ -0,0 +1,323 @@
+# ==============================================================================
+# BENCHMARKS DOS ANALISADORES
+# Mede tempo (vazão) e pico de memória dos analisadores e das funções de score
+# sobre o corpus de páginas HTML salvas em benchmarks/corpus e compara com os
+# baselines guardados em benchmarks/baselines.json.
+#
+# Uso (a partir da raiz do repositório):
+#   python benchmarks/run_benchmarks.py                     # roda e compara
+#   python benchmarks/run_benchmarks.py --only content      # filtra casos
+#   python benchmarks/run_benchmarks.py --update-baseline   # regrava baselines
+# ==============================================================================
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from seo_analysis import (  # noqa: E402
+    onpage_checks_html, analyze_content_advanced, analyze_geo_ai_optimization,
+    analyze_structured_data, keyword_analysis, calculate_overall_seo_score, calculate_overall_seo_scores, decode_html,
+)
+from scoring import score_frame, content_quality_metrics, geo_metrics  # noqa: E402
+import pandas as pd  # noqa: E402
+
+CORPUS_PATH = os.path.join(BENCH_DIR, "corpus.json")
+BASELINES_PATH = os.path.join(BENCH_DIR, "baselines.json")
+
+# Tolerâncias padrão antes de acusar regressão (fração acima do baseline)
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.10
+# Diferenças de tempo/memória abaixo disso são ruído de medição, mesmo que proporcionalmente grandes
+TIME_NOISE_FLOOR = 0.001
+MEMORY_NOISE_FLOOR_KB = 64
+# Páginas replicadas para os benchmarks de score em lote
+SCORING_BATCH_ROWS = 10_000
+
+REPEAT_START = "<!-- repeat:start -->"
+REPEAT_END = "<!-- repeat:end -->"
+
+
+# ========== CORPUS ==========
+class CorpusPage:
+    """Uma página do corpus, já expandida e com o soup de referência"""
+
+    def __init__(self, entry, html):
+        self.name = entry["name"]
+        self.url = entry["url"]
+        self.lang = entry["lang"]
+        self.keyword = entry.get("keyword")
+        self.html = html
+        self.size = len(html.encode("utf-8"))
+        self._soup = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html, "html.parser")
+        return self._soup
+
+
+def expand_html(html, repeat):
+    """Replica o bloco marcado do HTML para gerar páginas grandes deterministicamente"""
+    if repeat <= 1:
+        return html
+    start = html.index(REPEAT_START) + len(REPEAT_START)
+    end = html.index(REPEAT_END)
+    return html[:start] + html[start:end] * repeat + html[end:]
+
+
+def load_corpus(path=CORPUS_PATH):
+    """Páginas do manifesto; o arquivo é decodificado como no app (charset da entrada, padrão UTF-8)"""
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    pages = []
+    for entry in manifest["pages"]:
+        with open(os.path.join(BENCH_DIR, "corpus", entry["file"]), "rb") as f:
+            html = decode_html(f.read(), entry.get("encoding", "utf-8"))
+        pages.append(CorpusPage(entry, expand_html(html, entry.get("repeat", 1))))
+    return pages
+
+
+# ========== CASOS ==========
+# Cada caso recebe a página e devolve uma função sem argumentos que executa a
+# operação medida. O preparo (parse de referência, cópia do soup) fica fora da
+# medição.
+def _onpage_case(page):
+    return lambda: onpage_checks_html(page.html, page.url)
+
+
+def _content_case(page):
+    # analyze_content_advanced remove os <script> do soup, então cada execução usa uma cópia
+    return lambda soup: analyze_content_advanced(soup, page.url), lambda: copy.copy(page.soup)
+
+
+def _geo_case(page):
+    return lambda: analyze_geo_ai_optimization(page.soup, page.url)
+
+
+def _structured_case(page):
+    return lambda: analyze_structured_data(page.soup)
+
+
+def _keyword_case(page):
+    return lambda: keyword_analysis(page.soup, page.keyword)
+
+
+PAGE_CASES = {
+    "onpage_checks": _onpage_case,
+    "analyze_content_advanced": _content_case,
+    "analyze_geo_ai_optimization": _geo_case,
+    "analyze_structured_data": _structured_case,
+    "keyword_analysis": _keyword_case,
+}
+
+
+SCORING_CASE_NAMES = (
+    "calculate_overall_seo_score",
+    "calculate_overall_seo_scores",
+    "score_frame_content_quality",
+    "score_frame_geo",
+)
+
+
+def _scoring_inputs(pages):
+    """Resultados reais das páginas do corpus, usados como entrada dos scores"""
+    inputs = []
+    for page in pages:
+        onpage, _, _ = onpage_checks_html(page.html, page.url)
+        inputs.append({
+            "onpage": onpage,
+            "keyword": keyword_analysis(page.soup, page.keyword),
+            "structured": analyze_structured_data(page.soup),
+            "content": analyze_content_advanced(copy.copy(page.soup), page.url),
+            "geo": analyze_geo_ai_optimization(page.soup, page.url),
+        })
+    return inputs
+
+
+def scoring_cases(pages, rows=SCORING_BATCH_ROWS):
+    """Casos de score: uma página por vez e lotes com `rows` páginas"""
+    inputs = _scoring_inputs(pages)
+    batch = [inputs[i % len(inputs)] for i in range(rows)]
+    seo_pages = [(item["onpage"], None, item["keyword"], item["structured"]) for item in batch]
+    content_frame = pd.DataFrame.from_records([content_quality_metrics(item["content"]) for item in batch])
+    geo_frame = pd.DataFrame.from_records([geo_metrics(item["geo"]) for item in batch])
+
+    def single_scores():
+        for item in inputs:
+            calculate_overall_seo_score(item["onpage"], None, item["keyword"], item["structured"])
+
+    return {
+        "calculate_overall_seo_score": (len(inputs), single_scores),
+        "calculate_overall_seo_scores": (rows, lambda: calculate_overall_seo_scores(seo_pages)),
+        "score_frame_content_quality": (rows, lambda: score_frame(content_frame, "content_quality")),
+        "score_frame_geo": (rows, lambda: score_frame(geo_frame, "geo")),
+    }
+
+
+# ========== MEDIÇÃO ==========
+def measure(case, min_time, min_rounds=3, max_rounds=200):
+    """Mediana do tempo de execução e pico de memória (tracemalloc) de um caso
+
+    `case` é uma função sem argumentos ou um par (função, preparo), em que o
+    resultado do preparo é passado para a função e não entra na medição.
+    """
+    func, setup = case if isinstance(case, tuple) else (case, None)
+
+    def run_once():
+        args = (setup(),) if setup else ()
+        t0 = time.perf_counter()
+        func(*args)
+        return time.perf_counter() - t0
+
+    run_once()  # aquecimento (caches de regex, NLTK, tabelas de score)
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_rounds or (time.perf_counter() - started < min_time and len(timings) < max_rounds):
+        timings.append(run_once())
+
+    # Memória em uma execução separada: o tracemalloc deixa o código bem mais lento
+    args = (setup(),) if setup else ()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": statistics.median(timings), "rounds": len(timings), "peak_kb": round(peak / 1024, 1)}
+
+
+def run(pages, only=None, min_time=0.5):
+    results = {}
+
+    for case_name, make_case in PAGE_CASES.items():
+        for page in pages:
+            key = f"{case_name}/{page.name}"
+            if only and not any(term in key for term in only):
+                continue
+            result = measure(make_case(page), min_time)
+            result["mb_per_s"] = round(page.size / result["seconds"] / 1e6, 3)
+            result["bytes"] = page.size
+            results[key] = result
+            _print_result(key, result)
+
+    # O preparo dos casos de score roda todos os analisadores: só é feito se algum caso for selecionado
+    if only and not any(term in f"scoring/{name}" for term in only for name in SCORING_CASE_NAMES):
+        return results
+
+    for case_name, (items, func) in scoring_cases(pages).items():
+        key = f"scoring/{case_name}"
+        if only and not any(term in key for term in only):
+            continue
+        result = measure(func, min_time)
+        result["pages_per_s"] = round(items / result["seconds"], 1)
+        results[key] = result
+        _print_result(key, result)
+
+    return results
+
+
+def _print_result(key, result):
+    rate = f"{result['mb_per_s']:>9.3f} MB/s" if "mb_per_s" in result else f"{result['pages_per_s']:>9.0f} pág/s"
+    print(f"{key:<60} {result['seconds'] * 1000:>10.2f} ms  {rate}  pico {result['peak_kb']:>10.1f} KB  ({result['rounds']} rodadas)")
+
+
+# ========== BASELINES ==========
+def environment_info():
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "processor": platform.processor(),
+    }
+
+
+def load_baselines(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(results, path=BASELINES_PATH, previous=None):
+    """Grava os resultados como baseline (mantém casos que não foram executados)"""
+    merged = dict(previous["results"]) if previous else {}
+    merged.update({key: {"seconds": round(r["seconds"], 6), "peak_kb": r["peak_kb"]} for key, r in results.items()})
+    data = {"environment": environment_info(), "results": dict(sorted(merged.items()))}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def compare(results, baselines, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """Lista de regressões: casos mais lentos ou com pico de memória acima da tolerância"""
+    regressions = []
+    for key, result in results.items():
+        base = baselines["results"].get(key)
+        if not base:
+            continue
+        time_ratio = result["seconds"] / base["seconds"]
+        memory_ratio = result["peak_kb"] / base["peak_kb"] if base["peak_kb"] else 1.0
+        if time_ratio > 1 + time_tolerance and result["seconds"] - base["seconds"] > TIME_NOISE_FLOOR:
+            regressions.append((key, "tempo", base["seconds"] * 1000, result["seconds"] * 1000, time_ratio))
+        if memory_ratio > 1 + memory_tolerance and result["peak_kb"] - base["peak_kb"] > MEMORY_NOISE_FLOOR_KB:
+            regressions.append((key, "memória", base["peak_kb"], result["peak_kb"], memory_ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks dos analisadores de SEO/GEO sobre o corpus de páginas")
+    parser.add_argument("--only", nargs="*", help="roda apenas casos cujo nome contenha algum destes termos")
+    parser.add_argument("--min-time", type=float, default=0.5, help="tempo mínimo de medição por caso, em segundos")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true", help="grava os resultados em baselines.json")
+    parser.add_argument("--json", help="salva os resultados completos neste arquivo")
+    args = parser.parse_args(argv)
+
+    pages = load_corpus()
+    print(f"Corpus: {len(pages)} páginas, {sum(p.size for p in pages) / 1e6:.2f} MB\n")
+    results = run(pages, only=args.only, min_time=args.min_time)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment_info(), "results": results}, f, ensure_ascii=False, indent=2)
+
+    baselines = load_baselines()
+    if args.update_baseline:
+        save_baselines(results, previous=baselines)
+        print(f"\nBaselines gravados em {BASELINES_PATH}")
+        return 0
+
+    if baselines is None:
+        print("\nSem baselines para comparar (use --update-baseline)")
+        return 0
+
+    if baselines.get("environment") != environment_info():
+        print(f"\nAviso: baselines medidos em outro ambiente ({baselines.get('environment')})")
+
+    regressions = compare(results, baselines, args.time_tolerance, args.memory_tolerance)
+    if not regressions:
+        print("\nNenhuma regressão em relação aos baselines")
+        return 0
+
+    print(f"\n{len(regressions)} regressões:")
+    for key, kind, before, after, ratio in regressions:
+        unit = "ms" if kind == "tempo" else "KB"
+        print(f"  REGRESSÃO {kind:<8} {key:<60} {before:.2f} -> {after:.2f} {unit} ({ratio:.2f}x)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# ==============================================================================
+# BENCHMARKS DAS ETAPAS DE REDE
+# Mede crawler, checagem de links, teste de acessibilidade, on-page e PSI contra
+# o site sintético de benchmarks/mock_site.py (em outro processo), sem acesso à
+# internet. Cada cenário define latência, erros e redirecionamentos do site; os
+# resultados são comparados com benchmarks/baselines_network.json.
+#
+# Uso (a partir da raiz do repositório):
+#   python benchmarks/run_network_benchmarks.py
+#   python benchmarks/run_network_benchmarks.py --only latencia --update-baseline
+# ==============================================================================
+import argparse
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from mock_site import PSI_PATH, MockSiteProcess, _free_port  # noqa: E402
+
+BASELINES_PATH = os.path.join(BENCH_DIR, "baselines_network.json")
+HOST = "127.0.0.1"
+
+# Páginas rastreadas por execução do crawler
+CRAWL_PAGES = 20
+
+SCENARIOS = {
+    "local": {"pages": 60, "fanout": 5, "payload_kb": 20},
+    "latencia_50ms": {"pages": 60, "fanout": 5, "payload_kb": 20, "latency_ms": 50, "jitter_ms": 20, "psi_latency_ms": 300},
+    "site_instavel": {"pages": 60, "fanout": 5, "payload_kb": 20, "latency_ms": 20, "error_rate": 0.1,
+                      "broken_rate": 0.1, "redirect_rate": 0.1, "psi_error_rate": 0.3},
+}
+
+NETWORK_CASE_NAMES = (
+    "test_url_accessibility",
+    "onpage_checks",
+    "check_broken_links",
+    "extract_site_structure",
+    "get_pagespeed_insights",
+    "audit_images",
+    "run_lite_lab",
+)
+
+
+def network_cases(site, seo):
+    """Casos medidos em um cenário: nome -> função sem argumentos"""
+    import image_audit
+    import lite_lab
+
+    page_url = site.page_url(1)
+    _, home_links, _ = seo.onpage_checks(site.base_url)
+    content, encoding = seo.fetch_page(page_url)
+    _, _, soup = seo.onpage_checks_html(seo.decode_html(content, encoding), page_url)
+    images = image_audit.extract_images(soup, page_url)
+    assets = lite_lab.extract_resources(soup, page_url)
+    # O lite lab recebe as imagens já verificadas e não usa o cache de subrecursos: o caso mede a busca de CSS/JS
+    image_result = image_audit.audit_images(images, cache=None)
+    return {
+        "test_url_accessibility": lambda: seo.test_url_accessibility(page_url),
+        "onpage_checks": lambda: seo.onpage_checks(page_url),
+        "check_broken_links": lambda: seo.check_broken_links(site.base_url, home_links),
+        "extract_site_structure": lambda: seo.extract_site_structure(site.base_url, crawl_pages=CRAWL_PAGES),
+        "get_pagespeed_insights": lambda: seo.get_pagespeed_insights(page_url),
+        "audit_images": lambda: image_audit.audit_images(images, cache=None),
+        "run_lite_lab": lambda: lite_lab.run_lite_lab(page_url, len(content), assets, images, image_result, cache=None),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks das etapas de rede contra o site sintético local")
+    parser.add_argument("--only", nargs="*", help="roda apenas casos cujo nome contenha algum destes termos")
+    parser.add_argument("--min-time", type=float, default=0.5, help="tempo mínimo de medição por caso, em segundos")
+    parser.add_argument("--port", type=int, default=0, help="porta do site sintético (0 = porta livre)")
+    parser.add_argument("--update-baseline", action="store_true", help="grava os resultados em baselines_network.json")
+    args = parser.parse_args(argv)
+
+    # O PSI é configurado por variáveis de ambiente lidas na importação de seo_analysis,
+    # por isso a porta é fixada antes e reaproveitada em todos os cenários
+    port = args.port or _free_port(HOST)
+    os.environ["PSI_API_URL"] = f"http://{HOST}:{port}{PSI_PATH}"
+    os.environ.setdefault("PSI_API_KEY", "mock")
+    # Sem espera entre novas tentativas: o jitter aleatório tornaria os tempos instáveis
+    # (as novas tentativas continuam aparecendo em req/chamada)
+    os.environ.setdefault("HTTP_BACKOFF_BASE_SECONDS", "0")
+    from run_benchmarks import compare, load_baselines, measure, save_baselines, TIME_TOLERANCE, MEMORY_TOLERANCE
+    import seo_analysis
+
+    results = {}
+    for scenario, options in SCENARIOS.items():
+        if args.only and not any(term in f"{scenario}/{case}" for term in args.only for case in NETWORK_CASE_NAMES):
+            continue
+        with MockSiteProcess(HOST, port, **options) as site:
+            for case, func in network_cases(site, seo_analysis).items():
+                key = f"{scenario}/{case}"
+                if args.only and not any(term in key for term in args.only):
+                    continue
+                site.reset_stats()
+                result = measure(func, args.min_time)
+                stats = site.stats()
+                calls = result["rounds"] + 2  # aquecimento e execução do tracemalloc
+                result["requests_per_call"] = round(stats["requests"] / calls, 1)
+                result["max_in_flight"] = stats["max_in_flight"]
+                results[key] = result
+                print(f"{key:<50} {result['seconds'] * 1000:>10.1f} ms  {result['requests_per_call']:>6.1f} req/chamada  "
+                      f"concorrência máx. {result['max_in_flight']:>3}  pico {result['peak_kb']:>9.1f} KB")
+
+    baselines = load_baselines(BASELINES_PATH)
+    if args.update_baseline:
+        save_baselines(results, BASELINES_PATH, previous=baselines)
+        print(f"\nBaselines gravados em {BASELINES_PATH}")
+        return 0
+    if baselines is None:
+        print("\nSem baselines para comparar (use --update-baseline)")
+        return 0
+
+    regressions = compare(results, baselines, TIME_TOLERANCE, MEMORY_TOLERANCE)
+    if not regressions:
+        print("\nNenhuma regressão em relação aos baselines")
+        return 0
+    print(f"\n{len(regressions)} regressões:")
+    for key, kind, before, after, ratio in regressions:
+        unit = "ms" if kind == "tempo" else "KB"
+        print(f"  REGRESSÃO {kind:<8} {key:<50} {before:.2f} -> {after:.2f} {unit} ({ratio:.2f}x)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
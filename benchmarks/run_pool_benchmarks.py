@@ -0,0 +1,72 @@
+# ==============================================================================
+# VAZÃO DO POOL DE PROCESSOS
+# Mede páginas por segundo da análise de CPU (parse + conteúdo + GEO + dados
+# estruturados, ver page_worker.py) sobre o corpus, na própria thread e com
+# pools de tamanhos crescentes, simulando auditorias simultâneas. O resultado
+# depende do número de núcleos da máquina, por isso não há baseline.
+#
+# Uso (a partir da raiz do repositório):
+#   python benchmarks/run_pool_benchmarks.py
+#   python benchmarks/run_pool_benchmarks.py --workers 1 4 16 --rounds 5
+# ==============================================================================
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import page_worker  # noqa: E402
+from run_benchmarks import load_corpus  # noqa: E402
+
+OPTIONS = {'deep_analysis': True, 'content_analysis': True, 'geo_analysis': True, 'ai_insights': True,
+           'image_audit': True, 'lite_lab': True}
+
+
+def default_worker_counts():
+    cores = os.cpu_count() or 1
+    counts = [0]
+    workers = 1
+    while workers < cores:
+        counts.append(workers)
+        workers *= 2
+    return counts + [cores]
+
+
+def measure_throughput(pages, workers, rounds):
+    """Analisa `rounds` vezes todas as páginas, enviadas de uma vez; devolve páginas/s"""
+    page_worker.CPU_WORKERS = workers
+    page_worker._pool = None
+    if workers:
+        # Aquecimento: sobe os processos antes de medir
+        [analysis.result() for analysis in [page_worker.PageAnalysis(*page, OPTIONS) for page in pages[:workers]]]
+    t0 = time.perf_counter()
+    pending = [page_worker.PageAnalysis(*page, OPTIONS) for _ in range(rounds) for page in pages]
+    for analysis in pending:
+        analysis.result()
+    elapsed = time.perf_counter() - t0
+    if page_worker._pool is not None:
+        page_worker._pool.shutdown()
+    return len(pending) / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vazão da análise de CPU com e sem o pool de processos")
+    parser.add_argument("--workers", type=int, nargs="*", help="tamanhos de pool a medir (0 = sem pool)")
+    parser.add_argument("--rounds", type=int, default=3, help="passadas pelo corpus em cada medição")
+    args = parser.parse_args(argv)
+
+    # As páginas muito grandes dominariam o tempo; a vazão é medida nas de tamanho comum
+    pages = [(page.html.encode("utf-8"), "utf-8", page.url) for page in load_corpus() if page.size < 2**20]
+    baseline = None
+    for workers in args.workers or default_worker_counts():
+        rate = measure_throughput(pages, workers, args.rounds)
+        baseline = baseline or rate
+        label = "sem pool" if workers == 0 else f"{workers} processos"
+        print(f"{label:<14} {rate:>8.1f} páginas/s  ({rate / baseline:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# ==============================================================================
+# GEO DO SITE
+# O score GEO (analyze_geo_ai_optimization) calculado em todas as páginas
+# rastreadas, não só na URL analisada. Os indicadores de cada página são
+# acumulados durante o crawl em arrays compactos (uma linha por página) e as
+# distribuições do site (percentis, piores páginas e a fração de páginas sem
+# schema Article, autor ou data) saem de operações vetorizadas do NumPy.
+# ==============================================================================
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from scoring import geo_metrics
+
+# Indicadores numéricos por página (nomes de geo_metrics, mais o próprio score)
+GEO_COLUMNS = (
+    "geo_score", "word_count", "faq_indicators", "lists_count", "tables_count", "headings_count",
+    "hierarchy_score", "factual_indicators", "citations", "authoritative_links", "definitions",
+    "examples", "comparisons", "step_by_step",
+)
+# Sinais de autoridade (sim/não) por página
+GEO_FLAGS = ("article_schema", "author_mentioned", "date_mentioned")
+
+GEO_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class GeoSiteBuilder:
+    """Acumula os indicadores GEO de cada página rastreada, sem guardar os dicionários"""
+
+    def __init__(self):
+        self.urls = []
+        self._values = array("d")
+        self._flags = array("b")
+
+    def add(self, url, geo_analysis):
+        """Registra o resultado de analyze_geo_ai_optimization de uma página"""
+        metrics = geo_metrics(geo_analysis)
+        metrics["geo_score"] = geo_analysis.get("geo_score", 0)
+        self.urls.append(url)
+        self._values.extend(float(metrics.get(name) or 0) for name in GEO_COLUMNS)
+        self._flags.extend(bool(metrics.get(name)) for name in GEO_FLAGS)
+
+    def build(self):
+        """Gera as matrizes páginas x indicadores"""
+        n = len(self.urls)
+        values = np.frombuffer(self._values, dtype=np.float64).reshape(n, len(GEO_COLUMNS)).copy()
+        flags = np.frombuffer(self._flags, dtype=np.int8).reshape(n, len(GEO_FLAGS)).astype(bool)
+        return SiteGeo(list(self.urls), values, flags)
+
+
+class SiteGeo:
+    """Indicadores GEO de todas as páginas rastreadas, em matrizes páginas x indicadores"""
+
+    def __init__(self, urls, values, flags):
+        self.urls = urls
+        self.values = values
+        self.flags = flags
+
+    @property
+    def page_count(self):
+        return len(self.urls)
+
+    def column(self, name):
+        return self.values[:, GEO_COLUMNS.index(name)]
+
+    def percentiles(self, q=GEO_PERCENTILES):
+        """Percentis de cada indicador: {indicador: [valor em cada percentil de q]}"""
+        if self.page_count == 0:
+            return {}
+        table = np.percentile(self.values, q, axis=0)
+        return {name: table[:, i].round(1).tolist() for i, name in enumerate(GEO_COLUMNS)}
+
+    def missing_share(self):
+        """Fração das páginas sem cada sinal de autoridade, e sem nenhum deles"""
+        if self.page_count == 0:
+            return {}
+        missing = ~self.flags
+        share = dict(zip(GEO_FLAGS, missing.mean(axis=0).tolist()))
+        share["all"] = float(missing.all(axis=1).mean())
+        return share
+
+    def worst_pages(self, n=10):
+        """Índices das n páginas com menor score GEO (do pior para o melhor)"""
+        scores = self.column("geo_score")
+        n = min(n, self.page_count)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        # Seleção parcial antes de ordenar: só as n piores são ordenadas
+        candidates = np.argpartition(scores, n - 1)[:n]
+        return candidates[np.argsort(scores[candidates], kind="stable")]
+
+    def score_histogram(self, bins=10):
+        """Quantidade de páginas por faixa de score GEO (0-100)"""
+        counts, edges = np.histogram(self.column("geo_score"), bins=bins, range=(0, 100))
+        return counts, edges
+
+    def summary(self, worst=10):
+        """Resumo compacto para o dashboard: distribuições, sinais ausentes e piores páginas"""
+        if self.page_count == 0:
+            return {"pages": 0}
+        scores = self.column("geo_score")
+        missing = ~self.flags
+        return {
+            "pages": self.page_count,
+            "mean_score": round(float(scores.mean()), 1),
+            "percentiles": self.percentiles(),
+            "missing_share": self.missing_share(),
+            "worst": [{
+                "url": self.urls[i],
+                "geo_score": float(scores[i]),
+                "word_count": int(self.column("word_count")[i]),
+                "missing": [name for name, absent in zip(GEO_FLAGS, missing[i]) if absent],
+            } for i in self.worst_pages(worst)],
+        }
+
+    def to_frame(self):
+        """Tabela com os indicadores por página"""
+        frame = pd.DataFrame(self.values, columns=list(GEO_COLUMNS))
+        frame[list(GEO_FLAGS)] = self.flags
+        frame.insert(0, "url", self.urls)
+        return frame
@@ -0,0 +1,200 @@
+# ==============================================================================
+# CHAMADAS HTTP RESILIENTES
+# Todas as requisições de saída (páginas, crawl, links e PSI) passam por aqui:
+# novas tentativas com backoff exponencial e jitter em 429/5xx e falhas de
+# conexão, um circuit breaker por host que falha rápido quando o host está fora
+# do ar e, opcionalmente, uma segunda requisição ("hedged") quando a primeira
+# demora demais.
+# ==============================================================================
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import requests
+
+from instrumentation import current_span, span
+
+HTTP_MAX_ATTEMPTS = int(os.getenv("HTTP_MAX_ATTEMPTS", "3"))
+HTTP_BACKOFF_BASE_SECONDS = float(os.getenv("HTTP_BACKOFF_BASE_SECONDS", "0.5"))
+HTTP_BACKOFF_MAX_SECONDS = float(os.getenv("HTTP_BACKOFF_MAX_SECONDS", "8"))
+# Falhas seguidas que abrem o circuito de um host, e por quanto tempo ele fica aberto
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# Respostas que valem nova tentativa
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Respostas que indicam o host (e não só a página) fora do ar
+HOST_DOWN_STATUSES = frozenset({502, 503, 504})
+TRANSIENT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+RetryPolicy = namedtuple("RetryPolicy", ["attempts", "base", "max_delay", "statuses"])
+RetryPolicy.__doc__ = """Tentativas e backoff: espera aleatória entre 0 e min(max_delay, base * 2**tentativa)"""
+
+DEFAULT_RETRY = RetryPolicy(HTTP_MAX_ATTEMPTS, HTTP_BACKOFF_BASE_SECONDS, HTTP_BACKOFF_MAX_SECONDS, RETRY_STATUSES)
+NO_RETRY = RetryPolicy(1, 0.0, 0.0, frozenset())
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """O circuito do host está aberto: a requisição nem chegou a ser feita"""
+
+
+# ========== CIRCUIT BREAKER ==========
+class CircuitBreaker:
+    """Estado de um host: fechado, aberto (falha rápido) ou meio-aberto (uma requisição de teste)"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold=CIRCUIT_FAILURE_THRESHOLD, reset_after=CIRCUIT_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """A requisição pode seguir? Depois do intervalo, libera só uma de teste"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_after:
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class CircuitBreakers:
+    """Um circuit breaker por host, compartilhado por todas as auditorias do processo"""
+
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker()
+            return self._breakers[host]
+
+    def open_hosts(self):
+        with self._lock:
+            return sorted(host for host, breaker in self._breakers.items() if breaker.state != CircuitBreaker.CLOSED)
+
+    def clear(self):
+        with self._lock:
+            self._breakers.clear()
+
+
+BREAKERS = CircuitBreakers()
+
+
+# ========== REQUISIÇÕES ==========
+def _backoff(policy, attempt, response=None):
+    """Espera antes da próxima tentativa (respeita o Retry-After do servidor, se houver)"""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), policy.max_delay)
+    return random.uniform(0, min(policy.max_delay, policy.base * 2 ** attempt))
+
+
+def _hedged(method, url, hedge_after, **kwargs):
+    """Dispara uma segunda requisição igual se a primeira não responder em hedge_after segundos
+
+    Fica a primeira resposta que não precise de nova tentativa; a outra é abandonada.
+    """
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="http-hedge")
+    try:
+        futures = [executor.submit(requests.request, method, url, **kwargs)]
+        done, pending = wait(futures, timeout=hedge_after)
+        if not done:
+            hedge_span = current_span()
+            if hedge_span is not None:
+                hedge_span.attrs["hedged"] = True
+            futures.append(executor.submit(requests.request, method, url, **kwargs))
+            pending = set(futures)
+
+        response, error = None, None
+        while pending or done:
+            for future in done:
+                try:
+                    candidate = future.result()
+                except requests.exceptions.RequestException as e:
+                    error = e
+                    continue
+                if candidate.status_code not in RETRY_STATUSES:
+                    return candidate
+                response = response or candidate
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        if response is not None:
+            return response
+        raise error
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def request(method, url, retry=DEFAULT_RETRY, hedge_after=None, **kwargs):
+    """requests.request com novas tentativas, circuit breaker por host e hedge opcional
+
+    Depois da última tentativa devolve a resposta (mesmo 5xx, para quem chamou
+    decidir) ou levanta a exceção do requests. Com o circuito do host aberto,
+    levanta CircuitOpenError sem fazer a requisição.
+    """
+    breaker = BREAKERS.get(url)
+    for attempt in range(retry.attempts):
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuito aberto para {urlparse(url).netloc}: host indisponível")
+        last_attempt = attempt == retry.attempts - 1
+        try:
+            if hedge_after:
+                response = _hedged(method, url, hedge_after, **kwargs)
+            else:
+                response = requests.request(method, url, **kwargs)
+        except TRANSIENT_ERRORS:
+            breaker.record_failure()
+            if last_attempt:
+                raise
+            response = None
+        except requests.exceptions.RequestException:
+            # O host respondeu (ou a URL é inválida): não conta como host fora do ar
+            breaker.record_success()
+            raise
+        else:
+            if response.status_code in HOST_DOWN_STATUSES:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if last_attempt or response.status_code not in retry.statuses:
+                return response
+            # Libera a conexão da resposta descartada (importa com stream=True)
+            response.close()
+
+        with span("http_backoff", "fetch", url=url, attempt=attempt + 1,
+                  status=response.status_code if response is not None else None):
+            time.sleep(_backoff(retry, attempt, response))
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def head(url, **kwargs):
+    return request("HEAD", url, **kwargs)
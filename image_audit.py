@@ -0,0 +1,381 @@
+# ==============================================================================
+# AUDITORIA DE PESO DAS IMAGENS
+# Resolve as imagens da página (<img> e <picture>), escolhendo entre src,
+# srcset e <source> o arquivo que o navegador baixaria, e busca em paralelo só
+# os primeiros bytes de cada um (requisição com Range):
+# o tamanho total vem do Content-Range/Content-Length e o formato e as
+# dimensões são lidos do cabeçalho do arquivo, sem baixar a imagem inteira.
+# Imagens pesadas, maiores que o tamanho exibido ou em formatos antigos são
+# sinalizadas. O resultado de cada URL fica em cache entre páginas e auditorias.
+# ==============================================================================
+import contextvars
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urldefrag, urljoin
+
+import requests
+
+import http_client
+from instrumentation import span, traced
+
+# Imagens distintas verificadas por página e requisições simultâneas
+IMAGE_AUDIT_MAX_IMAGES = int(os.getenv("IMAGE_AUDIT_MAX_IMAGES", "40"))
+IMAGE_AUDIT_CONCURRENCY = int(os.getenv("IMAGE_AUDIT_CONCURRENCY", "8"))
+# Bytes lidos do início de cada imagem; JPEGs com EXIF grande ganham uma segunda leitura maior
+IMAGE_PROBE_BYTES = int(os.getenv("IMAGE_PROBE_BYTES", "16384"))
+IMAGE_PROBE_MAX_BYTES = int(os.getenv("IMAGE_PROBE_MAX_BYTES", "131072"))
+# Limites dos alertas
+IMAGE_MAX_KB = float(os.getenv("IMAGE_MAX_KB", "200"))
+IMAGE_LEGACY_MIN_KB = float(os.getenv("IMAGE_LEGACY_MIN_KB", "10"))
+IMAGE_SCALE_TOLERANCE = 1.5
+# Densidade de pixels da tela usada para escolher o candidato do srcset (2 = celular/retina)
+IMAGE_AUDIT_DPR = float(os.getenv("IMAGE_AUDIT_DPR", "2"))
+# Cache por URL de imagem, compartilhado pelo processo
+IMAGE_CACHE_TTL_SECONDS = float(os.getenv("IMAGE_CACHE_TTL_SECONDS", "3600"))
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "5000"))
+
+# Formatos que já têm alternativa bem mais leve (WebP/AVIF)
+LEGACY_FORMATS = frozenset({"jpeg", "png", "gif", "bmp", "tiff"})
+
+FLAG_LABELS = {
+    "oversized": "Arquivo pesado",
+    "unscaled": "Maior que o tamanho exibido",
+    "legacy_format": "Formato antigo",
+}
+
+_SRCSET_CANDIDATE = re.compile(r"\s*([^\s,][^\s]*?)(?:\s+([\d.]+[wx]))?\s*(?:,|$)")
+
+
+# ========== EXTRAÇÃO (NO HTML) ==========
+def _pixels(value):
+    """Largura/altura declarada no HTML, só quando é um número de pixels"""
+    match = re.fullmatch(r"\s*(\d+)(?:px)?\s*", value or "")
+    return int(match.group(1)) if match else None
+
+
+def _sizes_width(sizes):
+    """Maior largura de slot de um atributo sizes, só quando todos os slots são em pixels
+
+    Larguras relativas ao viewport (vw, calc) dependem da tela: sem elas não há
+    como saber o tamanho exibido.
+    """
+    widths = [_pixels(entry.strip().rsplit(None, 1)[-1]) for entry in (sizes or "").split(",") if entry.strip()]
+    if not widths or None in widths:
+        return None
+    return max(widths)
+
+
+def parse_srcset(srcset):
+    """Lista de (url, descritor) de um srcset; o descritor é '480w', '2x' ou None"""
+    candidates = []
+    for match in _SRCSET_CANDIDATE.finditer(srcset or ""):
+        if match.group(1):
+            candidates.append((match.group(1), match.group(2)))
+    return candidates
+
+
+def _descriptor(descriptor):
+    """('w', largura) ou ('x', densidade) de um descritor de srcset; sem descritor vale 1x"""
+    try:
+        if descriptor and descriptor.endswith("w"):
+            return "w", float(descriptor[:-1])
+        return "x", float(descriptor[:-1]) if descriptor else 1.0
+    except ValueError:
+        return "x", 1.0
+
+
+def select_candidate(src, srcset, display_width, dpr=IMAGE_AUDIT_DPR):
+    """URL que o navegador baixaria entre o src e os candidatos do srcset
+
+    Com descritores 'w', é o menor arquivo com largura >= largura exibida x
+    DPR (ou o maior, se nenhum chega lá); sem largura exibida conhecida, fica o
+    src ou o maior candidato. Com descritores 'x' (o src conta como 1x), é a
+    menor densidade >= DPR. Só um candidato é baixado, então só ele é verificado.
+    """
+    candidates = [(*_descriptor(descriptor), url) for url, descriptor in parse_srcset(srcset)]
+    widths = sorted((value, url) for kind, value, url in candidates if kind == "w")
+    if widths:
+        if display_width is None:
+            return src or widths[-1][1]
+        target = display_width * dpr
+        return next((url for width, url in widths if width >= target), widths[-1][1])
+    densities = sorted((value, url) for _, value, url in candidates)
+    if src and not any(value == 1.0 for value, _ in densities):
+        densities = sorted(densities + [(1.0, src)])
+    if not densities:
+        return src
+    return next((url for density, url in densities if density >= dpr), densities[-1][1])
+
+
+def extract_images(soup, page_url):
+    """Imagens exibidas na página, com o arquivo baixado e a largura em que aparece
+
+    Cada <img> (com o <picture> em volta, se houver) vira uma imagem: o arquivo
+    é o candidato que o navegador escolheria (ver select_candidate). No
+    <picture> vale o primeiro <source> sem media (os formatos modernos são
+    suportados); com media não há como avaliar a tela e vale o próprio <img>.
+    `display_width` é o atributo width do <img> ou, sem ele, a largura em
+    pixels do atributo sizes (None quando não há como saber). O descritor 'w'
+    do srcset é a largura do próprio arquivo, não a exibida. A mesma URL em
+    várias tags aparece uma vez: o navegador baixa o arquivo uma vez só.
+    """
+    images = OrderedDict()
+
+    def add(src, display_width, display_height=None):
+        if not src or src.startswith("data:"):
+            return
+        url = urldefrag(urljoin(page_url, src.strip()))[0]
+        if not url.startswith(("http://", "https://")):
+            return
+        known = images.get(url)
+        if known is None:
+            images[url] = {"url": url, "display_width": display_width, "display_height": display_height}
+        elif known["display_width"] is None or (display_width or 0) > known["display_width"]:
+            known.update(display_width=display_width, display_height=display_height)
+
+    for img in soup.find_all("img"):
+        width, height = _pixels(img.get("width")), _pixels(img.get("height"))
+        sizes = img.get("sizes")
+        src = img.get("src") or img.get("data-src")
+        srcset = img.get("srcset") or img.get("data-srcset")
+        if img.parent is not None and img.parent.name == "picture":
+            source = next((tag for tag in img.parent.find_all("source", recursive=False)
+                           if not tag.get("media") and (tag.get("srcset") or tag.get("data-srcset"))), None)
+            if source is not None:
+                src, srcset = None, source.get("srcset") or source.get("data-srcset")
+                sizes = source.get("sizes") or sizes
+        if width is None:
+            width, height = _sizes_width(sizes), None
+        add(select_candidate(src, srcset, width), width, height)
+    return list(images.values())
+
+
+# ========== DIMENSÕES PELO CABEÇALHO ==========
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_size(data):
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+    return None
+
+
+def _webp_size(data):
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25:
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+    return None
+
+
+def _isobmff_size(data):
+    # AVIF/HEIF: a caixa 'ispe' guarda largura e altura da imagem principal
+    index = data.find(b"ispe")
+    if index < 0 or len(data) < index + 16:
+        return None
+    return struct.unpack(">II", data[index + 8:index + 16])
+
+
+def image_info(data):
+    """(formato, largura, altura) a partir dos primeiros bytes do arquivo
+
+    Formatos reconhecidos: JPEG, PNG, GIF, WebP, AVIF/HEIF, BMP, TIFF e SVG.
+    As dimensões ficam None quando não estão nos bytes lidos (ou no SVG).
+    """
+    size = None
+    if data.startswith(b"\xff\xd8"):
+        fmt, size = "jpeg", _jpeg_size(data)
+    elif data.startswith(b"\x89PNG\r\n\x1a\n"):
+        fmt = "png"
+        if len(data) >= 24:
+            size = struct.unpack(">II", data[16:24])
+    elif data[:6] in (b"GIF87a", b"GIF89a"):
+        fmt = "gif"
+        if len(data) >= 10:
+            size = struct.unpack("<HH", data[6:10])
+    elif data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        fmt, size = "webp", _webp_size(data)
+    elif data[4:8] == b"ftyp":
+        fmt = "avif" if data[8:12] in (b"avif", b"avis") else "heif"
+        size = _isobmff_size(data)
+    elif data.startswith(b"BM"):
+        fmt = "bmp"
+        if len(data) >= 26:
+            width, height = struct.unpack("<ii", data[18:26])
+            size = (width, abs(height))
+    elif data[:4] in (b"II*\x00", b"MM\x00*"):
+        fmt = "tiff"
+    elif b"<svg" in data[:1024].lower():
+        fmt = "svg"
+    else:
+        fmt = None
+    width, height = size if size else (None, None)
+    return fmt, width, height
+
+
+# ========== CACHE POR URL ==========
+class ImageProbeCache:
+    """Resultado da leitura de cada URL de imagem, com validade e limite de entradas (LRU)"""
+
+    def __init__(self, ttl=IMAGE_CACHE_TTL_SECONDS, max_entries=IMAGE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(url)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, url, probe):
+        with self._lock:
+            self._entries[url] = (time.monotonic(), probe)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+IMAGE_CACHE = ImageProbeCache()
+
+
+# ========== LEITURA PARCIAL ==========
+def _total_size(response):
+    """Tamanho do arquivo inteiro: Content-Range na resposta 206, Content-Length na 200"""
+    if response.status_code == 206:
+        total = response.headers.get("Content-Range", "").rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length)
+    return None
+
+
+def _read_head(url, limit):
+    """Primeiros `limit` bytes da imagem e a resposta (já fechada)"""
+    headers = {"User-Agent": "Mozilla/5.0", "Range": f"bytes=0-{limit - 1}"}
+    with span("image_probe", "fetch", url=url) as probe_span:
+        response = http_client.get(url, headers=headers, timeout=10, stream=True)
+        try:
+            # Servidor que ignora o Range devolve 200 com o arquivo todo: lê só o começo
+            data = response.raw.read(limit, decode_content=True) if response.status_code < 400 else b""
+        finally:
+            response.close()
+        probe_span.add(bytes=len(data))
+    return response, data
+
+
+def probe_image(url):
+    """Formato, dimensões e tamanho de uma imagem lendo só o início do arquivo"""
+    try:
+        response, data = _read_head(url, IMAGE_PROBE_BYTES)
+        if response.status_code >= 400:
+            return {"status": response.status_code, "error": f"HTTP {response.status_code}"}
+        total = _total_size(response)
+        fmt, width, height = image_info(data)
+        if fmt == "jpeg" and width is None and len(data) == IMAGE_PROBE_BYTES and IMAGE_PROBE_MAX_BYTES > IMAGE_PROBE_BYTES:
+            response, data = _read_head(url, IMAGE_PROBE_MAX_BYTES)
+            fmt, width, height = image_info(data)
+        if total is None and len(data) < IMAGE_PROBE_BYTES:
+            total = len(data)
+    except requests.exceptions.RequestException as e:
+        return {"status": None, "error": str(e)[:120]}
+    content_type = response.headers.get("Content-Type", "")
+    if fmt is None and content_type.startswith("image/"):
+        # Formato não reconhecido pelos bytes: fica o do Content-Type (ex.: image/x-icon -> x-icon)
+        fmt = content_type[len("image/"):].split(";")[0].split("+")[0].strip() or None
+    return {"status": response.status_code, "format": fmt, "width": width, "height": height, "bytes": total}
+
+
+def image_flags(image):
+    """Problemas de uma imagem já verificada (chaves de FLAG_LABELS)"""
+    flags = []
+    size = image.get("bytes")
+    if size is not None and size > IMAGE_MAX_KB * 1024:
+        flags.append("oversized")
+    display_width, width = image.get("display_width"), image.get("width")
+    # Em telas de alta densidade o arquivo pode ter DPR x a largura exibida
+    if display_width and width and width > display_width * IMAGE_AUDIT_DPR * IMAGE_SCALE_TOLERANCE:
+        flags.append("unscaled")
+    if image.get("format") in LEGACY_FORMATS and (size is None or size >= IMAGE_LEGACY_MIN_KB * 1024):
+        flags.append("legacy_format")
+    return flags
+
+
+@traced("external")
+def audit_images(images, cache=IMAGE_CACHE):
+    """Verifica as imagens extraídas por extract_images e resume o peso da página
+
+    As leituras rodam em paralelo (IMAGE_AUDIT_CONCURRENCY) e URLs já vistas
+    vêm do cache, sem nova requisição. Cada imagem é só o arquivo que o
+    navegador baixa, então o peso total não soma os outros candidatos do srcset.
+    """
+    images = images[:IMAGE_AUDIT_MAX_IMAGES]
+    probes = {}
+    pending = []
+    for image in images:
+        cached = cache.get(image["url"]) if cache is not None else None
+        if cached is None:
+            pending.append(image["url"])
+        else:
+            probes[image["url"]] = cached
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=IMAGE_AUDIT_CONCURRENCY, thread_name_prefix="image-probe") as executor:
+            # Cada leitura roda no contexto (trace) da auditoria
+            futures = {url: executor.submit(contextvars.copy_context().run, probe_image, url) for url in pending}
+            for url, future in futures.items():
+                probes[url] = future.result()
+                if cache is not None and probes[url].get("status") is not None:
+                    cache.put(url, probes[url])
+
+    checked = []
+    for image in images:
+        entry = {**image, **probes[image["url"]]}
+        entry["flags"] = image_flags(entry) if "error" not in entry else []
+        checked.append(entry)
+
+    sizes = [image["bytes"] for image in checked if image.get("bytes")]
+    return {
+        "images": checked,
+        "checked": len(checked),
+        "total_bytes": sum(sizes),
+        "largest_bytes": max(sizes, default=0),
+        "errors": sum("error" in image for image in checked),
+        **{flag: sum(flag in image["flags"] for image in checked) for flag in FLAG_LABELS},
+    }
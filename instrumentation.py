@@ -0,0 +1,390 @@
+# ==============================================================================
+# INSTRUMENTAÇÃO DE TEMPO POR ETAPA
+# Cada busca, parse, analisador e chamada externa abre um "span" com duração,
+# contagem e bytes. Os spans de uma auditoria formam um trace (exibido como
+# waterfall e exportável em JSON) e também alimentam métricas agregadas por
+# etapa (percentis), expostas no formato de texto do Prometheus.
+#
+# Com o rastreamento de memória ligado (tracemalloc), cada span registra também
+# o pico e a memória retida pela etapa. O tracemalloc mede o processo inteiro:
+# com auditorias simultâneas, o pico de uma etapa inclui o que as outras
+# alocaram no mesmo intervalo. O orçamento de memória vale para o crescimento
+# durante a auditoria (acima da memória no início dela), não para o total do
+# processo, que inclui os caches de longa duração.
+# ==============================================================================
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+_current_trace = contextvars.ContextVar("audit_trace", default=None)
+_current_span = contextvars.ContextVar("audit_span", default=None)
+
+# Quantas durações recentes cada etapa guarda para o cálculo de percentis
+METRICS_WINDOW = 1000
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Orçamento de pico de memória por auditoria, acima da memória do processo no
+# início dela (0 = sem limite). Definir um orçamento liga o rastreamento de
+# memória, que também pode ser ligado sozinho
+AUDIT_MEMORY_BUDGET_MB = float(os.getenv("AUDIT_MEMORY_BUDGET_MB", "0"))
+AUDIT_MEMORY_TRACKING = os.getenv("AUDIT_MEMORY_TRACKING", "1" if AUDIT_MEMORY_BUDGET_MB > 0 else "0") == "1"
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    """A memória cresceu mais que o orçamento desde o início da auditoria"""
+
+    def __init__(self, stage, used, budget):
+        self.stage = stage
+        self.used = used
+        self.budget = budget
+        super().__init__(
+            f"Auditoria interrompida na etapa '{stage}': pico de memória de {used / 2**20:.1f} MB "
+            f"acima do orçamento de {budget / 2**20:g} MB"
+        )
+
+
+class Span:
+    """Uma etapa medida: nome, categoria, início relativo, duração, contagem e bytes"""
+
+    __slots__ = ("name", "category", "start", "duration", "count", "bytes", "depth", "attrs", "error",
+                 "mem_peak", "mem_delta", "_mem_start", "_mem_peak_abs", "__weakref__")
+
+    def __init__(self, name, category, start, depth, attrs):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.duration = 0.0
+        self.count = 1
+        self.bytes = 0
+        self.depth = depth
+        self.attrs = attrs
+        self.error = None
+        # Pico acima do início da etapa e memória que continuou alocada ao final (bytes)
+        self.mem_peak = None
+        self.mem_delta = None
+        self._mem_start = 0
+        self._mem_peak_abs = 0
+
+    def add(self, count=0, bytes=0):
+        """Acumula itens processados e bytes transferidos nesta etapa"""
+        self.count += count
+        self.bytes += bytes
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "category": self.category,
+            "start": round(self.start, 4),
+            "duration": round(self.duration, 4),
+            "count": self.count,
+            "bytes": self.bytes,
+            "depth": self.depth,
+            "attrs": self.attrs,
+            "error": self.error,
+            "mem_peak": self.mem_peak,
+            "mem_delta": self.mem_delta,
+        }
+
+
+class AuditTrace:
+    """Todos os spans de uma auditoria, com tempos relativos ao início dela"""
+
+    def __init__(self, label, memory_budget=None):
+        self.label = label
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+        self.total = None
+        self.spans = []
+        self._lock = threading.Lock()
+        # Orçamento de pico acima do início da auditoria, em bytes (None = sem limite)
+        self.memory_budget = memory_budget
+        # Memória do processo no início e maior valor visto enquanto a auditoria roda (ver _track_memory)
+        self._mem_start = 0
+        self._mem_peak_abs = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self._t0
+
+    @property
+    def memory_peak(self):
+        """Pico de memória do processo durante a auditoria, acima do início dela (None sem rastreamento)"""
+        return self._mem_peak_abs - self._mem_start if tracemalloc.is_tracing() else None
+
+    @property
+    def over_budget(self):
+        """O pico desde o início da auditoria passou do orçamento
+
+        A base é a memória no início, então caches que já estavam cheios não
+        contam; com auditorias simultâneas, o que as outras alocam no mesmo
+        intervalo conta (o tracemalloc mede o processo inteiro).
+        """
+        return bool(self.memory_budget) and tracemalloc.is_tracing() and self.memory_peak > self.memory_budget
+
+    def record(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "started_at": self.started_at.isoformat(),
+            "total": round(self.total if self.total is not None else self.elapsed(), 4),
+            "memory_peak": self.memory_peak,
+            "memory_budget": self.memory_budget,
+            "spans": [span.to_dict() for span in sorted(self.spans, key=lambda s: s.start)],
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+
+class StageMetrics:
+    """Agregado de todas as auditorias do processo: durações recentes e totais por etapa"""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._totals = {}
+        self._memory_peaks = {}
+
+    def observe(self, span):
+        key = (span.name, span.category)
+        with self._lock:
+            self._durations.setdefault(key, deque(maxlen=self.window)).append(span.duration)
+            count, total, total_bytes, errors = self._totals.get(key, (0, 0.0, 0, 0))
+            self._totals[key] = (count + 1, total + span.duration, total_bytes + span.bytes, errors + (span.error is not None))
+            if span.mem_peak is not None:
+                self._memory_peaks[key] = max(self._memory_peaks.get(key, 0), span.mem_peak)
+
+    def summary(self):
+        """Percentis (janela recente) e totais acumulados de cada etapa"""
+        with self._lock:
+            items = [(key, np.array(self._durations[key]), self._totals[key]) for key in self._durations]
+            memory_peaks = dict(self._memory_peaks)
+        rows = []
+        for (name, category), durations, (count, total, total_bytes, errors) in sorted(items):
+            row = {"stage": name, "category": category, "count": count, "sum": total, "bytes": total_bytes, "errors": errors}
+            if memory_peaks:
+                row["mem_peak_max"] = memory_peaks.get((name, category))
+            for q, value in zip(QUANTILES, np.quantile(durations, QUANTILES)):
+                row[f"p{int(q * 100)}"] = float(value)
+            rows.append(row)
+        return rows
+
+    def to_prometheus(self):
+        """Métricas no formato de texto do Prometheus"""
+        lines = [
+            "# HELP seo_audit_stage_seconds Duração das etapas das auditorias",
+            "# TYPE seo_audit_stage_seconds summary",
+        ]
+        summary = self.summary()
+        for row in summary:
+            labels = f'stage="{row["stage"]}",category="{row["category"]}"'
+            for q in QUANTILES:
+                lines.append(f'seo_audit_stage_seconds{{{labels},quantile="{q}"}} {row[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f"seo_audit_stage_seconds_sum{{{labels}}} {row['sum']:.6f}")
+            lines.append(f"seo_audit_stage_seconds_count{{{labels}}} {row['count']}")
+        lines += ["# HELP seo_audit_stage_bytes_total Bytes transferidos por etapa", "# TYPE seo_audit_stage_bytes_total counter"]
+        for row in summary:
+            lines.append(f'seo_audit_stage_bytes_total{{stage="{row["stage"]}",category="{row["category"]}"}} {row["bytes"]}')
+        lines += ["# HELP seo_audit_stage_errors_total Etapas que terminaram com erro", "# TYPE seo_audit_stage_errors_total counter"]
+        for row in summary:
+            lines.append(f'seo_audit_stage_errors_total{{stage="{row["stage"]}",category="{row["category"]}"}} {row["errors"]}')
+        memory_rows = [row for row in summary if row.get("mem_peak_max") is not None]
+        if memory_rows:
+            lines += ["# HELP seo_audit_stage_memory_peak_bytes Maior pico de memória observado por etapa",
+                      "# TYPE seo_audit_stage_memory_peak_bytes gauge"]
+            for row in memory_rows:
+                lines.append(f'seo_audit_stage_memory_peak_bytes{{stage="{row["stage"]}",category="{row["category"]}"}} {row["mem_peak_max"]}')
+        return "\n".join(lines) + "\n"
+
+
+METRICS = StageMetrics()
+
+
+# ========== MEMÓRIA ==========
+def enable_memory_tracking(frames=1):
+    """Liga o tracemalloc (custo extra em etapas que alocam muito, como o parse do HTML)"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+# Spans e traces abertos que acompanham o pico de memória. O pico do
+# tracemalloc é um só para o processo: antes de zerá-lo, ele é repassado a
+# todos os abertos, para que uma auditoria não apague o que outra mede.
+_memory_lock = threading.Lock()
+_memory_holders = weakref.WeakSet()
+
+
+def _sample_memory():
+    """Repassa o pico desde a última leitura a todos os abertos e o zera; retorna a memória atual"""
+    mem_now, mem_peak = tracemalloc.get_traced_memory()
+    for holder in _memory_holders:
+        if mem_peak > holder._mem_peak_abs:
+            holder._mem_peak_abs = mem_peak
+    tracemalloc.reset_peak()
+    return mem_now
+
+
+def _track_memory(holder):
+    """Passa a acompanhar o pico de memória de um span ou trace a partir de agora"""
+    with _memory_lock:
+        holder._mem_start = holder._mem_peak_abs = _sample_memory()
+        _memory_holders.add(holder)
+
+
+def _untrack_memory(holder):
+    """Fecha o pico de um span ou trace; retorna a memória atual"""
+    with _memory_lock:
+        mem_now = _sample_memory()
+        _memory_holders.discard(holder)
+    return mem_now
+
+
+def _memory_budget_bytes():
+    return int(AUDIT_MEMORY_BUDGET_MB * 2**20) if AUDIT_MEMORY_BUDGET_MB > 0 else None
+
+
+# ========== API DE INSTRUMENTAÇÃO ==========
+def start_trace(label, memory_budget=None):
+    """Inicia o trace de uma auditoria no contexto atual
+
+    O orçamento de memória (bytes) padrão vem de AUDIT_MEMORY_BUDGET_MB
+    e só é verificado com o rastreamento de memória ligado.
+    """
+    trace = AuditTrace(label, memory_budget if memory_budget is not None else _memory_budget_bytes())
+    if tracemalloc.is_tracing():
+        _track_memory(trace)
+    _current_trace.set(trace)
+    _current_span.set(None)
+    return trace
+
+
+def finish_trace(trace):
+    """Encerra o trace (fixa a duração total) e o remove do contexto"""
+    trace.total = trace.elapsed()
+    if tracemalloc.is_tracing():
+        _untrack_memory(trace)
+    if _current_trace.get() is trace:
+        _current_trace.set(None)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def current_span():
+    return _current_span.get()
+
+
+def record_spans(span_dicts, offset=0.0):
+    """Registra no contexto atual spans medidos em outro processo (ver page_worker.py)
+
+    Os spans chegam como Span.to_dict(), com início relativo ao trabalho remoto;
+    offset é o momento do trace atual em que esse trabalho foi enviado. Eles
+    entram no trace abaixo do span atual e alimentam as métricas deste processo.
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    base_depth = parent.depth + 1 if parent else 0
+    for data in span_dicts:
+        remote = Span(data["name"], data["category"], offset + data["start"], base_depth + data["depth"], data["attrs"])
+        remote.duration = data["duration"]
+        remote.count = data["count"]
+        remote.bytes = data["bytes"]
+        remote.error = data["error"]
+        remote.mem_peak = data["mem_peak"]
+        remote.mem_delta = data["mem_delta"]
+        if trace:
+            trace.record(remote)
+        METRICS.observe(remote)
+
+
+@contextmanager
+def span(name, category="stage", **attrs):
+    """Mede um bloco; sem trace ativo, alimenta apenas as métricas agregadas
+
+    Com o tracemalloc ligado, registra o pico e a memória retida pela etapa e,
+    ao final dela, verifica o orçamento de memória do trace. O tracemalloc é
+    global ao processo: com auditorias simultâneas os valores são aproximados.
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    start = trace.elapsed() if trace else 0.0
+    current = Span(name, category, start, parent.depth + 1 if parent else 0, attrs)
+
+    tracking = tracemalloc.is_tracing()
+    if tracking:
+        _track_memory(current)
+
+    token = _current_span.set(current)
+    t0 = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - t0
+        _current_span.reset(token)
+        if tracking:
+            mem_now = _untrack_memory(current)
+            current.mem_peak = current._mem_peak_abs - current._mem_start
+            current.mem_delta = mem_now - current._mem_start
+        if trace:
+            trace.record(current)
+        METRICS.observe(current)
+
+    if tracking and trace is not None and trace.over_budget:
+        raise MemoryBudgetExceeded(name, trace.memory_peak, trace.memory_budget)
+
+
+def traced(category):
+    """Decorador: cada chamada da função vira um span com o nome dela"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(func.__name__, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ========== ENDPOINT DE MÉTRICAS ==========
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = METRICS.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(METRICS.summary()).encode("utf-8"), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """Sobe o endpoint /metrics (Prometheus) e /metrics.json numa thread de fundo"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
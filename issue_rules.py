@@ -0,0 +1,186 @@
+# ==============================================================================
+# MOTOR DE REGRAS DE PROBLEMAS (ISSUES)
+# Cada regra é declarada como dados (métrica, condições, severidade e mensagem),
+# compilada uma única vez e avaliada de forma vetorizada sobre uma tabela de
+# métricas com uma linha por página.
+# ==============================================================================
+import operator
+
+import numpy as np
+import pandas as pd
+
+from scoring import numeric_or_nan
+
+SEVERITY_RANK = {"critical": 0, "warning": 1, "notice": 2}
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# Todas as condições de uma regra precisam ser verdadeiras. Métricas ausentes
+# (NaN) nunca disparam a regra, pois qualquer comparação com NaN é falsa.
+ISSUE_RULES = [
+    {"id": "title_missing", "label": "Title ausente", "severity": "critical", "when": [("title_length", "==", 0)],
+     "message": "❌ **Title ausente** - Crítico para SEO"},
+    {"id": "title_too_long", "label": "Title muito longo", "severity": "warning", "when": [("title_length", ">", 60)],
+     "message": "⚠️ **Title muito longo** - Pode ser cortado nos resultados"},
+    {"id": "h1_missing", "label": "H1 ausente", "severity": "critical", "when": [("h1_count", "==", 0)],
+     "message": "❌ **H1 ausente** - Importante para estrutura"},
+    {"id": "h1_multiple", "label": "Múltiplos H1", "severity": "warning", "when": [("h1_count", ">", 1)],
+     "message": "⚠️ **Múltiplos H1** - Use apenas um H1 por página"},
+    {"id": "thin_content", "label": "Conteúdo insuficiente", "severity": "warning", "when": [("word_count", "<", 300)],
+     "message": "⚠️ **Conteúdo insuficiente** - Mínimo recomendado: 300 palavras"},
+    {"id": "images_without_alt", "label": "Imagens sem alt text", "severity": "warning", "when": [("images_sem_alt", ">", 0)],
+     "message": "⚠️ **{images_sem_alt} imagens sem alt text** - Prejudica acessibilidade"},
+    {"id": "broken_links", "label": "Links quebrados", "severity": "critical", "when": [("broken_links", ">", 0)],
+     "message": "❌ **{broken_links} links quebrados** - Prejudica experiência do usuário"},
+    {"id": "oversized_images", "label": "Imagens pesadas", "severity": "warning", "when": [("oversized_images", ">", 0)],
+     "message": "🖼️ **{oversized_images} imagens pesadas** - Comprima ou redimensione os arquivos"},
+    {"id": "unscaled_images", "label": "Imagens maiores que o exibido", "severity": "notice", "when": [("unscaled_images", ">", 0)],
+     "message": "📐 **{unscaled_images} imagens maiores que o tamanho exibido** - Sirva versões redimensionadas (srcset)"},
+    {"id": "legacy_image_formats", "label": "Imagens em formato antigo", "severity": "notice", "when": [("legacy_images", ">", 0)],
+     "message": "🗜️ **{legacy_images} imagens em JPEG/PNG/GIF** - WebP ou AVIF reduzem o peso"},
+    {"id": "render_blocking", "label": "Recursos bloqueando a renderização", "severity": "warning", "when": [("render_blocking", ">", 0)],
+     "message": "🚧 **{render_blocking} CSS/JS bloqueando a renderização** - Use defer/async ou carregue o CSS crítico inline"},
+    {"id": "lazy_loading_missing", "label": "Imagens sem lazy loading", "severity": "notice", "when": [("lazy_missing", ">", 0)],
+     "message": "💤 **{lazy_missing} imagens sem loading=\"lazy\"** - Adie as que ficam fora da primeira tela"},
+    {"id": "low_performance", "label": "Performance baixa", "severity": "warning", "when": [("mobile_performance", "<", 60)],
+     "message": "⚠️ **Performance baixa** - Afeta ranking e experiência"},
+    {"id": "structured_data_missing", "label": "Dados estruturados ausentes", "severity": "warning", "when": [("schemas_count", "==", 0)],
+     "message": "⚠️ **Dados estruturados ausentes** - Oportunidade perdida para rich snippets"},
+    {"id": "low_content_quality", "label": "Qualidade do conteúdo baixa", "severity": "notice", "when": [("content_score", "<", 50), ("content_score", ">", 0)],
+     "message": "📝 **Qualidade do conteúdo baixa** - Revise estrutura e legibilidade"},
+    {"id": "complex_text", "label": "Texto muito complexo", "severity": "notice", "when": [("flesch_score", "<", 30), ("flesch_score", ">", 0)],
+     "message": "📚 **Texto muito complexo** - Simplifique para melhor compreensão"},
+]
+
+
+def issue_metrics(onpage_data, psi_data=None, content_analysis=None, structured_data=None, broken_links=None,
+                  image_audit=None, lab_data=None):
+    """Achata os resultados de uma página nas métricas usadas pelas regras
+
+    Análises que não foram executadas (None ou vazias) viram NaN, de modo que
+    as regras correspondentes não disparam.
+    """
+    metrics = {
+        "title_length": onpage_data.get("title_length", 0),
+        "h1_count": onpage_data.get("h1_count", 0),
+        "word_count": onpage_data.get("word_count", 0),
+        "images_sem_alt": onpage_data.get("images_sem_alt", 0),
+        "broken_links": len(broken_links) if broken_links is not None else np.nan,
+        "mobile_performance": np.nan,
+        "schemas_count": len(structured_data.get("schemas_found", [])) if structured_data else np.nan,
+        "content_score": np.nan,
+        "flesch_score": np.nan,
+        "oversized_images": image_audit["oversized"] if image_audit else np.nan,
+        "unscaled_images": image_audit["unscaled"] if image_audit else np.nan,
+        "legacy_images": image_audit["legacy_format"] if image_audit else np.nan,
+        "render_blocking": len(lab_data["render_blocking"]) if lab_data else np.nan,
+        "lazy_missing": lab_data["lazy_missing"] if lab_data else np.nan,
+    }
+
+    # Como no score geral: sem medição do PSI vale a estimativa do lite lab
+    if psi_data and psi_data.get("mobile"):
+        metrics["mobile_performance"] = numeric_or_nan(psi_data["mobile"].get("psi_performance", 0))
+    elif lab_data:
+        metrics["mobile_performance"] = float(lab_data["estimated_score"])
+
+    if content_analysis:
+        metrics["content_score"] = numeric_or_nan(content_analysis.get("content_quality", {}).get("quality_score", 0))
+        metrics["flesch_score"] = numeric_or_nan(content_analysis.get("readability", {}).get("flesch_score", 0))
+
+    return metrics
+
+
+class CompiledRules:
+    """Conjunto de regras pré-compilado para avaliação vetorizada"""
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.ids = [rule["id"] for rule in self.rules]
+        self.metrics = sorted({metric for rule in self.rules for metric, _, _ in rule["when"]})
+        self.severity_rank = np.array([SEVERITY_RANK[rule["severity"]] for rule in self.rules])
+        # Ordem de exibição: severidade e, em caso de empate, ordem de declaração
+        self.display_order = np.lexsort((np.arange(len(self.rules)), self.severity_rank))
+        self._conditions = [
+            [(metric, OPERATORS[op], float(value)) for metric, op, value in rule["when"]]
+            for rule in self.rules
+        ]
+
+    def _columns(self, frame):
+        columns = {}
+        for metric in self.metrics:
+            if metric in frame.columns:
+                columns[metric] = pd.to_numeric(frame[metric], errors="coerce").to_numpy(dtype=float)
+            else:
+                columns[metric] = np.full(len(frame), np.nan)
+        return columns
+
+    def evaluate(self, frame):
+        """Retorna a matriz booleana páginas x regras indicando quais regras disparam"""
+        frame = frame if isinstance(frame, pd.DataFrame) else pd.DataFrame.from_records(frame)
+        columns = self._columns(frame)
+        matrix = np.zeros((len(frame), len(self.rules)), dtype=bool)
+        for j, conditions in enumerate(self._conditions):
+            fired = np.ones(len(frame), dtype=bool)
+            for metric, op, value in conditions:
+                fired &= op(columns[metric], value)
+            matrix[:, j] = fired
+        return matrix
+
+    def findings(self, frame, matrix=None):
+        """Lista de problemas por página, ordenada por severidade"""
+        frame = frame if isinstance(frame, pd.DataFrame) else pd.DataFrame.from_records(frame)
+        if matrix is None:
+            matrix = self.evaluate(frame)
+        records = frame.to_dict("records")
+
+        pages = []
+        for i, row in enumerate(records):
+            page_findings = []
+            fired = self.display_order[matrix[i, self.display_order]]
+            # Contagens inteiras aparecem sem ".0" nas mensagens
+            values = {k: (int(v) if isinstance(v, float) and v.is_integer() else v) for k, v in row.items()} if len(fired) else {}
+            for j in fired:
+                rule = self.rules[j]
+                page_findings.append({
+                    "rule_id": rule["id"],
+                    "severity": rule["severity"],
+                    "message": rule["message"].format(**values),
+                })
+            pages.append(page_findings)
+        return pages
+
+    def aggregate(self, matrix):
+        """Contagem de páginas afetadas por regra (visão do site inteiro)"""
+        total_pages = matrix.shape[0]
+        counts = matrix.sum(axis=0)
+        summary = pd.DataFrame({
+            "rule_id": self.ids,
+            "label": [rule.get("label", rule["id"]) for rule in self.rules],
+            "severity": [rule["severity"] for rule in self.rules],
+            "pages": counts,
+            "share": counts / total_pages if total_pages else 0.0,
+        })
+        return summary.iloc[self.display_order].reset_index(drop=True)
+
+
+_DEFAULT_RULES = None
+
+
+def default_rules():
+    """Regras padrão compiladas uma única vez por processo"""
+    global _DEFAULT_RULES
+    if _DEFAULT_RULES is None:
+        _DEFAULT_RULES = CompiledRules(ISSUE_RULES)
+    return _DEFAULT_RULES
+
+
+def find_page_issues(metrics, rules=None):
+    """Atalho para uma única página: retorna a lista de problemas ordenada"""
+    return (rules or default_rules()).findings(pd.DataFrame([metrics]))[0]
@@ -0,0 +1,151 @@
+# ==============================================================================
+# FILA DE JOBS EM SEGUNDO PLANO
+# Auditorias longas rodam num pool de workers fora do script do Streamlit. Cada
+# job tem um id, progresso consultável, cancelamento cooperativo e o resultado
+# guardado até expirar, de modo que reruns (e reabrir a aba com o id do job)
+# não descartam o trabalho em andamento.
+# ==============================================================================
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+AUDIT_WORKERS = int(os.getenv("AUDIT_WORKERS", "2"))
+# Por quanto tempo jobs terminados (e seus resultados) continuam disponíveis
+AUDIT_JOB_TTL_SECONDS = float(os.getenv("AUDIT_JOB_TTL_SECONDS", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Levantada dentro do job quando o cancelamento foi pedido"""
+
+
+class Job:
+    """Um trabalho submetido à fila: estado, progresso e resultado"""
+
+    def __init__(self, label):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Na fila"
+        self.result = None
+        # Resultados já prontos enquanto o job roda (exibidos progressivamente)
+        self.partial = {}
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def report(self, progress, message=None):
+        """Atualiza o progresso (0 a 1); também é o ponto onde o cancelamento é verificado"""
+        self.checkpoint()
+        self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def publish(self, **results):
+        """Disponibiliza resultados parciais, antes de o job terminar"""
+        self.partial.update(results)
+
+    def checkpoint(self):
+        """Interrompe o job entre etapas se o cancelamento foi pedido"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+        if self.status == QUEUED:
+            self.message = "Cancelamento solicitado"
+
+
+class JobQueue:
+    """Pool de workers com registro dos jobs por id"""
+
+    def __init__(self, max_workers=AUDIT_WORKERS, ttl=AUDIT_JOB_TTL_SECONDS):
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="audit-worker")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, label="", **kwargs):
+        """Enfileira func(job, *args, **kwargs) e retorna o job imediatamente"""
+        self._prune()
+        job = Job(label)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            job.status, job.message, job.finished_at = CANCELLED, "Cancelado antes de iniciar", time.time()
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.progress = 1.0
+            job.message = "Concluído"
+            job.status = DONE
+        except JobCancelled:
+            job.message = "Cancelado"
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.message = "Falhou"
+            job.status = FAILED
+            traceback.print_exc()
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel()
+        return job
+
+    def jobs(self):
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at)
+
+    def stats(self):
+        """Quantidade de jobs por estado"""
+        counts = {}
+        for job in self.jobs():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def _prune(self):
+        """Descarta jobs terminados há mais tempo que o TTL"""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def shutdown(self, wait=False):
+        for job in self.jobs():
+            job.cancel()
+        self._executor.shutdown(wait=wait)
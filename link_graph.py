@@ -0,0 +1,160 @@
+# ==============================================================================
+# GRAFO DE LINKS INTERNOS
+# As arestas página -> página são acumuladas durante o crawl em arrays
+# compactos e convertidas para o formato CSR (indptr/indices). PageRank, graus,
+# páginas órfãs e profundidade de clique são calculados com operações
+# vetorizadas do NumPy sobre esses arrays. Páginas conhecidas por outra fonte
+# (as rastreadas e as do sitemap.xml) entram como nós mesmo sem links, para que
+# as órfãs possam ser encontradas.
+# ==============================================================================
+from array import array
+
+import numpy as np
+import pandas as pd
+
+
+class LinkGraphBuilder:
+    """Acumula URLs e arestas durante o crawl, sem guardar objetos por link"""
+
+    def __init__(self):
+        self.node_ids = {}
+        self.urls = []
+        self._sources = array("i")
+        self._targets = array("i")
+        self._known = set()
+
+    def node(self, url):
+        """Retorna o id numérico da URL, registrando-a se for nova"""
+        node_id = self.node_ids.get(url)
+        if node_id is None:
+            node_id = len(self.urls)
+            self.node_ids[url] = node_id
+            self.urls.append(url)
+        return node_id
+
+    def add_known(self, urls):
+        """Registra páginas que existem no site (ex.: URLs do sitemap.xml), com ou sem links para elas"""
+        for url in urls:
+            self._known.add(self.node(url))
+
+    def add_links(self, source_url, target_urls):
+        """Registra as arestas de uma página rastreada para cada link interno encontrado"""
+        source = self.node(source_url)
+        self._known.add(source)
+        for target_url in target_urls:
+            target = self.node(target_url)
+            if target != source:
+                self._sources.append(source)
+                self._targets.append(target)
+
+    def build(self):
+        """Gera o grafo CSR (arestas duplicadas são removidas)"""
+        n = len(self.urls)
+        sources = np.frombuffer(self._sources, dtype=np.int32).astype(np.int64)
+        targets = np.frombuffer(self._targets, dtype=np.int32).astype(np.int64)
+
+        # Chave única por aresta: ordenar por ela já agrupa por origem (ordem CSR)
+        keys = np.unique(sources * max(n, 1) + targets)
+        rows = (keys // max(n, 1)).astype(np.int32)
+        indices = (keys % max(n, 1)).astype(np.int32)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+
+        known = np.zeros(n, dtype=bool)
+        known[list(self._known)] = True
+        return LinkGraph(list(self.urls), indptr, indices, known)
+
+
+class LinkGraph:
+    """Grafo de links internos em formato CSR"""
+
+    def __init__(self, urls, indptr, indices, known=None):
+        self.urls = urls
+        self.indptr = indptr
+        self.indices = indices
+        # Nós que são páginas conhecidas (rastreadas ou do sitemap), e não só alvos de links
+        self.known = known if known is not None else np.zeros(len(urls), dtype=bool)
+        self.node_ids = {url: i for i, url in enumerate(urls)}
+        # Origem de cada aresta (expansão do indptr), usada nas multiplicações esparsas
+        self._rows = np.repeat(np.arange(len(urls), dtype=np.int32), np.diff(indptr))
+
+    @property
+    def node_count(self):
+        return len(self.urls)
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.bincount(self.indices, minlength=self.node_count)
+
+    def pagerank(self, damping=0.85, tol=1e-6, max_iter=100):
+        """PageRank interno por iteração de potência (produto matriz esparsa x vetor)"""
+        n = self.node_count
+        if n == 0:
+            return np.zeros(0)
+
+        out_degree = self.out_degree().astype(float)
+        dangling = out_degree == 0
+        inv_out = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            # Cada página distribui seu rank igualmente entre os links de saída
+            spread = np.bincount(self.indices, weights=(rank * inv_out)[self._rows], minlength=n)
+            # Páginas sem links de saída distribuem o rank para todas as páginas
+            new_rank = damping * (spread + rank[dangling].sum() / n) + (1 - damping) / n
+            converged = np.abs(new_rank - rank).sum() < tol
+            rank = new_rank
+            if converged:
+                break
+        return rank
+
+    def click_depth(self, root_url):
+        """Profundidade de clique (BFS) a partir da raiz; -1 para inalcançáveis"""
+        depth = np.full(self.node_count, -1, dtype=np.int32)
+        root = self.node_ids.get(root_url)
+        if root is None:
+            return depth
+
+        depth[root] = 0
+        frontier = np.zeros(self.node_count, dtype=bool)
+        frontier[root] = True
+        level = 0
+        while frontier.any():
+            level += 1
+            # Vizinhos de todas as páginas da fronteira de uma só vez
+            neighbors = self.indices[frontier[self._rows]]
+            neighbors = neighbors[depth[neighbors] == -1]
+            depth[neighbors] = level
+            frontier = np.zeros(self.node_count, dtype=bool)
+            frontier[neighbors] = True
+        return depth
+
+    def orphan_pages(self, root_url=None):
+        """Páginas conhecidas para as quais nenhuma página rastreada aponta (exceto a raiz)
+
+        Um nó criado só por ser alvo de link sempre tem grau de entrada >= 1;
+        órfãs só aparecem entre as páginas registradas por add_known (sitemap).
+        """
+        orphan = self.known & (self.in_degree() == 0)
+        root = self.node_ids.get(root_url)
+        if root is not None:
+            orphan[root] = False
+        return [self.urls[i] for i in np.flatnonzero(orphan)]
+
+    def to_frame(self, root_url=None):
+        """Tabela com as métricas por página"""
+        frame = pd.DataFrame({
+            "url": self.urls,
+            "pagerank": self.pagerank(),
+            "in_degree": self.in_degree(),
+            "out_degree": self.out_degree(),
+        })
+        if root_url is not None:
+            frame["click_depth"] = self.click_depth(root_url)
+        return frame
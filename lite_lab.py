@@ -0,0 +1,209 @@
+# ==============================================================================
+# LITE LAB: ESTIMATIVA LOCAL DE PESO E PERFORMANCE
+# Alternativa rápida ao PageSpeed Insights, sem API externa: a partir do HTML
+# já baixado lista os subrecursos (CSS, JS, fontes, iframes e imagens), mede o
+# tamanho de cada um em paralelo (pelo cache de subrecursos) e estima FCP, LCP
+# e TBT num perfil de rede móvel lenta. A nota segue as curvas do Lighthouse; é uma
+# estimativa de ordem de grandeza, não uma medição em navegador.
+# ==============================================================================
+import contextvars
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import requests
+
+from image_audit import audit_images
+from instrumentation import traced
+from subresource_cache import SUBRESOURCES, download_subresource
+
+# Subrecursos medidos por página e requisições simultâneas
+LAB_MAX_RESOURCES = int(os.getenv("LAB_MAX_RESOURCES", "60"))
+LAB_CONCURRENCY = int(os.getenv("LAB_CONCURRENCY", "8"))
+
+# Perfil de rede do Lighthouse para mobile ("Slow 4G"): 150 ms de RTT e 1,6 Mbps
+LAB_RTT_MS = 150
+LAB_THROUGHPUT_BYTES_PER_MS = 1638.4 * 1024 / 8 / 1000
+# Custo de parse/execução de JS no main thread de um celular médio, por KB transferido
+LAB_JS_MS_PER_KB = 1.5
+# Primeiras imagens da página: candidatas a LCP, não devem ter loading="lazy"
+LAB_EAGER_IMAGES = 2
+
+# Métrica: (peso na nota, p10, mediana) das curvas do Lighthouse para mobile
+LAB_SCORING = {
+    "fcp_ms": (0.15, 1800, 3000),
+    "lcp_ms": (0.35, 2500, 4000),
+    "tbt_ms": (0.35, 200, 600),
+    "total_bytes": (0.15, 2667 * 1024, 4000 * 1024),
+}
+
+RESOURCE_TYPES = ("html", "css", "js", "font", "image", "iframe")
+
+# Segundos níveis de domínio que não identificam o site sozinhos (exemplo.com.br, exemplo.co.uk)
+_SHARED_SECOND_LEVELS = frozenset({"com", "co", "org", "net", "gov", "edu", "ac", "blog", "art"})
+
+
+# ========== EXTRAÇÃO (NO HTML) ==========
+def site_key(host):
+    """Domínio registrável aproximado do host (sem porta e subdomínios)"""
+    labels = host.split(":")[0].lower().split(".")
+    if len(labels) >= 3 and labels[-2] in _SHARED_SECOND_LEVELS:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def _in_head(tag):
+    return tag.find_parent("head") is not None
+
+
+def extract_resources(soup, page_url):
+    """Subrecursos da página (exceto imagens, ver image_audit.extract_images) e sinais de carregamento
+
+    Cada recurso tem url, type (css, js, font ou iframe) e render_blocking: CSS
+    no <head> para qualquer mídia de tela e <script> no <head> sem async, defer
+    ou type="module".
+    """
+    resources = {}
+
+    def add(src, resource_type, render_blocking=False):
+        url = urldefrag(urljoin(page_url, (src or "").strip()))[0]
+        if url.startswith(("http://", "https://")) and url not in resources:
+            resources[url] = {"url": url, "type": resource_type, "render_blocking": render_blocking}
+
+    for link in soup.find_all("link", href=True):
+        rel = [value.lower() for value in link.get("rel") or []]
+        if "stylesheet" in rel:
+            media = (link.get("media") or "all").strip().lower()
+            add(link["href"], "css", _in_head(link) and media in ("all", "screen") and not link.has_attr("disabled"))
+        elif "preload" in rel and (link.get("as") or "").lower() == "font":
+            add(link["href"], "font")
+    for script in soup.find_all("script", src=True):
+        deferred = script.has_attr("async") or script.has_attr("defer") or (script.get("type") or "").lower() == "module"
+        add(script["src"], "js", _in_head(script) and not deferred)
+    for iframe in soup.find_all("iframe", src=True):
+        add(iframe["src"], "iframe")
+
+    images = soup.find_all("img")
+    return {
+        "resources": list(resources.values()),
+        # Depois das primeiras imagens, as que carregam mesmo fora da tela
+        "lazy_missing": sum(1 for img in images[LAB_EAGER_IMAGES:]
+                            if (img.get("loading") or "").lower() != "lazy" and not img.get("data-src")),
+        # Sem width/height o navegador não reserva o espaço (deslocamento de layout)
+        "unsized_images": sum(1 for img in images if not (img.get("width") and img.get("height"))),
+    }
+
+
+# ========== MEDIÇÃO ==========
+def measure_resources(site, urls, cache=SUBRESOURCES):
+    """Subresource de cada URL (None quando a busca falhou), em paralelo e pelo cache do site
+
+    Com cache=None cada URL é baixada de novo (usado pelos benchmarks).
+    """
+    def fetch(url):
+        try:
+            return cache.fetch(site, url) if cache is not None else download_subresource(url)[0]
+        except requests.exceptions.RequestException:
+            return None
+
+    with ThreadPoolExecutor(max_workers=LAB_CONCURRENCY, thread_name_prefix="lab-resource") as executor:
+        futures = [executor.submit(contextvars.copy_context().run, fetch, url) for url in urls]
+        return [future.result() for future in futures]
+
+
+# ========== ESTIMATIVA ==========
+def _download_ms(size):
+    return size / LAB_THROUGHPUT_BYTES_PER_MS
+
+
+def metric_score(value, p10, median):
+    """Nota de 0 a 1 de uma métrica pela curva log-normal do Lighthouse (p10 -> 0,9; mediana -> 0,5)"""
+    if value <= 0:
+        return 1.0
+    standardized = math.log(value / median) * 0.9061938024368232 / -math.log(p10 / median)
+    return max(0.0, min(1.0, math.erfc(standardized) / 2))
+
+
+def estimate_metrics(html_bytes, page_host, resources, images):
+    """FCP, LCP, TBT e carga total estimados no perfil Slow 4G
+
+    - FCP: conexão e download do HTML, mais uma ida e volta e o download dos
+      recursos que bloqueiam a renderização (mais a conexão com outras origens
+      e uma ida e volta extra se algum CSS bloqueante tem @import).
+    - LCP: FCP mais o download da maior entre as primeiras imagens.
+    - TBT: bytes de JS convertidos em tempo de main thread (LAB_JS_MS_PER_KB).
+    """
+    html_ms = 4 * LAB_RTT_MS + _download_ms(html_bytes)
+    blocking = [resource for resource in resources if resource["render_blocking"] and resource["bytes"]]
+    fcp = html_ms
+    if blocking:
+        other_origin = any(urlparse(resource["url"]).netloc != page_host for resource in blocking)
+        fcp += LAB_RTT_MS * (4 if other_origin else 1) + _download_ms(sum(resource["bytes"] for resource in blocking))
+        if any(resource.get("css_import") for resource in blocking):
+            fcp += LAB_RTT_MS
+
+    hero = max((image.get("bytes") or 0 for image in images[:LAB_EAGER_IMAGES]), default=0)
+    lcp = fcp + (LAB_RTT_MS + _download_ms(hero) if hero else 0)
+
+    js_kb = sum(resource["bytes"] or 0 for resource in resources if resource["type"] == "js") / 1024
+    tbt = max(0.0, js_kb * LAB_JS_MS_PER_KB - 50)
+
+    origins = {urlparse(resource["url"]).netloc for resource in resources} | {page_host}
+    all_bytes = html_bytes + sum(resource["bytes"] or 0 for resource in resources) + sum(image.get("bytes") or 0 for image in images)
+    # Até 6 conexões por origem: cada leva de requisições custa uma ida e volta
+    rounds = math.ceil((len(resources) + len(images)) / (6 * len(origins)))
+    load = html_ms + LAB_RTT_MS * (rounds + 3 * (len(origins) - 1)) + _download_ms(all_bytes - html_bytes)
+    return {"fcp_ms": round(fcp), "lcp_ms": round(max(lcp, fcp)), "tbt_ms": round(tbt), "load_ms": round(max(load, lcp))}
+
+
+@traced("analyzer")
+def run_lite_lab(url, html_bytes, assets, images, image_audit=None, cache=SUBRESOURCES):
+    """Peso da página e estimativa de performance sem API externa
+
+    `assets` e `images` vêm de extract_resources e image_audit.extract_images
+    (no processo da análise da página). Se a auditoria de imagens já rodou, seu
+    resultado vem em `image_audit`; senão as imagens são verificadas aqui, pelo
+    mesmo cache por URL.
+    """
+    page_host = urlparse(url).netloc
+    site = site_key(page_host)
+    resources = [dict(resource) for resource in assets["resources"][:LAB_MAX_RESOURCES]]
+    for resource, fetched in zip(resources, measure_resources(site, [resource["url"] for resource in resources], cache)):
+        resource["bytes"] = fetched.size if fetched is not None and fetched.ok else None
+        # Um @import dentro do CSS só é descoberto depois que o CSS chega: mais uma ida e volta
+        resource["css_import"] = resource["type"] == "css" and fetched is not None and "@import" in fetched.text()
+    images = (image_audit if image_audit is not None else audit_images(images))["images"]
+
+    bytes_by_type = dict.fromkeys(RESOURCE_TYPES, 0)
+    bytes_by_type["html"] = html_bytes
+    for resource in resources:
+        bytes_by_type[resource["type"]] += resource["bytes"] or 0
+    bytes_by_type["image"] = sum(image.get("bytes") or 0 for image in images)
+    total_bytes = sum(bytes_by_type.values())
+
+    third_party = [item for item in resources + images if site_key(urlparse(item["url"]).netloc) != site]
+    third_party_bytes = sum(item.get("bytes") or 0 for item in third_party)
+
+    metrics = estimate_metrics(html_bytes, page_host, resources, images)
+    weighted = {"total_bytes": total_bytes, **metrics}
+    score = sum(weight * metric_score(weighted[name], p10, median) for name, (weight, p10, median) in LAB_SCORING.items())
+
+    blocking = [{"url": resource["url"], "type": resource["type"], "bytes": resource["bytes"]}
+                for resource in resources if resource["render_blocking"]]
+    return {
+        "estimated_score": round(score * 100),
+        "metrics": metrics,
+        "total_bytes": total_bytes,
+        "requests": 1 + len(resources) + len(images),
+        "bytes_by_type": bytes_by_type,
+        "render_blocking": blocking,
+        "render_blocking_bytes": sum(resource["bytes"] or 0 for resource in blocking),
+        "css_imports": sum(resource["css_import"] for resource in resources),
+        "lazy_missing": assets["lazy_missing"],
+        "unsized_images": assets["unsized_images"],
+        "third_party_requests": len(third_party),
+        "third_party_bytes": third_party_bytes,
+        "third_party_share": third_party_bytes / total_bytes if total_bytes else 0.0,
+        "unmeasured": sum(resource["bytes"] is None for resource in resources) + sum(image.get("bytes") is None for image in images),
+    }
@@ -0,0 +1,473 @@
+# ==============================================================================
+# MONITORAMENTO AGENDADO
+# Sites cadastrados são verificados em segundo plano, cada um num horário fixo
+# dentro do seu intervalo (como uma linha de cron). O horário vem de um hash do
+# site, o que espalha as verificações ao longo do intervalo. Cada verificação é
+# um re-crawl incremental: as páginas conhecidas são visitadas em ordem de prioridade
+# (importância pela profundidade de clique x probabilidade de terem mudado,
+# estimada pelo histórico de mudanças de cada uma), com requisições
+# condicionais (ETag/Last-Modified) e até o orçamento de páginas por hora do
+# host. O retrato do site (site_snapshot.py) é atualizado só nas páginas
+# visitadas e guardado no histórico de auditorias (audit_diff.py), limitado por
+# site; o resumo de cada verificação fica numa tabela também limitada.
+# ==============================================================================
+import hashlib
+import heapq
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from urllib.parse import urlparse
+
+import numpy as np
+import requests
+
+from audit_diff import AuditHistory, diff_snapshots
+from instrumentation import MemoryBudgetExceeded
+from job_queue import JobQueue
+from rate_limiter import MemoryBucketStore, RateLimiter
+from seo_analysis import recrawl_page
+from site_snapshot import SnapshotBuilder
+
+MONITOR_PATH = os.getenv("MONITOR_PATH", os.path.join(".cache", "monitoring.sqlite"))
+# Com que frequência o agendador procura sites com verificação vencida
+MONITOR_TICK_SECONDS = float(os.getenv("MONITOR_TICK_SECONDS", "30"))
+# Verificações simultâneas (num pool próprio, separado das auditorias interativas)
+MONITOR_WORKERS = int(os.getenv("MONITOR_WORKERS", "1"))
+# Páginas buscadas por verificação (padrão) e orçamentos em páginas por hora, por host e no total
+MONITOR_PAGES_PER_CHECK = int(os.getenv("MONITOR_PAGES_PER_CHECK", "30"))
+MONITOR_HOST_PAGES_PER_HOUR = float(os.getenv("MONITOR_HOST_PAGES_PER_HOUR", "120"))
+MONITOR_GLOBAL_PAGES_PER_HOUR = float(os.getenv("MONITOR_GLOBAL_PAGES_PER_HOUR", "3000"))
+# Pausa entre duas requisições ao mesmo host durante uma verificação
+MONITOR_REQUEST_INTERVAL_SECONDS = float(os.getenv("MONITOR_REQUEST_INTERVAL_SECONDS", "1"))
+# Páginas conhecidas guardadas por site e verificações guardadas por site
+MONITOR_MAX_KNOWN_PAGES = int(os.getenv("MONITOR_MAX_KNOWN_PAGES", "5000"))
+MONITOR_RUNS_PER_SITE = int(os.getenv("MONITOR_RUNS_PER_SITE", "50"))
+
+# Intervalos oferecidos no app (segundos)
+MONITOR_INTERVALS = {
+    "A cada hora": 3600,
+    "A cada 6 horas": 6 * 3600,
+    "Diário": 24 * 3600,
+    "Semanal": 7 * 24 * 3600,
+}
+
+# Colunas de cada página conhecida, na ordem da tabela `pages`
+PAGE_STATE_COLUMNS = ("url", "depth", "etag", "last_modified", "hash", "first_seen", "last_checked", "checks", "changes")
+
+
+def schedule_phase(site, interval):
+    """Posição fixa do site dentro do intervalo (segundos), estável entre reinícios"""
+    digest = hashlib.blake2b(site.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % int(interval)
+
+
+def next_slot(interval, phase, now):
+    """Próximo horário depois de `now` com a fase do site (como uma linha de cron)"""
+    return (np.floor((now - phase) / interval) + 1) * interval + phase
+
+
+def page_priorities(depth, first_seen, last_checked, changes, interval, now):
+    """Prioridade de cada página conhecida: importância x chance de ter mudado desde a última visita
+
+    A importância cai com a profundidade de clique. A taxa de mudança de cada
+    página é estimada pelas mudanças vistas no tempo observado, com meia
+    mudança por intervalo como ponto de partida (páginas recém-descobertas);
+    a chance de ter mudado segue um processo de Poisson desde a última visita.
+    Páginas nunca visitadas (last_checked NaN) têm chance 1.
+    """
+    importance = 1.0 / (1.0 + depth)
+    observed = np.nan_to_num(last_checked - first_seen, nan=0.0).clip(min=0)
+    rate = (changes + 0.5) / (observed + interval)
+    elapsed = np.nan_to_num(now - last_checked, nan=np.inf).clip(min=0)
+    return importance * -np.expm1(-rate * elapsed)
+
+
+class MonitorStore:
+    """Sites monitorados, estado das páginas conhecidas e resumo das verificações, em SQLite"""
+
+    def __init__(self, path=MONITOR_PATH, runs_per_site=MONITOR_RUNS_PER_SITE):
+        self.path = path
+        self.runs_per_site = runs_per_site
+        self._lock = threading.Lock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sites ("
+            " site TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " interval REAL NOT NULL,"
+            " phase REAL NOT NULL,"
+            " pages INTEGER NOT NULL,"
+            " next_run REAL NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " site TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " depth INTEGER NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " hash TEXT,"
+            " first_seen REAL NOT NULL,"
+            " last_checked REAL,"
+            " checks INTEGER NOT NULL DEFAULT 0,"
+            " changes INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (site, url))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " site TEXT NOT NULL,"
+            " started_at REAL NOT NULL,"
+            " duration REAL NOT NULL,"
+            " fetched INTEGER NOT NULL,"
+            " not_modified INTEGER NOT NULL,"
+            " changed INTEGER NOT NULL,"
+            " discovered INTEGER NOT NULL,"
+            " failed INTEGER NOT NULL,"
+            " regressions INTEGER,"
+            " new_broken INTEGER,"
+            " snapshot_id INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_site ON runs (site, started_at)")
+        self._conn.commit()
+
+    # ========== SITES ==========
+    def add_site(self, url, interval, pages=MONITOR_PAGES_PER_CHECK, now=None):
+        """Cadastra (ou reagenda) o site da URL; as páginas já conhecidas são mantidas"""
+        site = urlparse(url).netloc
+        now = time.time() if now is None else now
+        phase = schedule_phase(site, interval)
+        # O limite por hora do host é também o maior custo que uma verificação pode ter
+        pages = int(min(pages, MONITOR_HOST_PAGES_PER_HOUR))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sites (site, url, interval, phase, pages, next_run, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (site, url, interval, phase, pages, float(next_slot(interval, phase, now)), now),
+            )
+            self._conn.commit()
+        return site
+
+    def remove_site(self, site):
+        with self._lock:
+            for table in ("sites", "pages", "runs"):
+                self._conn.execute(f"DELETE FROM {table} WHERE site = ?", (site,))
+            self._conn.commit()
+
+    def sites(self):
+        """Sites cadastrados com o total de páginas conhecidas, pela próxima verificação"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.site, s.url, s.interval, s.pages, s.next_run, COUNT(p.url)"
+                " FROM sites s LEFT JOIN pages p ON p.site = s.site GROUP BY s.site ORDER BY s.next_run"
+            ).fetchall()
+        return [{"site": site, "url": url, "interval": interval, "pages": pages, "next_run": next_run, "known_pages": known}
+                for site, url, interval, pages, next_run, known in rows]
+
+    def site(self, site):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, interval, phase, pages, next_run FROM sites WHERE site = ?", (site,)
+            ).fetchone()
+        if row is None:
+            return None
+        url, interval, phase, pages, next_run = row
+        return {"site": site, "url": url, "interval": interval, "phase": phase, "pages": pages, "next_run": next_run}
+
+    def due(self, now, limit):
+        """Sites com a verificação vencida, os mais atrasados primeiro"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT site, interval, phase, pages, next_run FROM sites WHERE next_run <= ? ORDER BY next_run LIMIT ?",
+                (now, limit),
+            ).fetchall()
+        return [{"site": site, "interval": interval, "phase": phase, "pages": pages, "next_run": next_run}
+                for site, interval, phase, pages, next_run in rows]
+
+    def reschedule(self, site, next_run, expected=None):
+        """Muda a próxima verificação; com `expected`, só se ninguém a mudou antes
+
+        Assim dois agendadores (o app e `python monitoring.py`) nunca disparam a
+        mesma verificação: só um deles consegue reagendar o horário vencido.
+        """
+        with self._lock:
+            if expected is None:
+                cursor = self._conn.execute("UPDATE sites SET next_run = ? WHERE site = ?", (next_run, site))
+            else:
+                cursor = self._conn.execute("UPDATE sites SET next_run = ? WHERE site = ? AND next_run = ?",
+                                            (next_run, site, expected))
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    # ========== PÁGINAS CONHECIDAS ==========
+    def page_states(self, site):
+        """{url: linha com PAGE_STATE_COLUMNS} das páginas conhecidas do site"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(PAGE_STATE_COLUMNS)} FROM pages WHERE site = ?", (site,)
+            ).fetchall()
+        return {row[0]: dict(zip(PAGE_STATE_COLUMNS, row)) for row in rows}
+
+    def save_pages(self, site, states, removed=()):
+        """Grava o estado das páginas visitadas ou descobertas e descarta as que deixaram de existir"""
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO pages (site, {', '.join(PAGE_STATE_COLUMNS)})"
+                f" VALUES (?, {', '.join('?' * len(PAGE_STATE_COLUMNS))})",
+                [(site, *(state[name] for name in PAGE_STATE_COLUMNS)) for state in states],
+            )
+            self._conn.executemany("DELETE FROM pages WHERE site = ? AND url = ?", [(site, url) for url in removed])
+            self._conn.commit()
+
+    # ========== VERIFICAÇÕES ==========
+    def record_run(self, site, run):
+        """Guarda o resumo de uma verificação e descarta as mais antigas do site além do limite"""
+        columns = ("started_at", "duration", "fetched", "not_modified", "changed", "discovered", "failed",
+                   "regressions", "new_broken", "snapshot_id")
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO runs (site, {', '.join(columns)}) VALUES (?, {', '.join('?' * len(columns))})",
+                (site, *(run.get(name) for name in columns)),
+            )
+            self._conn.execute(
+                "DELETE FROM runs WHERE site = ? AND id NOT IN"
+                " (SELECT id FROM runs WHERE site = ? ORDER BY started_at DESC LIMIT ?)",
+                (site, site, self.runs_per_site),
+            )
+            self._conn.commit()
+
+    def runs(self, site, limit=MONITOR_RUNS_PER_SITE):
+        """Verificações guardadas do site, da mais recente para a mais antiga"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT started_at, duration, fetched, not_modified, changed, discovered, failed, regressions,"
+                " new_broken, snapshot_id FROM runs WHERE site = ? ORDER BY started_at DESC LIMIT ?", (site, limit)
+            )
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+# ========== RE-CRAWL INCREMENTAL ==========
+def incremental_crawl(url, states, budget, interval, previous=None, job=None,
+                      request_interval=MONITOR_REQUEST_INTERVAL_SECONDS, max_known=MONITOR_MAX_KNOWN_PAGES):
+    """Visita até `budget` páginas do site, das mais prioritárias para as menos
+
+    `states` são as páginas conhecidas (MonitorStore.page_states). Os links das
+    páginas que mudaram (ou são novas) entram na fila como páginas nunca
+    visitadas. Só há requisição condicional para páginas presentes no retrato
+    anterior (`previous`): um 304 mantém a linha que já estava lá.
+
+    Retorna o retrato só das páginas buscadas, as URLs que deixaram de existir
+    (404/410), os estados a gravar e as contagens da verificação.
+    """
+    site = urlparse(url).netloc
+    now = time.time()
+    builder = SnapshotBuilder(site)
+    in_snapshot = set(previous.urls) if previous is not None else set()
+
+    known = list(states.values())
+    if url not in states:
+        known.append({"url": url, "depth": 0, "etag": None, "last_modified": None, "hash": None,
+                      "first_seen": now, "last_checked": None, "checks": 0, "changes": 0})
+    states = {state["url"]: state for state in known}
+
+    # Prioridades de todas as páginas conhecidas de uma vez; a fila é um heap (maior prioridade primeiro)
+    priorities = page_priorities(
+        np.array([state["depth"] for state in known], dtype=np.float64),
+        np.array([state["first_seen"] for state in known], dtype=np.float64),
+        np.array([np.nan if state["last_checked"] is None else state["last_checked"] for state in known]),
+        np.array([state["changes"] for state in known], dtype=np.float64),
+        interval, now,
+    )
+    heap = [(-priority, i, state["url"]) for i, (priority, state) in enumerate(zip(priorities.tolist(), known))]
+    heapq.heapify(heap)
+    order = len(heap)
+
+    stats = {"fetched": 0, "not_modified": 0, "changed": 0, "discovered": 0, "failed": 0}
+    updated, removed = [], []
+    while heap and stats["fetched"] < budget:
+        _, _, page_url = heapq.heappop(heap)
+        state = states[page_url]
+        if job is not None:
+            job.report(stats["fetched"] / budget, f"🔄 {page_url}")
+        if stats["fetched"] and request_interval:
+            time.sleep(request_interval)
+
+        conditional = page_url in in_snapshot
+        stats["fetched"] += 1
+        try:
+            fetched = recrawl_page(page_url, site, state["etag"] if conditional else None,
+                                   state["last_modified"] if conditional else None)
+        except requests.exceptions.RequestException:
+            stats["failed"] += 1
+            builder.add_failure(page_url, "Erro de Conexão")
+            updated.append(dict(state, last_checked=now, checks=state["checks"] + 1))
+            continue
+        except MemoryBudgetExceeded:
+            raise
+        except Exception as e:
+            # Página que os analisadores não conseguem processar: conta como falha, o resto da verificação segue
+            stats["failed"] += 1
+            builder.add_failure(page_url, f"Erro de Análise ({type(e).__name__})")
+            updated.append(dict(state, last_checked=now, checks=state["checks"] + 1))
+            continue
+
+        if fetched["status"] == 304:
+            stats["not_modified"] += 1
+            updated.append(dict(state, last_checked=now, checks=state["checks"] + 1))
+            continue
+        if fetched["page"] is None:
+            stats["failed"] += 1
+            builder.add_failure(page_url, fetched["status"])
+            if fetched["status"] in (404, 410):
+                removed.append(page_url)
+            else:
+                updated.append(dict(state, last_checked=now, checks=state["checks"] + 1))
+            continue
+
+        onpage, h1, body_text, geo_score = fetched["page"]
+        digest = format(builder.add(page_url, onpage, h1, body_text, geo_score), "016x")
+        changed = state["hash"] is not None and state["hash"] != digest
+        stats["changed"] += changed
+        updated.append(dict(state, etag=fetched["etag"], last_modified=fetched["last_modified"], hash=digest,
+                            last_checked=now, checks=state["checks"] + 1, changes=state["changes"] + changed))
+
+        # Links só mudam com a página: as que não mudaram não trazem páginas novas
+        if changed or state["hash"] is None:
+            for link in fetched["links"]:
+                if link.url in states or len(states) >= max_known:
+                    continue
+                states[link.url] = {"url": link.url, "depth": state["depth"] + 1, "etag": None, "last_modified": None,
+                                    "hash": None, "first_seen": now, "last_checked": None, "checks": 0, "changes": 0}
+                updated.append(states[link.url])
+                stats["discovered"] += 1
+                # Página nunca visitada: a chance de mudança é 1, vale a importância
+                heapq.heappush(heap, (-1.0 / (2.0 + state["depth"]), order, link.url))
+                order += 1
+
+    # Um estado por URL (a página descoberta e depois visitada fica com a visita)
+    updated = list({state["url"]: state for state in updated}.values())
+    return builder.build(), removed, updated, stats
+
+
+def run_monitor_check(job, site, store, history, budget=None):
+    """Uma verificação agendada do site: re-crawl incremental, retrato no histórico e resumo gravado"""
+    entry = store.site(site)
+    if entry is None:
+        return None
+    started_at = time.time()
+    audits = history.list(site)
+    previous = history.load(audits[0]["id"]) if audits else None
+
+    states = store.page_states(site)
+    if not states and previous is not None:
+        # Primeira verificação de um site já auditado: as páginas do último retrato viram páginas conhecidas
+        states = {page_url: {"url": page_url, "depth": 0 if page_url == entry["url"] else 1, "etag": None,
+                             "last_modified": None, "hash": format(int(page_hash), "016x"), "first_seen": previous.created_at,
+                             "last_checked": previous.created_at, "checks": 1, "changes": 0}
+                  for page_url, page_hash in zip(previous.urls, previous.hashes)}
+
+    fresh, removed, updated, stats = incremental_crawl(entry["url"], states, budget or entry["pages"], entry["interval"],
+                                                       previous=previous, job=job)
+    snapshot = previous.updated(fresh, removed) if previous is not None else fresh
+    snapshot_id = history.save(snapshot)
+    store.save_pages(site, updated, removed)
+
+    diff = diff_snapshots(previous, snapshot) if previous is not None else None
+    run = dict(
+        stats, started_at=started_at, duration=time.time() - started_at, snapshot_id=snapshot_id,
+        regressions=len(diff["regressions"]) if diff is not None else None,
+        new_broken=len(diff["new_broken"]) if diff is not None else None,
+    )
+    store.record_run(site, run)
+    return run
+
+
+# ========== AGENDADOR ==========
+class MonitorScheduler:
+    """Thread que dispara as verificações vencidas, respeitando o orçamento por host"""
+
+    def __init__(self, store=None, history=None, queue=None, limiter=None, tick=MONITOR_TICK_SECONDS,
+                 max_pending=MONITOR_WORKERS):
+        self.store = store or MonitorStore()
+        self.history = history or AuditHistory()
+        self.queue = queue or JobQueue(max_workers=max_pending)
+        self.limiter = limiter or RateLimiter(MemoryBucketStore(), MONITOR_HOST_PAGES_PER_HOUR, MONITOR_GLOBAL_PAGES_PER_HOUR)
+        self.tick_seconds = tick
+        self.max_pending = max_pending
+        self._jobs = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="monitor-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.queue.shutdown()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                # Um erro num ciclo (SQLite ocupado, por exemplo) não pode parar o agendador
+                traceback.print_exc()
+            self._stop.wait(self.tick_seconds)
+
+    def running(self):
+        """Sites com verificação em andamento: {site: job}"""
+        self._jobs = {site: job for site, job in self._jobs.items() if not job.finished}
+        return dict(self._jobs)
+
+    def tick(self, now=None):
+        """Dispara as verificações vencidas que cabem no pool; retorna os sites disparados"""
+        now = time.time() if now is None else now
+        running = self.running()
+        started = []
+        for entry in self.store.due(now, limit=self.max_pending + len(running) + 10):
+            if len(running) >= self.max_pending:
+                break
+            site = entry["site"]
+            if site in running:
+                continue
+            decision = self.limiter.acquire(f"host:{site}", entry["pages"])
+            if not decision.allowed:
+                # Orçamento esgotado: tenta de novo quando houver fichas, sem perder o horário fixo depois
+                retry_at = now + decision.retry_after if decision.retry_after is not None else \
+                    float(next_slot(entry["interval"], entry["phase"], now))
+                self.store.reschedule(site, retry_at, expected=entry["next_run"])
+                continue
+            if not self.store.reschedule(site, float(next_slot(entry["interval"], entry["phase"], now)),
+                                         expected=entry["next_run"]):
+                continue  # Outro agendador já disparou esta verificação
+            running[site] = self._jobs[site] = self.queue.submit(
+                run_monitor_check, site, self.store, self.history, label=f"Monitoramento: {site}"
+            )
+            started.append(site)
+        return started
+
+    def check_now(self, site):
+        """Antecipa a verificação do site para o próximo ciclo"""
+        self.store.reschedule(site, time.time())
+
+
+if __name__ == "__main__":
+    # Agendador sem o app: `python monitoring.py` (pode rodar junto com o Streamlit)
+    scheduler = MonitorScheduler().start()
+    print(f"Monitorando {len(scheduler.store.sites())} sites (MONITOR_PATH={MONITOR_PATH}). Ctrl+C para sair.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop()
@@ -0,0 +1,147 @@
+# ==============================================================================
+# REGISTROS COMPACTOS DE PÁGINA
+# Os analisadores devolvem dicionários aninhados (seções com poucas chaves,
+# listas de dicionários para os headings). Para guardar os resultados de muitas
+# páginas (jobs concluídos, concorrentes, links do crawl) eles são convertidos
+# em registros com __slots__: um atributo por métrica, sem um dicionário por
+# seção. Os headings viram colunas (níveis num array de bytes e os textos numa
+# tupla). to_dict() devolve exatamente o dicionário original, que é o formato
+# usado pelo app, pelas regras e pelos scores.
+# ==============================================================================
+from array import array
+
+
+class PageRecord:
+    """Base dos registros: LAYOUT lista (seção, chave) de cada slot, na ordem do dicionário original
+
+    Seção None é uma chave de primeiro nível. SECTIONS são as seções sempre
+    presentes no dicionário (mesmo vazias). Chaves ausentes no dicionário ficam
+    sem valor no slot e continuam ausentes em to_dict(); chaves que não estão no
+    LAYOUT vão para `extra`, para a conversão nunca perder dados.
+    """
+
+    __slots__ = ("extra",)
+    LAYOUT = ()
+    SECTIONS = ()
+    # Chave: (empacota, desempacota) para valores guardados num formato mais compacto
+    PACKED = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        record = cls.__new__(cls)
+        record.extra = None
+        for section, key in cls.LAYOUT:
+            source = data if section is None else data.get(section, {})
+            if key in source:
+                pack = cls.PACKED.get(key)
+                setattr(record, key, pack[0](source[key]) if pack else source[key])
+        for section, key, value in cls._items(data):
+            if (section, key) not in cls.LAYOUT:
+                record.extra = record.extra or []
+                record.extra.append((section, key, value))
+        return record
+
+    @classmethod
+    def _items(cls, data):
+        for key, value in data.items():
+            if key in cls.SECTIONS:
+                for inner_key, inner_value in value.items():
+                    yield key, inner_key, inner_value
+            else:
+                yield None, key, value
+
+    def to_dict(self):
+        data = {}
+        for section in self.SECTIONS:
+            data[section] = {}
+        for section, key in self.LAYOUT:
+            try:
+                value = getattr(self, key)
+            except AttributeError:
+                continue
+            unpack = self.PACKED.get(key)
+            (data if section is None else data[section])[key] = unpack[1](value) if unpack else value
+        for section, key, value in self.extra or ():
+            (data if section is None else data[section])[key] = value
+        return data
+
+
+# ========== HEADINGS EM COLUNAS ==========
+def pack_headings(structure):
+    """Lista de headings ({'level', 'text', 'length'}) como (níveis em bytes, textos)"""
+    levels = array("B", (int(heading["level"][1:]) for heading in structure))
+    return levels.tobytes(), tuple(heading["text"] for heading in structure)
+
+
+def unpack_headings(packed):
+    levels, texts = packed
+    return [{"level": f"h{level}", "text": text, "length": len(text)} for level, text in zip(levels, texts)]
+
+
+# ========== REGISTROS ==========
+class OnPageRecord(PageRecord):
+    """Resultado de onpage_checks_html"""
+
+    __slots__ = ("title", "title_length", "meta_description", "meta_description_length", "h1_count",
+                 "links_internos", "image_count", "images_sem_alt", "word_count")
+    LAYOUT = tuple((None, key) for key in __slots__)
+
+
+class ContentRecord(PageRecord):
+    """Resultado de analyze_content_advanced"""
+
+    __slots__ = ("flesch_score", "ari_score", "avg_sentence_length", "level", "level_color",
+                 "top_keywords", "vocabulary_richness",
+                 "paragraph_count", "avg_paragraph_length", "total_words", "total_sentences", "duplication_ratio",
+                 "quality_score",
+                 "total_headings", "structure", "h1_count", "h2_count", "h3_count", "hierarchy_issues")
+    SECTIONS = ("readability", "content_structure", "semantic_analysis", "content_quality", "headings_analysis")
+    LAYOUT = (
+        *(("readability", key) for key in ("flesch_score", "ari_score", "avg_sentence_length", "level", "level_color")),
+        *(("semantic_analysis", key) for key in ("top_keywords", "vocabulary_richness")),
+        *(("content_quality", key) for key in ("paragraph_count", "avg_paragraph_length", "total_words",
+                                               "total_sentences", "duplication_ratio", "quality_score")),
+        *(("headings_analysis", key) for key in ("total_headings", "structure", "h1_count", "h2_count", "h3_count",
+                                                 "hierarchy_issues")),
+    )
+    PACKED = {
+        "structure": (pack_headings, unpack_headings),
+        "top_keywords": (lambda keywords: tuple(keywords.items()), dict),
+        "hierarchy_issues": (tuple, list),
+    }
+
+
+class GeoRecord(PageRecord):
+    """Resultado de analyze_geo_ai_optimization"""
+
+    __slots__ = ("faq_indicators", "lists_count", "tables_count", "headings_count", "hierarchy_score",
+                 "factual_indicators", "citations", "authoritative_links",
+                 "definitions", "examples", "comparisons", "step_by_step",
+                 "author_mentioned", "date_mentioned", "article_schema", "word_count",
+                 "geo_score")
+    SECTIONS = ("content_structure", "factual_content", "ai_friendly_format", "authority_signals")
+    LAYOUT = (
+        *(("content_structure", key) for key in ("faq_indicators", "lists_count", "tables_count", "headings_count",
+                                                 "hierarchy_score")),
+        *(("factual_content", key) for key in ("factual_indicators", "citations", "authoritative_links")),
+        *(("ai_friendly_format", key) for key in ("definitions", "examples", "comparisons", "step_by_step")),
+        *(("authority_signals", key) for key in ("author_mentioned", "date_mentioned", "article_schema", "word_count")),
+        (None, "geo_score"),
+    )
+
+
+class CrawlLinkRecord(PageRecord):
+    """Link interno encontrado no crawl (ver seo_analysis._extract_internal_links)"""
+
+    __slots__ = ("url", "path", "text", "depth", "click_depth")
+    LAYOUT = tuple((None, key) for key in __slots__)
+
+
+def compact(record_class, data):
+    """Registro compacto do resultado de um analisador (resultados vazios ficam como estão)"""
+    return record_class.from_dict(data) if data else data
+
+
+def as_dict(value):
+    """Dicionário no formato dos analisadores, a partir de um registro ou de um dicionário"""
+    return value.to_dict() if isinstance(value, PageRecord) else value
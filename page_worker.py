@@ -0,0 +1,153 @@
+# ==============================================================================
+# ANÁLISE DE PÁGINAS EM PROCESSOS
+# Parse do HTML (BeautifulSoup), tokenização (NLTK) e legibilidade (textstat)
+# são CPU em Python puro, presos ao GIL: com threads, várias auditorias dividem
+# um único núcleo. Aqui essas etapas rodam num pool de processos. O worker
+# recebe o corpo bruto da página e devolve só resultados compactos (registros
+# com __slots__, ver page_records.py), com os spans medidos para o trace.
+# ==============================================================================
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from seo_analysis import (
+    BROKEN_LINK_CHECKS, analyze_content_advanced, analyze_geo_ai_optimization, analyze_structured_data,
+    decode_html, onpage_checks_html, release_soup
+)
+from ai_insights import ai_page_input
+from page_records import ContentRecord, GeoRecord, OnPageRecord, compact
+from image_audit import extract_images
+from lite_lab import extract_resources
+from instrumentation import (
+    AUDIT_MEMORY_TRACKING, current_trace, enable_memory_tracking, finish_trace, record_spans, span, start_trace
+)
+
+# Processos do pool (0 = analisa na própria thread da auditoria, sem pool)
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 1)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def analyze_page(content, encoding, url, options):
+    """Parse e analisadores de uma página a partir do corpo bruto
+
+    `options` segue audit_pipeline.audit_options (deep_analysis, content_analysis,
+    geo_analysis, ai_insights, image_audit e lite_lab). A ordem dos analisadores é a mesma do app:
+    analyze_content_advanced remove os <script> do soup usado pelo GEO.
+    On-page, conteúdo e GEO voltam como registros (page_records.as_dict dá o dicionário).
+    """
+    with span("analyze_page", "analyzer", url=url):
+        onpage, internal_links, soup = onpage_checks_html(decode_html(content, encoding), url)
+        try:
+            structured = analyze_structured_data(soup) if options['deep_analysis'] else {}
+            content_analysis = analyze_content_advanced(soup, url) if options['content_analysis'] else {}
+            geo = analyze_geo_ai_optimization(soup, url) if options['geo_analysis'] else {}
+            ai_page = ai_page_input(url, onpage, soup, content_analysis) if options['ai_insights'] else None
+            images = extract_images(soup, url) if options['image_audit'] or options['lite_lab'] else []
+            assets = extract_resources(soup, url) if options['lite_lab'] else None
+        finally:
+            release_soup(soup)
+    return {
+        'onpage': compact(OnPageRecord, onpage),
+        # Só os links que check_broken_links vai verificar; o total já está em onpage['links_internos']
+        'internal_links': internal_links[:BROKEN_LINK_CHECKS],
+        'structured': structured,
+        'content': compact(ContentRecord, content_analysis),
+        'geo': compact(GeoRecord, geo),
+        'ai_page': ai_page,
+        'images': images,
+        'assets': assets,
+        'html_bytes': len(content),
+    }
+
+
+# ========== POOL DE PROCESSOS ==========
+def _init_worker():
+    # Sem orçamento no processo filho: o pico de cada etapa volta para o trace do app
+    if AUDIT_MEMORY_TRACKING:
+        enable_memory_tracking()
+
+
+def _analyze_page_remote(content, encoding, url, options):
+    """Executada no processo do pool: a análise com um trace próprio, devolvido como spans"""
+    trace = start_trace(url, memory_budget=0)
+    try:
+        result = analyze_page(content, encoding, url, options)
+    finally:
+        finish_trace(trace)
+    result['spans'] = [span.to_dict() for span in trace.spans]
+    return result
+
+
+def get_process_pool():
+    """Pool compartilhado por todas as auditorias do processo, criado uma única vez
+
+    Cada processo novo recebe do pai a identificação do módulo __main__ e o
+    reimporta antes de trabalhar. O script do Streamlit (app.py) se declara não
+    reimportável (__spec__ com nome "__main__"), então os workers só carregam
+    este módulo, já importado pelo forkserver.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                # Os workers nascem de um servidor que já importou os analisadores (bs4, NLTK, textstat),
+                # e não de uma cópia do servidor do Streamlit com suas threads
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(["page_worker"])
+            else:
+                context = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(CPU_WORKERS, mp_context=context, initializer=_init_worker)
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PageAnalysis:
+    """Análise de uma página em andamento: enviada ao pool e recolhida com result()
+
+    Enquanto o processo analisa, a thread da auditoria segue com as etapas de rede.
+    Com CPU_WORKERS=0 (ou se o pool quebrar) a análise roda na própria thread.
+    """
+
+    def __init__(self, content, encoding, url, options):
+        self._args = (content, encoding, url, options)
+        self._result = None
+        self._future = None
+        self._pool = None
+        trace = current_trace()
+        self._offset = trace.elapsed() if trace else 0.0
+        if CPU_WORKERS > 0:
+            try:
+                self._pool = get_process_pool()
+                self._future = self._pool.submit(_analyze_page_remote, *self._args)
+            except (BrokenProcessPool, RuntimeError):
+                self._future = None
+                if self._pool is not None:
+                    _discard_pool(self._pool)
+
+    def result(self):
+        """Resultados compactos da página (espera o processo, se ainda não terminou)"""
+        if self._result is None:
+            if self._future is not None:
+                try:
+                    result = self._future.result()
+                    record_spans(result.pop('spans'), self._offset)
+                    self._result = result
+                except BrokenProcessPool:
+                    # Um worker morreu (ex.: falta de memória): o pool é recriado na próxima página
+                    _discard_pool(self._pool)
+                self._future = None
+            if self._result is None:
+                self._result = analyze_page(*self._args)
+            self._args = None
+        return self._result
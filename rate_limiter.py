@@ -0,0 +1,202 @@
+# ==============================================================================
+# LIMITADOR DE TAXA (TOKEN BUCKET) COMPARTILHADO ENTRE SESSÕES
+# Cada auditoria consome "fichas" proporcionais às requisições que vai fazer
+# (páginas e chamadas ao PageSpeed e ao Gemini). Há um balde por cliente e um balde global do servidor; a auditoria só
+# começa se os dois tiverem fichas. O estado fica em memória (um processo) ou
+# em SQLite, para várias instâncias do app compartilharem os mesmos limites.
+# ==============================================================================
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# Orçamentos em requisições por hora. O balde começa cheio, então o valor também é
+# a rajada máxima; depois as fichas voltam continuamente ao longo da hora
+RATE_LIMIT_CLIENT_PER_HOUR = float(os.getenv("RATE_LIMIT_CLIENT_PER_HOUR", "100"))
+RATE_LIMIT_GLOBAL_PER_HOUR = float(os.getenv("RATE_LIMIT_GLOBAL_PER_HOUR", "1000"))
+# Caminho do SQLite compartilhado; sem ele o estado fica na memória do processo
+RATE_LIMIT_PATH = os.getenv("RATE_LIMIT_PATH")
+# Atrás de um proxy reverso, o cabeçalho com o IP do cliente (ex.: X-Forwarded-For ou
+# X-Real-IP) e quantos proxies confiáveis acrescentam entradas a ele
+RATE_LIMIT_CLIENT_HEADER = os.getenv("RATE_LIMIT_CLIENT_HEADER")
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "1"))
+
+# A cada quantas aquisições os baldes de clientes já cheios são descartados
+PRUNE_EVERY = 200
+
+RateLimitDecision = namedtuple("RateLimitDecision", ["allowed", "scope", "retry_after", "remaining"])
+RateLimitDecision.__doc__ = """Resultado de uma aquisição
+
+scope indica o balde que negou ("client" ou "global"); retry_after é o tempo
+em segundos até haver fichas suficientes (None se o custo excede a capacidade).
+"""
+
+
+class MemoryBucketStore:
+    """Estado dos baldes na memória do processo (compartilhado entre sessões)"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            yield self
+
+    def get(self, key):
+        return self._buckets.get(key)
+
+    def read(self, keys):
+        """Estado atual dos baldes, sem abrir transação: {chave: (fichas, atualizado em)}"""
+        with self._lock:
+            return {key: self._buckets[key] for key in keys if key in self._buckets}
+
+    def set(self, key, tokens, updated_at):
+        self._buckets[key] = (tokens, updated_at)
+
+    def prune(self, prefix, older_than):
+        stale = [key for key, (_, updated_at) in self._buckets.items() if key.startswith(prefix) and updated_at < older_than]
+        for key in stale:
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBucketStore:
+    """Estado dos baldes em SQLite, com transações exclusivas entre processos"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # isolation_level=None: as transações são abertas explicitamente com BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            " key TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            # Reserva a escrita antes de ler: outro processo não lê um saldo que vai mudar
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def get(self, key):
+        return self._conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+
+    def read(self, keys):
+        """Estado atual dos baldes numa leitura simples, sem reservar a escrita do arquivo"""
+        keys = list(keys)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, tokens, updated_at FROM rate_buckets WHERE key IN ({', '.join('?' * len(keys))})", keys
+            ).fetchall()
+        return {key: (tokens, updated_at) for key, tokens, updated_at in rows}
+
+    def set(self, key, tokens, updated_at):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+            (key, tokens, updated_at),
+        )
+
+    def prune(self, prefix, older_than):
+        self._conn.execute("DELETE FROM rate_buckets WHERE key LIKE ? AND updated_at < ?", (prefix + "%", older_than))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_buckets")
+
+
+class RateLimiter:
+    """Token bucket com orçamento por cliente e orçamento global"""
+
+    def __init__(self, store=None, client_per_hour=RATE_LIMIT_CLIENT_PER_HOUR, global_per_hour=RATE_LIMIT_GLOBAL_PER_HOUR):
+        self.store = store or MemoryBucketStore()
+        # (prefixo da chave, capacidade, fichas por segundo) de cada balde
+        self.client_limit = (client_per_hour, client_per_hour / 3600)
+        self.global_limit = (global_per_hour, global_per_hour / 3600)
+        self._acquisitions = 0
+
+    def _buckets(self, client_id):
+        return [
+            ("client", f"client:{client_id}", *self.client_limit),
+            ("global", "global", *self.global_limit),
+        ]
+
+    @staticmethod
+    def _refill(state, capacity, rate, now):
+        if state is None:
+            return capacity
+        tokens, updated_at = state
+        return min(capacity, tokens + max(now - updated_at, 0) * rate)
+
+    def acquire(self, client_id, cost=1):
+        """Consome `cost` fichas dos baldes do cliente e global, ou nenhuma se algum não tiver saldo"""
+        now = time.time()
+        with self.store.transaction() as tx:
+            levels = []
+            for scope, key, capacity, rate in self._buckets(client_id):
+                tokens = self._refill(tx.get(key), capacity, rate, now)
+                if tokens < cost:
+                    retry_after = (cost - tokens) / rate if cost <= capacity and rate > 0 else None
+                    return RateLimitDecision(False, scope, retry_after, math.floor(tokens))
+                levels.append((key, tokens))
+
+            for key, tokens in levels:
+                tx.set(key, tokens - cost, now)
+
+            self._acquisitions += 1
+            if self._acquisitions % PRUNE_EVERY == 0:
+                # Baldes de clientes que já teriam se enchido de novo equivalem a baldes novos
+                capacity, rate = self.client_limit
+                tx.prune("client:", now - capacity / rate if rate > 0 else now)
+
+        return RateLimitDecision(True, None, 0.0, math.floor(min(tokens for _, tokens in levels) - cost))
+
+    def remaining(self, client_id):
+        """Fichas disponíveis agora para o cliente (o menor saldo entre os dois baldes)
+
+        Só leitura: roda a cada renderização da barra lateral, então não abre
+        a transação exclusiva de acquire; a recarga é calculada aqui.
+        """
+        now = time.time()
+        buckets = self._buckets(client_id)
+        states = self.store.read(key for _, key, _, _ in buckets)
+        return math.floor(min(self._refill(states.get(key), capacity, rate, now) for _, key, capacity, rate in buckets))
+
+
+def forwarded_client_ip(headers, header=RATE_LIMIT_CLIENT_HEADER, hops=RATE_LIMIT_PROXY_HOPS):
+    """IP do cliente no cabeçalho configurado do proxy confiável (None sem cabeçalho)
+
+    Cada proxy acrescenta o endereço de quem o chamou ao fim da lista; as
+    entradas antes das `hops` últimas vêm do próprio cliente e podem ser falsas.
+    """
+    if not header or headers is None:
+        return None
+    entries = [entry.strip() for entry in (headers.get(header) or "").split(",") if entry.strip()]
+    if not entries:
+        return None
+    return entries[-min(max(hops, 1), len(entries))]
+
+
+def default_rate_limiter():
+    """Limitador configurado pelo ambiente: SQLite se RATE_LIMIT_PATH estiver definido"""
+    store = SQLiteBucketStore(RATE_LIMIT_PATH) if RATE_LIMIT_PATH else MemoryBucketStore()
+    return RateLimiter(store)
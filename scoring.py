@@ -0,0 +1,201 @@
+# ==============================================================================
+# MOTOR DE SCORES BASEADO EM TABELAS
+# As regras de pontuação (faixas e pesos) ficam em scoring_tables.json e são
+# avaliadas de forma vetorizada sobre uma tabela de métricas (uma linha por
+# página). Assim um crawl inteiro é pontuado numa única chamada. Uma página
+# avulsa é pontuada pelas mesmas tabelas em Python puro, sem montar DataFrame.
+# ==============================================================================
+import json
+import operator
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TABLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scoring_tables.json")
+
+# Operadores aceitos nas faixas: chave da tabela -> comparação
+BAND_OPERATORS = {
+    "min": np.greater_equal,
+    "max": np.less_equal,
+    "gt": np.greater,
+    "lt": np.less,
+}
+
+# Os mesmos operadores para uma página avulsa (score_metrics)
+SCALAR_OPERATORS = {
+    "min": operator.ge,
+    "max": operator.le,
+    "gt": operator.gt,
+    "lt": operator.lt,
+}
+
+
+@lru_cache(maxsize=None)
+def load_scoring_tables(path=None):
+    """Carrega as tabelas de pontuação (SCORING_TABLES_PATH sobrescreve as padrão)"""
+    with open(DEFAULT_TABLES_PATH, encoding="utf-8") as f:
+        tables = json.load(f)
+
+    override_path = path or os.getenv("SCORING_TABLES_PATH")
+    if override_path:
+        with open(override_path, encoding="utf-8") as f:
+            tables.update(json.load(f))
+
+    return tables
+
+
+def _metric_values(frame, metric):
+    """Retorna a coluna da métrica como array float (NaN quando ausente)"""
+    if metric not in frame.columns:
+        return np.full(len(frame), np.nan)
+    return pd.to_numeric(frame[metric], errors="coerce").to_numpy(dtype=float)
+
+
+def _evaluate_rule(values, rule):
+    """Avalia uma regra (faixas ou linear) para todas as páginas de uma vez"""
+    missing = np.isnan(values)
+    # Compara com 0 onde falta valor para evitar avisos; o resultado é trocado depois
+    safe_values = np.where(missing, 0.0, values)
+
+    if rule["type"] == "linear":
+        points = safe_values / rule["max_value"] * rule["points"]
+    elif rule["type"] == "bands":
+        conditions = []
+        choices = []
+        for band in rule["bands"]:
+            condition = np.ones(len(values), dtype=bool)
+            for key, op in BAND_OPERATORS.items():
+                if key in band:
+                    condition &= op(safe_values, band[key])
+            conditions.append(condition)
+            choices.append(band["points"])
+        points = np.select(conditions, choices, default=rule.get("default", 0))
+    else:
+        raise ValueError(f"Tipo de regra desconhecido: {rule['type']}")
+
+    return np.where(missing, rule.get("missing", 0), points).astype(float)
+
+
+def score_frame(frame, table_name, tables=None, breakdown=False):
+    """Calcula o score de cada linha de um DataFrame de métricas
+
+    Retorna um array de inteiros (ou, com breakdown=True, um DataFrame com os
+    pontos de cada regra e a coluna "score").
+    """
+    table = (tables or load_scoring_tables())[table_name]
+    frame = frame if isinstance(frame, pd.DataFrame) else pd.DataFrame.from_records(frame)
+
+    rule_points = {}
+    total = np.zeros(len(frame))
+    for rule in table["rules"]:
+        points = _evaluate_rule(_metric_values(frame, rule["metric"]), rule)
+        rule_points[rule["metric"]] = points
+        total += points
+
+    total = np.round(total)
+    if table.get("cap") is not None:
+        total = np.minimum(total, table["cap"])
+    total = total.astype(int)
+
+    if breakdown:
+        result = pd.DataFrame(rule_points, index=frame.index)
+        result["score"] = total
+        return result
+    return total
+
+
+def numeric_or_nan(value):
+    """Valor como float, NaN quando ausente ou não numérico (como pd.to_numeric com coerce)"""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _evaluate_rule_scalar(value, rule):
+    """Avalia uma regra para uma única página (mesmo resultado de _evaluate_rule)"""
+    if np.isnan(value):
+        return float(rule.get("missing", 0))
+    if rule["type"] == "linear":
+        return value / rule["max_value"] * rule["points"]
+    if rule["type"] == "bands":
+        for band in rule["bands"]:
+            if all(op(value, band[key]) for key, op in SCALAR_OPERATORS.items() if key in band):
+                return float(band["points"])
+        return float(rule.get("default", 0))
+    raise ValueError(f"Tipo de regra desconhecido: {rule['type']}")
+
+
+def score_metrics(metrics, table_name, tables=None):
+    """Pontua uma única página a partir do dicionário de métricas
+
+    Chamado para cada página analisada (inclusive as do crawl): avalia a tabela
+    em Python puro, sem o custo de montar um DataFrame de uma linha.
+    """
+    table = (tables or load_scoring_tables())[table_name]
+    total = round(sum(_evaluate_rule_scalar(numeric_or_nan(metrics.get(rule["metric"])), rule)
+                      for rule in table["rules"]))
+    if table.get("cap") is not None:
+        total = min(total, table["cap"])
+    return int(total)
+
+
+# ========== EXTRAÇÃO DE MÉTRICAS A PARTIR DOS RESULTADOS DAS ANÁLISES ==========
+
+
+def seo_metrics(onpage_data, psi_data=None, keyword_data=None, structured_data=None, lab_data=None):
+    """Achata os resultados de uma página nas métricas do score geral de SEO"""
+    metrics = {
+        "title_length": 0 if onpage_data.get("title") == "N/A" else onpage_data.get("title_length", 0),
+        "h1_count": onpage_data.get("h1_count", 0),
+        "word_count": onpage_data.get("word_count", 0),
+        "meta_description_length": 0 if onpage_data.get("meta_description") == "N/A" else onpage_data.get("meta_description_length", 0),
+        "links_internos": onpage_data.get("links_internos", 0),
+        "mobile_performance": np.nan,
+        "image_alt_ratio": np.nan,
+        "keyword_prominence": np.nan,
+        "schemas_count": len(structured_data.get("schemas_found", [])) if structured_data else 0,
+    }
+
+    # Sem dados do PSI a regra usa a pontuação "missing"; valor inválido conta como 0
+    if psi_data and psi_data.get("mobile"):
+        perf = numeric_or_nan(psi_data["mobile"].get("psi_performance", 0))
+        metrics["mobile_performance"] = 0.0 if np.isnan(perf) else perf
+    elif lab_data:
+        # Estimativa local (lite_lab.py) no lugar da medição do PSI
+        metrics["mobile_performance"] = float(lab_data["estimated_score"])
+
+    total_imgs = onpage_data.get("image_count", 0)
+    if total_imgs > 0:
+        metrics["image_alt_ratio"] = (total_imgs - onpage_data.get("images_sem_alt", 0)) / total_imgs
+
+    if keyword_data and "keyword_prominence_score" in keyword_data:
+        metrics["keyword_prominence"] = numeric_or_nan(keyword_data.get("keyword_prominence_score", 0))
+
+    return metrics
+
+
+def content_quality_metrics(content_analysis):
+    """Achata o resultado de analyze_content_advanced nas métricas de qualidade"""
+    quality = content_analysis.get("content_quality", {})
+    headings = content_analysis.get("headings_analysis", {})
+    return {
+        "total_words": quality.get("total_words", 0),
+        "h1_count": headings.get("h1_count", 0),
+        "h2_count": headings.get("h2_count", 0),
+        "paragraph_count": quality.get("paragraph_count", 0),
+        "flesch_score": numeric_or_nan(content_analysis.get("readability", {}).get("flesch_score")),
+        "vocabulary_richness": content_analysis.get("semantic_analysis", {}).get("vocabulary_richness", 0),
+        "duplication_ratio": quality.get("duplication_ratio", 0),
+    }
+
+
+def geo_metrics(geo_analysis):
+    """Achata o resultado de analyze_geo_ai_optimization nas métricas do score GEO"""
+    metrics = {}
+    for section in ("content_structure", "factual_content", "ai_friendly_format", "authority_signals"):
+        for key, value in geo_analysis.get(section, {}).items():
+            metrics[key] = float(value) if isinstance(value, bool) else value
+    return metrics
@@ -0,0 +1,922 @@
+# ==============================================================================
+# SEÇÃO DE IMPORTAÇÕES (TODAS JUNTAS NO INÍCIO)
+# ==============================================================================
+import requests
+from bs4 import BeautifulSoup
+import os
+import pandas as pd
+from urllib.parse import urljoin, urlparse, urldefrag
+import time
+import validators
+import json
+from collections import Counter, deque
+import re
+from xml.etree import ElementTree
+from textstat import flesch_reading_ease, automated_readability_index
+import nltk
+from nltk.tokenize import sent_tokenize, word_tokenize
+from nltk.corpus import stopwords
+from scoring import score_frame, score_metrics, seo_metrics, content_quality_metrics, geo_metrics
+from link_graph import LinkGraphBuilder
+from geo_site import GeoSiteBuilder
+from page_records import CrawlLinkRecord
+from site_snapshot import SnapshotBuilder
+from instrumentation import MemoryBudgetExceeded, span, traced
+import http_client
+from lite_lab import extract_resources, measure_resources, site_key
+
+# ==============================================================================
+# CONFIGURAÇÕES INICIAIS E DOWNLOADS
+# ==============================================================================
+
+# Download necessário para NLTK (executar apenas uma vez)
+try:
+    nltk.data.find('tokenizers/punkt')
+except LookupError:
+    try:
+        nltk.download('punkt', quiet=True)
+    except:
+        nltk.download('punkt_tab', quiet=True)
+
+try:
+    nltk.data.find('corpora/stopwords')
+except LookupError:
+    nltk.download('stopwords', quiet=True)
+
+# ========== CONFIGURAÇÃO DAS APIS ==========
+PSI_API_KEY = os.getenv("PSI_API_KEY")
+# Permite apontar para um PSI local (ex.: o stub de benchmarks/mock_site.py)
+PSI_API_URL = os.getenv("PSI_API_URL", "https://www.googleapis.com/pagespeedonline/v5/runPagespeed")
+# Depois de quantos segundos sem resposta o PSI recebe uma segunda requisição igual (0 = desligado)
+PSI_HEDGE_AFTER_SECONDS = float(os.getenv("PSI_HEDGE_AFTER_SECONDS", "0"))
+
+# Limite de URLs lidas do sitemap.xml (e de sitemaps filhos de um índice) para o grafo de links
+SITEMAP_MAX_URLS = int(os.getenv("SITEMAP_MAX_URLS", "5000"))
+SITEMAP_MAX_FILES = int(os.getenv("SITEMAP_MAX_FILES", "5"))
+
+# Quantos links internos da página check_broken_links verifica
+BROKEN_LINK_CHECKS = int(os.getenv("BROKEN_LINK_CHECKS", "10"))
+
+# ==============================================================================
+# DEFINIÇÃO DAS FUNÇÕES DE ANÁLISE
+# (Sem dependência do Streamlit: usadas pelo app, pelos benchmarks e por workers)
+# ==============================================================================
+# Cabeçalho para simular um navegador real e evitar bloqueios
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+# ========== NOVA FUNCIONALIDADE: ANÁLISE DE GEO (GENERATIVE ENGINE OPTIMIZATION) ==========
+@traced("analyzer")
+def analyze_geo_ai_optimization(soup, url):
+    """Análise de GEO - Generative Engine Optimization para IAs"""
+    geo_analysis = {
+        "content_structure": {},
+        "factual_content": {},
+        "ai_friendly_format": {},
+        "authority_signals": {},
+        "geo_score": 0
+    }
+    
+    text_content = soup.get_text()
+    text_lower = text_content.lower()
+    
+    # === ANÁLISE DE ESTRUTURA DE CONTEÚDO PARA IAs ===
+    # Perguntas e respostas (formato FAQ)
+    faq_indicators = [
+        'o que é', 'como fazer', 'por que', 'quando', 'onde', 'quem',
+        'qual a diferença', 'como funciona', 'qual o melhor', 'pergunta',
+        'resposta', 'dúvida', 'questão'
+    ]
+    
+    faq_mentions = sum(1 for indicator in faq_indicators if indicator in text_lower)
+    geo_analysis["content_structure"]["faq_indicators"] = faq_mentions
+    
+    # Listas e estruturas organizadas
+    lists = soup.find_all(['ul', 'ol'])
+    geo_analysis["content_structure"]["lists_count"] = len(lists)
+    
+    # Tabelas (dados estruturados)
+    tables = soup.find_all('table')
+    geo_analysis["content_structure"]["tables_count"] = len(tables)
+    
+    # Headings bem estruturados
+    headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+    geo_analysis["content_structure"]["headings_count"] = len(headings)
+    
+    # Verifica hierarquia lógica de headings
+    h_levels = [int(h.name[1]) for h in headings]
+    hierarchy_score = 0
+    if h_levels:
+        # Pontos por ordem lógica (H1 -> H2 -> H3...)
+        for i in range(len(h_levels) - 1):
+            if h_levels[i+1] <= h_levels[i] + 1:  # Não pula níveis
+                hierarchy_score += 1
+        hierarchy_score = (hierarchy_score / max(len(h_levels) - 1, 1)) * 100
+    
+    geo_analysis["content_structure"]["hierarchy_score"] = round(hierarchy_score, 1)
+    
+    # === ANÁLISE DE CONTEÚDO FACTUAL ===
+    # Indicadores de conteúdo factual e autoritativo
+    factual_indicators = [
+        'segundo', 'de acordo com', 'estudos mostram', 'pesquisa indica',
+        'dados revelam', 'estatística', 'porcentagem', '%', 'número',
+        'ano', 'em 2023', 'em 2024', 'recente', 'atual'
+    ]
+    
+    factual_mentions = sum(1 for indicator in factual_indicators if indicator in text_lower)
+    geo_analysis["factual_content"]["factual_indicators"] = factual_mentions
+    
+    # Citations e referências
+    citations = soup.find_all('cite') + soup.find_all('blockquote')
+    geo_analysis["factual_content"]["citations"] = len(citations)
+    
+    # Links externos para fontes autoritárias
+    external_links = soup.find_all('a', href=True)
+    authoritative_domains = [
+        'wikipedia.org', 'edu.br', 'gov.br', 'ibge.gov.br',
+        'nature.com', 'pubmed.gov', 'scholar.google',
+        'researchgate.net', 'scielo.org'
+    ]
+    
+    authoritative_links = 0
+    for link in external_links:
+        href = link.get('href', '').lower()
+        if any(domain in href for domain in authoritative_domains):
+            authoritative_links += 1
+    
+    geo_analysis["factual_content"]["authoritative_links"] = authoritative_links
+    
+    # === ANÁLISE DE FORMATO AMIGÁVEL PARA IA ===
+    # Definições claras (importante para IAs)
+    definition_patterns = [
+        r'\b\w+\s+é\s+', r'\b\w+\s+são\s+', r'definição\s+de',
+        r'significa', r'conceito\s+de', r'refere-se\s+a'
+    ]
+    
+    definition_count = 0
+    for pattern in definition_patterns:
+        definition_count += len(re.findall(pattern, text_lower))
+    
+    geo_analysis["ai_friendly_format"]["definitions"] = definition_count
+    
+    # Exemplos práticos
+    example_indicators = [
+        'por exemplo', 'exemplo', 'como:', 'veja:', 'observe:',
+        'considere', 'imagine', 'suponha', 'caso'
+    ]
+    
+    example_mentions = sum(1 for indicator in example_indicators if indicator in text_lower)
+    geo_analysis["ai_friendly_format"]["examples"] = example_mentions
+    
+    # Comparações (úteis para IAs entenderem contexto)
+    comparison_indicators = [
+        'diferença entre', 'comparado com', 'versus', 'vs',
+        'melhor que', 'pior que', 'similar a', 'ao contrário'
+    ]
+    
+    comparison_mentions = sum(1 for indicator in comparison_indicators if indicator in text_lower)
+    geo_analysis["ai_friendly_format"]["comparisons"] = comparison_mentions
+    
+    # Instruções passo a passo
+    step_indicators = [
+        'passo', 'etapa', 'primeiro', 'segundo', 'terceiro',
+        'em seguida', 'depois', 'finalmente', 'para começar'
+    ]
+    
+    step_mentions = sum(1 for indicator in step_indicators if indicator in text_lower)
+    geo_analysis["ai_friendly_format"]["step_by_step"] = step_mentions
+    
+    # === ANÁLISE DE SINAIS DE AUTORIDADE ===
+    # Dados do autor
+    author_tags = soup.find_all(['meta'], attrs={'name': ['author', 'article:author']})
+    author_elements = soup.find_all(['span', 'div', 'p'], class_=lambda x: x and 'author' in x.lower() if x else False)
+    
+    geo_analysis["authority_signals"]["author_mentioned"] = len(author_tags) + len(author_elements) > 0
+    
+    # Data de publicação/atualização
+    date_tags = soup.find_all(['meta'], attrs={'name': ['publish_date', 'article:published_time', 'article:modified_time']})
+    time_elements = soup.find_all(['time'])
+    
+    geo_analysis["authority_signals"]["date_mentioned"] = len(date_tags) + len(time_elements) > 0
+    
+    # Schema Article
+    has_article_schema = False
+    json_scripts = soup.find_all("script", type="application/ld+json")
+    for script in json_scripts:
+        try:
+            data = json.loads(script.string.strip())
+            if isinstance(data, dict) and 'Article' in str(data.get('@type', '')):
+                has_article_schema = True
+                break
+        except:
+            continue
+    
+    geo_analysis["authority_signals"]["article_schema"] = has_article_schema
+    
+    # Comprimento do conteúdo (IAs preferem conteúdo substancial)
+    word_count = len(text_content.split())
+    geo_analysis["authority_signals"]["word_count"] = word_count
+    
+    # === CÁLCULO DO SCORE GEO ===
+    # Faixas e pesos definidos na tabela "geo" de scoring_tables.json
+    geo_analysis["geo_score"] = score_metrics(geo_metrics(geo_analysis), "geo")
+    
+    return geo_analysis
+
+@traced("analyzer")
+def analyze_content_advanced(soup, url):
+    """Análise avançada de conteúdo com métricas de legibilidade e estrutura"""
+    analysis = {
+        "readability": {},
+        "content_structure": {},
+        "semantic_analysis": {},
+        "content_quality": {},
+        "headings_analysis": {}
+    }
+    
+    # Extrai texto principal
+    body = soup.find("body")
+    if not body:
+        return analysis
+    
+    # Remove scripts, styles e elementos não relevantes
+    for script in body(["script", "style", "nav", "footer", "aside"]):
+        script.decompose()
+    
+    text = body.get_text()
+    
+    # Tokenização com fallback
+    try:
+        sentences = sent_tokenize(text)
+        words = word_tokenize(text.lower())
+    except:
+        # Fallback simples se NLTK não funcionar
+        sentences = re.split(r'[.!?]+', text)
+        sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
+        words = re.findall(r'\b[a-záàâãéêíóôõúç]+\b', text.lower())
+    
+    # Remove stopwords
+    try:
+        stop_words = set(stopwords.words('portuguese'))
+        filtered_words = [word for word in words if word.isalnum() and word not in stop_words]
+    except:
+        # Fallback para lista básica se não conseguir carregar stopwords
+        basic_stopwords = {
+            'a', 'o', 'e', 'é', 'de', 'do', 'da', 'em', 'um', 'uma', 'para', 'com', 'por', 
+            'que', 'se', 'na', 'no', 'os', 'as', 'dos', 'das', 'ao', 'aos', 'à', 'às',
+            'mas', 'ou', 'ser', 'ter', 'seu', 'sua', 'seus', 'suas', 'foi', 'são', 'não'
+        }
+        filtered_words = [word for word in words if word.isalnum() and word not in basic_stopwords]
+    
+    # === ANÁLISE DE LEGIBILIDADE ===
+    if len(text.strip()) > 50:  # Só analisa se tiver conteúdo suficiente
+        try:
+            analysis["readability"]["flesch_score"] = round(flesch_reading_ease(text), 2)
+            analysis["readability"]["ari_score"] = round(automated_readability_index(text), 2)
+        except:
+            analysis["readability"]["flesch_score"] = "N/A"
+            analysis["readability"]["ari_score"] = "N/A"
+        
+        # Calcula métricas customizadas
+        avg_sentence_length = len(words) / len(sentences) if sentences else 0
+        analysis["readability"]["avg_sentence_length"] = round(avg_sentence_length, 2)
+        
+        # Classifica legibilidade
+        flesch = analysis["readability"]["flesch_score"]
+        if isinstance(flesch, (int, float)):
+            if flesch >= 80:
+                analysis["readability"]["level"] = "Muito Fácil"
+                analysis["readability"]["level_color"] = "#2E8B57"
+            elif flesch >= 65:
+                analysis["readability"]["level"] = "Fácil"
+                analysis["readability"]["level_color"] = "#32CD32"
+            elif flesch >= 50:
+                analysis["readability"]["level"] = "Médio"
+                analysis["readability"]["level_color"] = "#FF8C00"
+            else:
+                analysis["readability"]["level"] = "Difícil"
+                analysis["readability"]["level_color"] = "#DC143C"
+        else:
+            analysis["readability"]["level"] = "N/A"
+            analysis["readability"]["level_color"] = "#696969"
+    
+    # === ANÁLISE DE ESTRUTURA DE CONTEÚDO ===
+    headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+    
+    headings_structure = []
+    for heading in headings:
+        headings_structure.append({
+            'level': heading.name,
+            'text': heading.get_text(strip=True),
+            'length': len(heading.get_text(strip=True))
+        })
+    
+    analysis["headings_analysis"]["total_headings"] = len(headings)
+    analysis["headings_analysis"]["structure"] = headings_structure
+    
+    # Analisa hierarquia de headings
+    h_levels = [h['level'] for h in headings_structure]
+    h1_count = h_levels.count('h1')
+    h2_count = h_levels.count('h2')
+    h3_count = h_levels.count('h3')
+    
+    analysis["headings_analysis"]["h1_count"] = h1_count
+    analysis["headings_analysis"]["h2_count"] = h2_count
+    analysis["headings_analysis"]["h3_count"] = h3_count
+    
+    # Verifica hierarquia lógica
+    hierarchy_issues = []
+    if h1_count == 0:
+        hierarchy_issues.append("Ausência de H1")
+    elif h1_count > 1:
+        hierarchy_issues.append("Múltiplos H1")
+    
+    if h2_count == 0 and len(text.split()) > 500:
+        hierarchy_issues.append("Falta de H2 em conteúdo longo")
+    
+    analysis["headings_analysis"]["hierarchy_issues"] = hierarchy_issues
+    
+    # === ANÁLISE SEMÂNTICA ===
+    # Densidade de palavras-chave (top 10)
+    word_freq = Counter(filtered_words)
+    top_words = dict(word_freq.most_common(10))
+    analysis["semantic_analysis"]["top_keywords"] = top_words
+    analysis["semantic_analysis"]["vocabulary_richness"] = len(set(filtered_words)) / len(filtered_words) if filtered_words else 0
+    
+    # === QUALIDADE DO CONTEÚDO ===
+    paragraphs = soup.find_all('p')
+    paragraph_lengths = [len(p.get_text().split()) for p in paragraphs if p.get_text().strip()]
+    
+    analysis["content_quality"]["paragraph_count"] = len(paragraph_lengths)
+    analysis["content_quality"]["avg_paragraph_length"] = round(sum(paragraph_lengths) / len(paragraph_lengths), 2) if paragraph_lengths else 0
+    analysis["content_quality"]["total_words"] = len(words)
+    analysis["content_quality"]["total_sentences"] = len(sentences)
+    
+    # Detecta conteúdo duplicado simples
+    unique_sentences = set(sentences)
+    duplication_ratio = 1 - (len(unique_sentences) / len(sentences)) if sentences else 0
+    analysis["content_quality"]["duplication_ratio"] = round(duplication_ratio * 100, 2)
+    
+    # Score de qualidade geral do conteúdo (tabela "content_quality" de scoring_tables.json)
+    analysis["content_quality"]["quality_score"] = score_metrics(content_quality_metrics(analysis), "content_quality")
+    
+    return analysis
+
+# ========== TÓPICO 2: VALIDAÇÃO DE URL ROBUSTA ==========
+def validate_url(url):
+    """Validação robusta de URLs"""
+    if not url:
+        return False, "URL não pode estar vazia"
+    
+    # Adiciona http:// se não tiver protocolo
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    
+    if not validators.url(url):
+        return False, "Formato de URL inválido"
+    
+    parsed = urlparse(url)
+    if parsed.scheme not in ['http', 'https']:
+        return False, "URL deve usar protocolo HTTP ou HTTPS"
+    
+    if not parsed.netloc:
+        return False, "URL deve conter um domínio válido"
+    
+    return True, url
+
+@traced("external")
+def test_url_accessibility(url):
+    """Testa se a URL é acessível"""
+    try:
+        response = http_client.head(url, timeout=10, allow_redirects=True)
+        if response.status_code >= 400:
+            return False, f"Erro HTTP {response.status_code}"
+        return True, "URL acessível"
+    except requests.exceptions.RequestException as e:
+        return False, f"Erro de conexão: {str(e)[:100]}"
+
+# ========== TÓPICO 3: ANÁLISE DE PALAVRAS-CHAVE ==========
+@traced("analyzer")
+def keyword_analysis(soup, target_keyword=None):
+    """Análise avançada de palavras-chave e densidade"""
+    body = soup.find("body")
+    if not body:
+        return {}
+    
+    text = body.get_text().lower()
+    words = [word.strip('.,!?";()[]{}') for word in text.split() if len(word.strip('.,!?";()[]{}')) > 2]
+    
+    analysis = {
+        "total_words": len(words),
+        "unique_words": len(set(words))
+    }
+    
+    if target_keyword:
+        keyword_lower = target_keyword.lower()
+        keyword_count = text.count(keyword_lower)
+        
+        # Verifica presença em elementos importantes
+        title = soup.find("title")
+        h1s = soup.find_all("h1")
+        meta_desc = soup.find("meta", attrs={"name": "description"})
+        
+        analysis.update({
+            "target_keyword": target_keyword,
+            "keyword_count": keyword_count,
+            "keyword_density": round((keyword_count / len(words)) * 100, 2) if words else 0,
+            "in_title": keyword_lower in (title.get_text().lower() if title else ""),
+            "in_h1": any(keyword_lower in h1.get_text().lower() for h1 in h1s),
+            "in_meta_desc": keyword_lower in (meta_desc.get("content", "").lower() if meta_desc else ""),
+            "keyword_prominence_score": 0
+        })
+        
+        # Calcula score de proeminência (0-100)
+        score = 0
+        if analysis["in_title"]: score += 30
+        if analysis["in_h1"]: score += 25
+        if analysis["in_meta_desc"]: score += 20
+        if 1 <= analysis["keyword_density"] <= 3: score += 25
+        elif analysis["keyword_density"] > 0: score += 15
+        
+        analysis["keyword_prominence_score"] = score
+    
+    # Top 10 palavras mais frequentes
+    word_freq = Counter(words)
+    analysis["top_words"] = dict(word_freq.most_common(10))
+    
+    return analysis
+
+# ========== TÓPICO 5: ANÁLISE DETALHADA DE DADOS ESTRUTURADOS ==========
+@traced("analyzer")
+def analyze_structured_data(soup):
+    """Análise completa dos dados estruturados"""
+    structured_data = {
+        "json_ld_count": 0,
+        "microdata_count": 0,
+        "schemas_found": [],
+        "errors": [],
+        "recommendations": []
+    }
+    
+    # Análise JSON-LD
+    json_scripts = soup.find_all("script", type="application/ld+json")
+    structured_data["json_ld_count"] = len(json_scripts)
+    
+    for i, script in enumerate(json_scripts):
+        try:
+            data = json.loads(script.get_text().strip())
+            # Um bloco pode trazer um único objeto ou uma lista deles
+            for item in data if isinstance(data, list) else [data]:
+                schema_type = item.get("@type", "Unknown") if isinstance(item, dict) else "Unknown"
+                structured_data["schemas_found"].append({
+                    "type": schema_type,
+                    "method": "JSON-LD",
+                    "valid": True,
+                    "position": i + 1
+                })
+        except json.JSONDecodeError as e:
+            structured_data["errors"].append(f"JSON-LD inválido na posição {i + 1}: {str(e)[:100]}")
+    
+    # Análise Microdata
+    microdata_items = soup.find_all(attrs={"itemtype": True})
+    structured_data["microdata_count"] = len(microdata_items)
+    
+    for item in microdata_items:
+        itemtype = item.get("itemtype", "")
+        if "schema.org" in itemtype:
+            schema_name = itemtype.split("/")[-1]
+            structured_data["schemas_found"].append({
+                "type": schema_name,
+                "method": "Microdata",
+                "valid": True
+            })
+    
+    # Recomendações
+    if structured_data["json_ld_count"] == 0 and structured_data["microdata_count"] == 0:
+        structured_data["recommendations"].append("Implementar dados estruturados para melhorar a visibilidade nos resultados de busca")
+    
+    if len(structured_data["schemas_found"]) == 0:
+        structured_data["recommendations"].append("Adicionar Schema.org adequado ao tipo de conteúdo (Article, Product, Organization, etc.)")
+    
+    return structured_data
+
+def calculate_overall_seo_score(onpage_data, psi_data, keyword_data, structured_data, lab_data=None):
+    """Calcula um score geral de SEO baseado em múltiplos fatores
+
+    Sem dados do PSI, a performance vem da estimativa do lite lab (lab_data), se houver.
+    """
+    if not onpage_data:
+        return 0
+    
+    # Faixas e pesos definidos na tabela "seo" de scoring_tables.json
+    return score_metrics(seo_metrics(onpage_data, psi_data, keyword_data, structured_data, lab_data), "seo")
+
+def calculate_overall_seo_scores(pages):
+    """Calcula o score geral de SEO de várias páginas numa única chamada vetorizada
+
+    Recebe uma lista de tuplas com os argumentos de calculate_overall_seo_score:
+    (onpage_data, psi_data, keyword_data, structured_data[, lab_data]).
+    """
+    metrics = [seo_metrics(onpage or {}, *rest) for onpage, *rest in pages]
+    scores = score_frame(pd.DataFrame.from_records(metrics), "seo") if metrics else []
+    return [int(score) if onpage else 0 for score, (onpage, *_) in zip(scores, pages)]
+
+def release_soup(soup):
+    """Desmonta a árvore do BeautifulSoup assim que os resultados compactos foram extraídos
+
+    A árvore tem referências circulares (pai <-> filhos); sem isso ela só é
+    liberada quando o coletor de ciclos rodar. O decompose() do objeto raiz não
+    percorre a árvore, por isso os filhos de primeiro nível são desmontados antes.
+    """
+    if soup is not None:
+        for child in list(soup.contents):
+            child.decompose()
+        soup.decompose()
+
+# ========== NOVA FUNCIONALIDADE: SITEMAP E MAPEAMENTO ==========
+def _extract_internal_links(soup, page_url, base_domain):
+    """Lista os links internos de uma página já parseada (registros compactos, ver page_records)"""
+    internal_links = []
+    
+    for link in soup.find_all("a", href=True):
+        href = link.get('href')
+        if href:
+            # Resolve URL relativa (sem o fragmento, que aponta para a mesma página)
+            full_url = urldefrag(urljoin(page_url, href))[0]
+            parsed = urlparse(full_url)
+            
+            # Verifica se é link interno
+            if parsed.netloc == base_domain and not href.startswith('#'):
+                # Extrai informações do link
+                link_info = {
+                    'url': full_url,
+                    'path': parsed.path,
+                    'text': link.get_text(strip=True)[:50],
+                    'depth': len(parsed.path.strip('/').split('/')) if parsed.path != '/' else 0
+                }
+                internal_links.append(CrawlLinkRecord.from_dict(link_info))
+    
+    return internal_links
+
+def _crawl_subresources(page_assets, domain):
+    """CSS, JS e fontes das páginas rastreadas, cada URL buscada uma vez pelo cache do site"""
+    usage = Counter(asset for _, assets in page_assets for asset in set(assets))
+    assets = list(usage)
+    fetched = measure_resources(site_key(domain), [asset_url for asset_url, _ in assets])
+    sizes = {asset: entry.size for asset, entry in zip(assets, fetched) if entry is not None and entry.ok}
+    page_bytes = [sum(sizes.get(asset, 0) for asset in set(page)) for _, page in page_assets]
+    shared = sorted(assets, key=lambda asset: (-usage[asset], -(sizes.get(asset) or 0)))
+    return {
+        'unique': len(assets),
+        'unique_bytes': sum(sizes.values()),
+        # O que as páginas somam: sem o cache, cada uma baixaria de novo seus recursos
+        'pages_bytes': sum(page_bytes),
+        'avg_page_bytes': sum(page_bytes) / len(page_bytes) if page_bytes else 0,
+        'shared': [{'url': asset_url, 'type': asset_type, 'pages': usage[(asset_url, asset_type)],
+                    'bytes': sizes.get((asset_url, asset_type))} for asset_url, asset_type in shared[:10]],
+    }
+
+def _sitemap_locs(content):
+    """(é índice de sitemaps?, URLs dos <loc>) de um sitemap.xml; (False, []) se não for XML válido"""
+    try:
+        root = ElementTree.fromstring(content)
+    except ElementTree.ParseError:
+        return False, []
+    locs = [element.text.strip() for element in root.iter() if element.tag.endswith('loc') and element.text]
+    return root.tag.endswith('sitemapindex'), locs
+
+def fetch_sitemap_urls(url, base_domain):
+    """URLs do domínio listadas no /sitemap.xml do site (segue um nível de índice de sitemaps)
+
+    Servem de lista de páginas conhecidas para o grafo de links: as que nenhuma
+    página rastreada aponta são as órfãs. Sem sitemap, retorna uma lista vazia.
+    """
+    headers = {"User-Agent": "Mozilla/5.0"}
+    parsed = urlparse(url)
+    pending = deque([f"{parsed.scheme}://{base_domain}/sitemap.xml"])
+    fetched = 0
+    urls = []
+    seen = set()
+    while pending and fetched < SITEMAP_MAX_FILES and len(urls) < SITEMAP_MAX_URLS:
+        sitemap_url = pending.popleft()
+        fetched += 1
+        try:
+            with span("sitemap_fetch", "fetch", url=sitemap_url) as fetch_span:
+                response = http_client.get(sitemap_url, timeout=10, headers=headers)
+                fetch_span.add(bytes=len(response.content))
+                response.raise_for_status()
+        except requests.exceptions.RequestException:
+            continue
+        is_index, locs = _sitemap_locs(response.content)
+        for loc in locs:
+            loc = urldefrag(loc)[0]
+            if urlparse(loc).netloc != base_domain:
+                continue
+            if is_index:
+                pending.append(loc)
+            elif loc not in seen and len(urls) < SITEMAP_MAX_URLS:
+                seen.add(loc)
+                urls.append(loc)
+    return urls
+
+@traced("crawler")
+def extract_site_structure(url, max_depth=2, max_pages=20, crawl_pages=1, measure_assets=False, geo_pages=False,
+                           snapshot_pages=False):
+    """Extrai a estrutura do site para criar sitemap
+
+    Rastreia em largura até crawl_pages páginas (no máximo max_depth cliques a
+    partir da URL inicial), registrando as arestas página -> página no grafo de
+    links internos; as URLs do sitemap.xml entram no grafo como páginas
+    conhecidas, para achar as órfãs. Com measure_assets, mede também os CSS/JS/fontes das páginas
+    rastreadas (os compartilhados são baixados uma única vez). Com geo_pages,
+    roda a análise GEO em cada página rastreada (ver geo_site.SiteGeo). Com
+    snapshot_pages, guarda o retrato de cada página (hash do texto, title, meta,
+    H1 e métricas on-page) e as que falharam (ver site_snapshot.SiteSnapshot).
+    """
+    try:
+        headers = {"User-Agent": "Mozilla/5.0"}
+        base_domain = urlparse(url).netloc
+        
+        graph = LinkGraphBuilder()
+        graph.node(url)
+        internal_links = []
+        queue = deque([(url, 0)])
+        queued = {url}
+        pages_crawled = 0
+        page_assets = []
+        site_geo = GeoSiteBuilder() if geo_pages else None
+        snapshot = SnapshotBuilder(base_domain) if snapshot_pages else None
+        
+        while queue and pages_crawled < crawl_pages:
+            page_url, clicks = queue.popleft()
+            try:
+                with span("crawl_fetch", "fetch", url=page_url) as fetch_span:
+                    response = http_client.get(page_url, timeout=10, headers=headers)
+                    fetch_span.add(bytes=len(response.content))
+                    response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                if pages_crawled == 0:
+                    raise  # Sem a página inicial não há estrutura
+                if snapshot is not None:
+                    snapshot.add_failure(page_url, e.response.status_code if e.response is not None else "Erro de Conexão")
+                continue
+            pages_crawled += 1
+            
+            soup = None
+            try:
+                with span("crawl_parse", "parse"):
+                    soup = BeautifulSoup(response.text, "html.parser")
+                page_links = _extract_internal_links(soup, page_url, base_domain)
+                assets = [(resource['url'], resource['type'])
+                          for resource in extract_resources(soup, page_url)['resources']
+                          if resource['type'] in ('css', 'js', 'font')] if measure_assets else None
+                geo = analyze_geo_ai_optimization(soup, page_url) if site_geo is not None else None
+                fields = _snapshot_fields(soup, page_url) if snapshot is not None else None
+            except MemoryBudgetExceeded:
+                raise
+            except Exception as e:
+                # Uma página que os analisadores não conseguem processar não derruba o crawl
+                if snapshot is not None:
+                    snapshot.add_failure(page_url, f"Erro de Análise ({type(e).__name__})")
+                continue
+            finally:
+                release_soup(soup)
+            if assets is not None:
+                page_assets.append((page_url, assets))
+            if geo is not None:
+                site_geo.add(page_url, geo)
+            if fields is not None:
+                snapshot.add(page_url, *fields, geo['geo_score'] if geo is not None else None)
+            internal_links.extend(page_links)
+            graph.add_links(page_url, [link.url for link in page_links])
+            
+            if clicks < max_depth:
+                for link in page_links:
+                    if link.url not in queued:
+                        queued.add(link.url)
+                        queue.append((link.url, clicks + 1))
+        
+        # Remove duplicatas e limita
+        seen_urls = set()
+        unique_links = []
+        for link in internal_links:
+            if link.url not in seen_urls and len(unique_links) < max_pages:
+                seen_urls.add(link.url)
+                unique_links.append(link)
+        
+        # Páginas do sitemap: as que nenhuma página rastreada aponta são órfãs
+        sitemap_urls = fetch_sitemap_urls(url, base_domain)
+        graph.add_known(sitemap_urls)
+        
+        # Profundidade real de clique, calculada no grafo
+        link_graph = graph.build()
+        click_depths = link_graph.click_depth(url)
+        for link in unique_links:
+            link.click_depth = int(click_depths[link_graph.node_ids[link.url]])
+        
+        return {
+            'base_url': url,
+            'domain': base_domain,
+            'total_links_found': len(internal_links),
+            'unique_pages': len(unique_links),
+            'pages_crawled': pages_crawled,
+            'structure': [link.to_dict() for link in unique_links],
+            'link_graph': link_graph,
+            'sitemap_urls': len(sitemap_urls),
+            'subresources': _crawl_subresources(page_assets, base_domain) if measure_assets else None,
+            'geo': site_geo.build() if site_geo is not None else None,
+            'snapshot': snapshot.build() if snapshot is not None else None
+        }
+        
+    except MemoryBudgetExceeded:
+        raise  # O limite de memória interrompe a auditoria, não vira erro do sitemap
+    except Exception as e:
+        return {
+            'error': str(e),
+            'base_url': url,
+            'structure': []
+        }
+
+def _snapshot_fields(soup, page_url):
+    """(on-page, texto do primeiro H1, texto do <body>) de uma página, no formato de SnapshotBuilder.add"""
+    onpage, _, body_text = onpage_checks_soup(soup, page_url)
+    h1 = soup.find("h1")
+    return onpage, h1.get_text(" ", strip=True) if h1 else "", body_text
+
+@traced("crawler")
+def recrawl_page(page_url, base_domain, etag=None, last_modified=None):
+    """Busca de novo uma página já conhecida do site (re-crawl do monitoramento)
+
+    Com os validadores da última visita a requisição é condicional: um 304
+    volta sem corpo. Retorna status, os novos validadores, os campos do retrato
+    (on-page, H1, texto e score GEO; None se a página não veio) e os links
+    internos. Levanta as exceções do requests quando não há resposta e as dos
+    analisadores quando a página não pode ser processada.
+    """
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    with span("recrawl_fetch", "fetch", url=page_url) as fetch_span:
+        response = http_client.get(page_url, timeout=10, headers=headers)
+        fetch_span.add(bytes=len(response.content))
+    result = {
+        'status': response.status_code,
+        'etag': response.headers.get("ETag", etag),
+        'last_modified': response.headers.get("Last-Modified", last_modified),
+        'page': None,
+        'links': [],
+    }
+    if response.status_code != 200:
+        return result
+    
+    with span("crawl_parse", "parse"):
+        soup = BeautifulSoup(response.text, "html.parser")
+    try:
+        geo_score = analyze_geo_ai_optimization(soup, page_url)['geo_score']
+        result['page'] = (*_snapshot_fields(soup, page_url), geo_score)
+        result['links'] = _extract_internal_links(soup, page_url, base_domain)
+    finally:
+        release_soup(soup)
+    return result
+
+def analyze_site_strategy(site_structure):
+    """Analisa a estratégia de estrutura do site"""
+    if not site_structure.get('structure'):
+        return "Não foi possível analisar a estrutura do site."
+    
+    pages = site_structure['structure']
+    depth_analysis = {}
+    
+    for page in pages:
+        depth = page['depth']
+        if depth not in depth_analysis:
+            depth_analysis[depth] = []
+        depth_analysis[depth].append(page)
+    
+    insights = []
+    
+    # Análise de profundidade
+    max_depth = max(depth_analysis.keys()) if depth_analysis else 0
+    if max_depth <= 2:
+        insights.append("✅ **Estrutura rasa**: Boa para SEO, fácil navegação")
+    elif max_depth <= 4:
+        insights.append("⚠️ **Estrutura média**: Adequada, mas pode ser otimizada")
+    else:
+        insights.append("❌ **Estrutura muito profunda**: Pode dificultar indexação")
+    
+    return "\n".join(insights)
+
+# ========== FUNÇÕES EXISTENTES ==========
+@traced("external")
+def get_pagespeed_insights(url_to_check: str) -> dict:
+    if not PSI_API_KEY: return {}
+    insights_data = {"redirected": False}
+    strategies = ["mobile", "desktop"]
+    for strategy in strategies:
+        params = {"url": url_to_check, "strategy": strategy, "key": PSI_API_KEY}
+        try:
+            with span(f"psi_{strategy}", "external") as psi_span:
+                response = http_client.get(PSI_API_URL, params=params, timeout=60, hedge_after=PSI_HEDGE_AFTER_SECONDS)
+                psi_span.add(bytes=len(response.content))
+                response.raise_for_status()
+                data = response.json()
+            final_url = data.get('lighthouseResult', {}).get('finalUrl', url_to_check)
+            insights_data['final_url'] = final_url
+            if url_to_check != final_url: insights_data['redirected'] = True
+            categories = data.get('lighthouseResult', {}).get('categories', {})
+            scores = {f"psi_{category.replace('-', '_')}": int(categories.get(category, {}).get('score', 0) * 100) for category in ['performance', 'accessibility', 'best-practices', 'seo']}
+            insights_data[strategy] = scores
+        except requests.exceptions.RequestException as e:
+            # Falhou mesmo depois das novas tentativas: o motivo fica registrado junto dos dados
+            insights_data[strategy] = {}
+            insights_data.setdefault('errors', {})[strategy] = str(e)[:200]
+    return insights_data
+
+@traced("external")
+def check_broken_links(base_url: str, internal_links: list) -> list:
+    broken_links = []
+    headers = {"User-Agent": "Mozilla/5.0"}
+    for link in internal_links[:BROKEN_LINK_CHECKS]:
+        full_url = urljoin(base_url, link)
+        try:
+            with span("link_check", "fetch", url=full_url):
+                response = http_client.head(full_url, headers=headers, timeout=5, allow_redirects=True)
+            if response.status_code >= 400: broken_links.append({"url": full_url, "status": response.status_code})
+        except requests.RequestException: broken_links.append({"url": full_url, "status": "Erro de Conexão"})
+        time.sleep(0.1)
+    return broken_links
+
+def fetch_page(url):
+    """Baixa a página e devolve o corpo bruto e o charset declarado pelo servidor
+
+    O corpo segue em bytes para poder ser enviado a outro processo sem decodificar
+    (ver page_worker.py); decode_html faz a mesma conversão de response.text.
+    """
+    headers = {"User-Agent": "Mozilla/5.0"}
+    with span("fetch_page", "fetch", url=url) as fetch_span:
+        response = http_client.get(url, timeout=10, headers=headers)
+        fetch_span.add(bytes=len(response.content))
+        response.raise_for_status()
+    return response.content, response.encoding
+
+def decode_html(content, encoding=None):
+    """Decodifica o corpo bruto como o requests: charset declarado ou detectado"""
+    if not content:
+        return ""
+    if encoding is None:
+        encoding = requests.compat.chardet.detect(content)["encoding"]
+    try:
+        return str(content, encoding, errors="replace")
+    except (LookupError, TypeError):
+        return str(content, errors="replace")
+
+@traced("analyzer")
+def onpage_checks(url):
+    try:
+        content, encoding = fetch_page(url)
+    except requests.exceptions.RequestException: return None, [], None
+    
+    return onpage_checks_html(decode_html(content, encoding), url)
+
+
+def onpage_checks_html(html, url):
+    """Checks on-page sobre um HTML já baixado (usado também pelos benchmarks)"""
+    with span("parse_html", "parse"):
+        soup = BeautifulSoup(html, "html.parser")
+    checks, internal_links, _ = onpage_checks_soup(soup, url)
+    return checks, internal_links, soup
+
+
+def onpage_checks_soup(soup, url):
+    """Checks on-page de uma página já parseada; devolve também o texto do <body>"""
+    checks = {}
+    
+    title_tag = soup.title
+    # get_text: title vazio ou com tags dentro não tem .string
+    checks["title"] = title_tag.get_text(strip=True) if title_tag else "N/A"
+    checks["title_length"] = len(checks["title"]) if title_tag else 0
+    
+    meta_desc = soup.find("meta", attrs={"name": "description"})
+    checks["meta_description"] = meta_desc["content"].strip() if meta_desc and meta_desc.get("content") else "N/A"
+    checks["meta_description_length"] = len(checks["meta_description"]) if meta_desc and meta_desc.get("content") else 0
+    
+    checks["h1_count"] = len(soup.find_all("h1"))
+    
+    all_links = soup.find_all("a", href=True)
+    valid_links = [a['href'] for a in all_links if a['href'] and not a['href'].startswith(('#', 'tel:', 'mailto:'))]
+    internal_links = [link for link in valid_links if urlparse(url).netloc in link or link.startswith('/')]
+    checks["links_internos"] = len(internal_links)
+    
+    checks["image_count"] = len(soup.find_all("img"))
+    
+    # Conta imagens sem alt text
+    images = soup.find_all("img")
+    images_sem_alt = [img for img in images if not img.get("alt", "").strip()]
+    checks["images_sem_alt"] = len(images_sem_alt)
+    
+    body_text = soup.find("body").get_text(separator=" ", strip=True) if soup.find("body") else ""
+    checks["word_count"] = len(body_text.split())
+    
+    return checks, internal_links, body_text
@@ -0,0 +1,198 @@
+# ==============================================================================
+# CACHE COMPARTILHADO ENTRE SESSÕES
+# Páginas baixadas e resultados de análise (PageSpeed, concorrentes) guardados
+# no processo do servidor e vistos por todas as sessões do Streamlit: dois
+# analistas auditando o mesmo concorrente em poucos minutos pagam uma única
+# busca por TTL. Os valores ficam serializados (pickle), o que dá a cada sessão
+# a sua própria cópia e mede o tamanho exato de cada entrada. O total de bytes é
+# limitado e as entradas menos usadas saem primeiro. Buscas simultâneas da
+# mesma chave esperam um único cálculo. Com SHARED_CACHE_PATH, as entradas
+# também vão para SQLite e sobrevivem a reinícios (e a outras instâncias).
+# ==============================================================================
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+SHARED_CACHE_TTL_SECONDS = float(os.getenv("SHARED_CACHE_TTL_SECONDS", "900"))
+SHARED_CACHE_MAX_MB = float(os.getenv("SHARED_CACHE_MAX_MB", "256"))
+# Persistência opcional em disco (sem caminho, só memória) e o limite do arquivo
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH")
+SHARED_CACHE_DISK_MAX_MB = float(os.getenv("SHARED_CACHE_DISK_MAX_MB", "1024"))
+
+
+def cache_key(namespace, *parts):
+    """Chave textual de uma entrada: tipo do resultado e o que o identifica (URL, opções)"""
+    return json.dumps([namespace, *parts], ensure_ascii=False, sort_keys=True, default=str)
+
+
+class DiskStore:
+    """Cópia das entradas em SQLite, com despejo das mais antigas acima do limite de bytes"""
+
+    def __init__(self, path, max_bytes=SHARED_CACHE_DISK_MAX_MB * 2**20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_shared_cache_created ON shared_cache (created_at)")
+        self._conn.commit()
+
+    def get(self, key, not_before):
+        """(valor serializado, criado em) se a entrada existe e é mais nova que not_before"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT value, created_at FROM shared_cache WHERE key = ? AND created_at >= ?", (key, not_before)
+            ).fetchone()
+
+    def put(self, key, value, created_at, expired_before):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO shared_cache (key, value, size, created_at) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), created_at),
+            )
+            self._conn.execute("DELETE FROM shared_cache WHERE created_at < ?", (expired_before,))
+            total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM shared_cache").fetchone()[0]
+            if total_bytes > self.max_bytes:
+                to_delete = []
+                for old_key, size in self._conn.execute("SELECT key, size FROM shared_cache ORDER BY created_at ASC"):
+                    if total_bytes <= self.max_bytes:
+                        break
+                    to_delete.append((old_key,))
+                    total_bytes -= size
+                self._conn.executemany("DELETE FROM shared_cache WHERE key = ?", to_delete)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_cache")
+            self._conn.commit()
+
+
+class SharedCache:
+    """Resultados por chave com TTL, limite de bytes (LRU), cálculo único por chave e disco opcional"""
+
+    def __init__(self, max_bytes=SHARED_CACHE_MAX_MB * 2**20, ttl=SHARED_CACHE_TTL_SECONDS, path=SHARED_CACHE_PATH):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk = DiskStore(path) if path else None
+        # Chave: (valor serializado, criado em)
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def fetch(self, key, compute, refresh=False, cacheable=None):
+        """(valor, veio do cache) da chave; calcula com compute() só se preciso
+
+        Com refresh, ignora o que está guardado (mas guarda o novo valor).
+        `cacheable(valor)` decide se o resultado calculado pode ser guardado
+        (falhas, por exemplo, não devem ser reaproveitadas por outras sessões).
+        Quem esperava pela mesma chave recebe o valor só se ele foi guardado;
+        senão calcula de novo. As exceções de compute() chegam a quem esperava.
+        """
+        now = time.time()
+        with self._lock:
+            entry = None if refresh else self._entries.get(key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(entry[0]), True
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                future = self._inflight[key] = Future()
+        if waiting is not None:
+            # Outra sessão já está calculando essa chave
+            data, kept = waiting.result()
+            if kept:
+                return pickle.loads(data), True
+            return self.fetch(key, compute, refresh, cacheable)
+
+        try:
+            value, data, created_at, stored = self._load_or_compute(key, compute, refresh, now)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        keep = data is not None and (cacheable is None or cacheable(value))
+        with self._lock:
+            if stored:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+            if keep:
+                self._store(key, data, created_at)
+            del self._inflight[key]
+        if keep and not stored and self.disk is not None:
+            self.disk.put(key, data, created_at, time.time() - self.ttl)
+        future.set_result((data, keep))
+        return value, stored
+
+    def _load_or_compute(self, key, compute, refresh, now):
+        """(valor, serializado, criado em, veio do disco) da entrada no disco ou de compute()"""
+        stored = None if refresh or self.disk is None else self.disk.get(key, now - self.ttl)
+        if stored is not None:
+            try:
+                return pickle.loads(stored[0]), stored[0], stored[1], True
+            except Exception:
+                pass  # Gravado por outra versão do código: calcula de novo
+        value = compute()
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            data = None  # Não serializável: devolvido, mas não guardado
+        return value, data, time.time(), False
+
+    def _store(self, key, data, created_at):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old[0])
+        self._entries[key] = (data, created_at)
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self):
+        """Entradas e bytes na memória, acertos (memória e disco) e cálculos"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Esvazia a memória e o disco"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+        if self.disk is not None:
+            self.disk.clear()
+
@@ -0,0 +1,152 @@
+# ==============================================================================
+# RETRATO DAS PÁGINAS RASTREADAS
+# Cada página visitada pelo crawl vira uma linha compacta: hash do texto, title,
+# meta description, primeiro H1 e o vetor de métricas on-page (colunas NumPy).
+# As páginas que falharam entram com o status HTTP. É o que o histórico guarda
+# de cada auditoria e o que a comparação entre duas auditorias do mesmo site
+# usa (audit_diff.py).
+# ==============================================================================
+import hashlib
+import io
+import json
+import time
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from page_records import OnPageRecord, as_dict
+from scoring import score_frame, seo_metrics
+
+# Colunas da matriz de métricas (seo_score é o score on-page, sem PageSpeed)
+SNAPSHOT_METRICS = (
+    "seo_score", "geo_score", "word_count", "title_length", "meta_description_length", "h1_count",
+    "links_internos", "image_count", "images_sem_alt",
+)
+
+
+def content_hash(text):
+    """Hash de 64 bits do texto da página (espaços normalizados)"""
+    digest = hashlib.blake2b(" ".join(text.split()).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class SnapshotBuilder:
+    """Acumula as páginas do crawl; os scores são calculados de uma vez em build()"""
+
+    def __init__(self, site):
+        self.site = site
+        self.urls = []
+        self.titles = []
+        self.metas = []
+        self.h1s = []
+        self._onpage = []
+        self._hashes = array("Q")
+        self._geo_scores = array("d")
+        self.broken = {}
+
+    def add(self, url, onpage, h1, text, geo_score=None):
+        """Registra uma página rastreada (onpage no formato de onpage_checks_soup); retorna o hash do texto"""
+        digest = content_hash(text)
+        self.urls.append(url)
+        self.titles.append(onpage["title"])
+        self.metas.append(onpage["meta_description"])
+        self.h1s.append(h1)
+        self._onpage.append(OnPageRecord.from_dict(onpage))
+        self._hashes.append(digest)
+        self._geo_scores.append(np.nan if geo_score is None else geo_score)
+        return digest
+
+    def add_failure(self, url, status):
+        """Página que não pôde ser buscada (status HTTP ou mensagem de erro)"""
+        self.broken[url] = str(status)
+
+    def build(self):
+        n = len(self.urls)
+        metrics = np.full((n, len(SNAPSHOT_METRICS)), np.nan)
+        if n:
+            onpage = [as_dict(record) for record in self._onpage]
+            # Score de SEO de todas as páginas numa única chamada vetorizada (como calculate_overall_seo_scores)
+            metrics[:, 0] = score_frame(pd.DataFrame.from_records([seo_metrics(page) for page in onpage]), "seo")
+            metrics[:, 1] = np.frombuffer(self._geo_scores, dtype=np.float64)
+            for j, name in enumerate(SNAPSHOT_METRICS[2:], start=2):
+                metrics[:, j] = [page[name] for page in onpage]
+        return SiteSnapshot(
+            self.site, time.time(), list(self.urls), np.frombuffer(self._hashes, dtype=np.uint64).copy(),
+            np.array(self.titles, dtype=object), np.array(self.metas, dtype=object), np.array(self.h1s, dtype=object),
+            metrics, dict(self.broken),
+        )
+
+
+class SiteSnapshot:
+    """Páginas de uma auditoria em colunas: URLs, hashes, textos, matriz de métricas e links quebrados"""
+
+    def __init__(self, site, created_at, urls, hashes, titles, metas, h1s, metrics, broken):
+        self.site = site
+        self.created_at = created_at
+        self.urls = urls
+        self.hashes = hashes
+        self.titles = titles
+        self.metas = metas
+        self.h1s = h1s
+        self.metrics = metrics
+        self.broken = broken
+
+    @property
+    def page_count(self):
+        return len(self.urls)
+
+    def metric(self, name):
+        return self.metrics[:, SNAPSHOT_METRICS.index(name)]
+
+    def with_broken_links(self, broken_links):
+        """Inclui os links quebrados de check_broken_links ({'url', 'status'})"""
+        for link in broken_links or []:
+            self.broken.setdefault(link["url"], str(link["status"]))
+        return self
+
+    def updated(self, fresh, dropped=()):
+        """Retrato atualizado por um re-crawl parcial (ver monitoring.py)
+
+        As páginas de `fresh` substituem as de mesma URL (ou entram como novas),
+        as de `dropped` saem e as demais são mantidas como estavam. Os links
+        quebrados que voltaram a responder deixam a lista.
+        """
+        stale = pd.Index(fresh.urls).get_indexer(self.urls) >= 0
+        if dropped:
+            stale |= pd.Index(self.urls).isin(list(dropped))
+        keep = np.flatnonzero(~stale)
+        checked = set(fresh.urls) | set(dropped)
+        broken = {url: status for url, status in self.broken.items() if url not in checked}
+        broken.update(fresh.broken)
+        return SiteSnapshot(
+            fresh.site, fresh.created_at, [self.urls[i] for i in keep] + list(fresh.urls),
+            np.concatenate([self.hashes[keep], fresh.hashes]),
+            np.concatenate([self.titles[keep], fresh.titles]), np.concatenate([self.metas[keep], fresh.metas]),
+            np.concatenate([self.h1s[keep], fresh.h1s]), np.vstack([self.metrics[keep], fresh.metrics]), broken,
+        )
+
+    # ========== SERIALIZAÇÃO (HISTÓRICO) ==========
+    def to_storage(self):
+        """(textos em JSON, arrays em .npz) para gravar no histórico"""
+        strings = json.dumps({
+            "urls": self.urls, "titles": self.titles.tolist(), "metas": self.metas.tolist(),
+            "h1s": self.h1s.tolist(), "broken": self.broken, "metrics": list(SNAPSHOT_METRICS),
+        }, ensure_ascii=False)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, hashes=self.hashes, metrics=self.metrics)
+        return strings, buffer.getvalue()
+
+    @classmethod
+    def from_storage(cls, site, created_at, strings, arrays):
+        data = json.loads(strings)
+        stored = np.load(io.BytesIO(arrays))
+        # Métricas gravadas por uma versão com outras colunas: as que faltam ficam NaN
+        metrics = np.full((len(data["urls"]), len(SNAPSHOT_METRICS)), np.nan)
+        for j, name in enumerate(data["metrics"]):
+            if name in SNAPSHOT_METRICS:
+                metrics[:, SNAPSHOT_METRICS.index(name)] = stored["metrics"][:, j]
+        return cls(
+            site, created_at, data["urls"], stored["hashes"], np.array(data["titles"], dtype=object),
+            np.array(data["metas"], dtype=object), np.array(data["h1s"], dtype=object), metrics, data["broken"],
+        )
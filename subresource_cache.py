@@ -0,0 +1,178 @@
+# ==============================================================================
+# CACHE DE SUBRECURSOS (CSS, JS, FONTES)
+# As páginas de um site repetem as mesmas folhas de estilo e scripts. Toda busca
+# de subrecurso (peso no lite lab, bloqueio de renderização, análise do
+# conteúdo) passa por este cache, separado por site e guardado junto com os
+# validadores HTTP (ETag/Last-Modified): dentro do TTL a resposta vem da
+# memória; depois disso uma requisição condicional (304) a renova sem baixar o
+# corpo de novo. Requisições simultâneas da mesma URL esperam uma única busca.
+# O total de bytes guardados é contabilizado e os itens menos usados saem
+# primeiro quando o limite é atingido.
+# ==============================================================================
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import http_client
+from instrumentation import span
+
+SUBRESOURCE_CACHE_MAX_MB = float(os.getenv("SUBRESOURCE_CACHE_MAX_MB", "64"))
+SUBRESOURCE_CACHE_TTL_SECONDS = float(os.getenv("SUBRESOURCE_CACHE_TTL_SECONDS", "900"))
+# Corpos maiores que isso não são guardados (só o tamanho e os validadores)
+SUBRESOURCE_MAX_BODY_BYTES = int(os.getenv("SUBRESOURCE_MAX_BODY_BYTES", str(2 * 2**20)))
+
+# Custo fixo estimado de uma entrada além do corpo (URL, cabeçalhos, objeto)
+_ENTRY_OVERHEAD = 512
+
+
+class Subresource:
+    """Um subrecurso buscado: tamanho transferido, tipo, validadores e (se couber) o corpo"""
+
+    __slots__ = ("url", "status", "size", "content_type", "etag", "last_modified", "body", "fetched_at")
+
+    def __init__(self, url, status, size=None, content_type="", etag=None, last_modified=None, body=None):
+        self.url = url
+        self.status = status
+        self.size = size
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body
+        self.fetched_at = time.monotonic()
+
+    @property
+    def ok(self):
+        return self.status < 400
+
+    @property
+    def cost(self):
+        """Bytes que a entrada ocupa no cache"""
+        return _ENTRY_OVERHEAD + (len(self.body) if self.body else 0)
+
+    def text(self):
+        """Corpo decodificado como texto (vazio se não foi guardado)"""
+        return self.body.decode("utf-8", errors="replace") if self.body else ""
+
+
+def download_subresource(url, cached=None):
+    """Busca o recurso; com uma versão em cache, faz a requisição condicional
+
+    Retorna (Subresource, bytes baixados). Uma resposta 304 devolve a própria
+    entrada em cache renovada.
+    """
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if cached is not None and cached.ok:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    with span("subresource_fetch", "fetch", url=url) as fetch_span:
+        response = http_client.get(url, headers=headers, timeout=10)
+        if response.status_code == 304 and cached is not None:
+            cached.fetched_at = time.monotonic()
+            return cached, 0
+        body = response.content
+        fetch_span.add(bytes=len(body))
+    length = response.headers.get("Content-Length")
+    # Content-Length é o tamanho transferido (compactado); sem ele, o corpo já descompactado
+    size = int(length) if length and length.isdigit() else len(body)
+    entry = Subresource(
+        url, response.status_code, size if response.status_code < 400 else None,
+        response.headers.get("Content-Type", ""), response.headers.get("ETag"), response.headers.get("Last-Modified"),
+        body if response.status_code < 400 and len(body) <= SUBRESOURCE_MAX_BODY_BYTES else None,
+    )
+    return entry, len(body)
+
+
+class SubresourceCache:
+    """Subrecursos por (site, URL), com TTL, revalidação e limite de bytes (LRU)"""
+
+    def __init__(self, max_bytes=SUBRESOURCE_CACHE_MAX_MB * 2**20, ttl=SUBRESOURCE_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+
+    def fetch(self, site, url):
+        """Subresource da URL no escopo do site; busca (ou revalida) só se preciso
+
+        Levanta as exceções do requests quando a busca falha.
+        """
+        key = (site, url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.fetched_at <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.bytes_saved += entry.size or 0
+                return entry
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                future = self._inflight[key] = Future()
+        if waiting is not None:
+            # Outra thread já está buscando essa URL
+            return waiting.result()
+
+        try:
+            fetched, downloaded = download_subresource(url, entry)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            if fetched is entry:
+                self.revalidated += 1
+                self.bytes_saved += entry.size or 0
+            else:
+                self.misses += 1
+            self.bytes_downloaded += downloaded
+            self._store(key, fetched)
+            del self._inflight[key]
+        future.set_result(fetched)
+        return fetched
+
+    def _store(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.cost
+        self._entries[key] = entry
+        self.bytes += entry.cost
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.cost
+            self.evictions += 1
+
+    def stats(self):
+        """Contadores do cache: entradas, bytes guardados, acertos e bytes economizados"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "sites": len({site for site, _ in self._entries}),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "evictions": self.evictions,
+                "bytes_downloaded": self.bytes_downloaded,
+                "bytes_saved": self.bytes_saved,
+            }
+
+    def clear(self, site=None):
+        """Esvazia o cache inteiro ou só as entradas de um site"""
+        with self._lock:
+            for key in [key for key in self._entries if site is None or key[0] == site]:
+                self.bytes -= self._entries.pop(key).cost
+
+
+SUBRESOURCES = SubresourceCache()